@@ -0,0 +1,136 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class AdmissionRejected(Exception):
+    """Raised when the OCR backlog is full; retry_after is a hint in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Caps concurrent OCR jobs and hands freed slots to waiting users round-robin.
+
+    Each user has its own FIFO queue. When a slot frees up the user at the
+    front of the rotation gets it and moves to the back, so one client
+    uploading a burst of statements cannot starve everyone else.
+    """
+
+    def __init__(self, max_concurrency=2, max_queue=8, max_queue_per_user=2, queue_timeout=120):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queued = 0
+        self._waiting = OrderedDict()
+        self._granted = set()
+        # Moving average of slot hold time, used for Retry-After estimates
+        self._avg_service = 30.0
+        self.stats = {'admitted': 0, 'queued_total': 0, 'rejected': 0, 'timed_out': 0,
+                      'wait_seconds': 0.0, 'service_seconds': 0.0, 'completed': 0}
+
+    def _retry_after(self):
+        backlog = self._queued + 1
+        return max(1, math.ceil(self._avg_service * backlog / self.max_concurrency))
+
+    def _reject(self, message):
+        self.stats['rejected'] += 1
+        raise AdmissionRejected(message, self._retry_after())
+
+    def _dispatch(self):
+        while self._active < self.max_concurrency and self._waiting:
+            user_id, tickets = next(iter(self._waiting.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            self._queued -= 1
+            self._active += 1
+            self._granted.add(ticket)
+        self._cond.notify_all()
+
+    def acquire(self, user_id):
+        """Block until a slot is free for this user, or raise AdmissionRejected"""
+        start = time.perf_counter()
+        with self._cond:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                self.stats['admitted'] += 1
+                return 0.0
+
+            user_tickets = self._waiting.get(user_id)
+            if self._queued >= self.max_queue:
+                self._reject("OCR queue is full")
+            if user_tickets and len(user_tickets) >= self.max_queue_per_user:
+                self._reject("Too many uploads queued for this user")
+
+            ticket = object()
+            self._waiting.setdefault(user_id, deque()).append(ticket)
+            self._queued += 1
+            self.stats['queued_total'] += 1
+
+            deadline = start + self.queue_timeout
+            while ticket not in self._granted:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    tickets = self._waiting.get(user_id)
+                    tickets.remove(ticket)
+                    if not tickets:
+                        del self._waiting[user_id]
+                    self._queued -= 1
+                    self.stats['timed_out'] += 1
+                    self._reject("Timed out waiting for an OCR slot")
+                self._cond.wait(remaining)
+
+            self._granted.discard(ticket)
+            waited = time.perf_counter() - start
+            self.stats['admitted'] += 1
+            self.stats['wait_seconds'] += waited
+            return waited
+
+    def release(self, service_seconds):
+        with self._cond:
+            self._active -= 1
+            self.stats['completed'] += 1
+            self.stats['service_seconds'] += service_seconds
+            self._avg_service = 0.8 * self._avg_service + 0.2 * service_seconds
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user_id):
+        self.acquire(user_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def snapshot(self):
+        """Current queue depth and counters, for metrics and debugging"""
+        with self._cond:
+            return {
+                'active': self._active,
+                'queued': self._queued,
+                'max_concurrency': self.max_concurrency,
+                'queued_per_user': {str(user): len(tickets) for user, tickets in self._waiting.items()},
+                'avg_service_seconds': round(self._avg_service, 3),
+                **self.stats
+            }
+
+ocr_admission = AdmissionController(
+    # One slot per OCR engine in the pool unless set explicitly
+    max_concurrency=int(os.getenv('OCR_MAX_CONCURRENCY', os.getenv('OCR_POOL_SIZE', 2))),
+    max_queue=int(os.getenv('OCR_MAX_QUEUE', 8)),
+    max_queue_per_user=int(os.getenv('OCR_MAX_QUEUE_PER_USER', 2)),
+    queue_timeout=float(os.getenv('OCR_QUEUE_TIMEOUT', 120))
+)
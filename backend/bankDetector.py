@@ -1,5 +1,6 @@
 import PyPDF2
 import io
+import logging
 import re
 import fitz  # PyMuPDF
 from PIL import Image
@@ -8,10 +9,18 @@ import cv2
 import os
 from pathlib import Path
 import pandas as pd
-from img2table.document import PDF
-from img2table.ocr import PaddleOCR
 from dateutil import parser as date_parser
 from ifsc_detector import extract_ifsc_from_text, get_bank_from_ifsc
+from performance_analyzer import time_function, measure, increment
+import page_pipeline
+import layout_templates
+from spooled_pdf import SpooledPDF, open_document, open_reader
+from metrics import record_cache
+from ocr_pool import pool_for
+from logging_config import get_logger, LOG_SAMPLE_EVERY
+
+logger = get_logger("bankDetector")
+table_logger = get_logger("bankDetector.tables", sample_every=LOG_SAMPLE_EVERY)
 
 def safe_str(value):
     """Convert any value to string safely - prevents regex errors"""
@@ -19,17 +28,15 @@ def safe_str(value):
         return ""
     return str(value).strip()
 
-def calculate_opening_balance_universal(final_df, is_reverse_chrono):
-    """Universal opening balance calculation for all bank formats"""
-    if len(final_df) == 0:
-        return None
-    
-    print(f"[DEBUG] All columns: {final_df.columns.tolist()}")
-    
-    target_row = final_df.iloc[0] if not is_reverse_chrono else final_df.iloc[-1]
+# Balances this far apart still follow from the amounts (rounding in the PDF)
+BALANCE_TOLERANCE = 0.011
+AMOUNT_CELL_REGEX = re.compile(r'(-?\d+(?:\.\d+)?)\s*(CR|DR)?', re.IGNORECASE)
+
+def find_amount_columns(labels):
+    """(balance, debit, credit, amount, dr_cr) among the column labels, None for the ones the statement lacks"""
     balance_col = debit_col = credit_col = amount_col = dr_cr_col = None
     
-    for col in final_df.columns:
+    for col in labels:
         col_lower = str(col).lower().replace(' ', '')
         if 'balance' in col_lower:
             balance_col = col
@@ -42,7 +49,81 @@ def calculate_opening_balance_universal(final_df, is_reverse_chrono):
         elif any(word in col_lower for word in ['credit', 'deposit']):
             credit_col = col
     
-    print(f"[DEBUG] Found: balance={balance_col}, debit={debit_col}, credit={credit_col}, amount={amount_col}, dr_cr={dr_cr_col}")
+    return balance_col, debit_col, credit_col, amount_col, dr_cr_col
+
+def parse_amount(value):
+    """Float of an amount or balance cell, negative with a Dr suffix; None when blank or not a number"""
+    match = AMOUNT_CELL_REGEX.fullmatch(str(value).replace('INR', '').replace(',', '').strip())
+    if not match:
+        return None
+    amount = float(match.group(1))
+    return -amount if (match.group(2) or '').upper() == 'DR' else amount
+
+def balance_chain(final_df):
+    """(checked, breaks): pairs of consecutive balances, and how many do not follow from the amounts between them.
+
+    Reverse chronological statements change by the amounts of the row
+    above instead of their own; both orders are tried and the one with
+    fewer breaks counts. Rows without a balance (printed once a day)
+    carry their amounts to the next balance. A Dr/Cr column next to
+    separate debit and credit columns is the sign of the balance.
+    """
+    labels, rows = [str(col) for col in final_df.columns], final_df.values.tolist()
+    if find_amount_columns(labels)[0] is None and rows:
+        # Borderless statements may keep their header as the first row
+        labels, rows = [str(value) for value in rows[0]], rows[1:]
+    found = find_amount_columns(labels)
+    if found[0] is None or found[1:4] == (None, None, None):
+        return 0, 0
+    balance_col, debit_col, credit_col, amount_col, dr_cr_col = [
+        labels.index(col) if col is not None else None for col in found]
+    
+    checked = forward = backward = 0
+    previous = previous_change = None
+    pending = 0.0
+    for row in rows:
+        dr_cr = str(row[dr_cr_col]).strip().upper() if dr_cr_col is not None else ''
+        balance = parse_amount(row[balance_col])
+        if amount_col is not None:
+            change = parse_amount(row[amount_col]) or 0.0
+            if dr_cr in ('DR', 'CR'):
+                change = -abs(change) if dr_cr == 'DR' else abs(change)
+        else:
+            credit = parse_amount(row[credit_col]) if credit_col is not None else None
+            debit = parse_amount(row[debit_col]) if debit_col is not None else None
+            change = abs(credit or 0.0) - abs(debit or 0.0)
+            if balance is not None and dr_cr == 'DR':
+                balance = -abs(balance)
+        
+        if balance is None:
+            pending += change
+            continue
+        if previous is not None:
+            checked += 1
+            forward += abs(previous + pending + change - balance) > BALANCE_TOLERANCE
+            backward += abs(previous - previous_change - pending - balance) > BALANCE_TOLERANCE
+        previous, previous_change, pending = balance, change, 0.0
+    
+    return checked, min(forward, backward)
+
+def balances_follow(final_df):
+    """Whether every balance of the statement follows from the one before and the amounts in between"""
+    if final_df is None or final_df.empty:
+        return False
+    checked, breaks = balance_chain(final_df)
+    return checked > 0 and breaks == 0
+
+def calculate_opening_balance_universal(final_df, is_reverse_chrono):
+    """Universal opening balance calculation for all bank formats"""
+    if len(final_df) == 0:
+        return None
+    
+    logger.debug("All columns: %s", final_df.columns.tolist())
+    
+    target_row = final_df.iloc[0] if not is_reverse_chrono else final_df.iloc[-1]
+    balance_col, debit_col, credit_col, amount_col, dr_cr_col = find_amount_columns(final_df.columns)
+    
+    logger.debug("Found: balance=%s, debit=%s, credit=%s, amount=%s, dr_cr=%s", balance_col, debit_col, credit_col, amount_col, dr_cr_col)
     
     # Handle single amount column with DR/CR indicator
     if balance_col and amount_col and dr_cr_col:
@@ -61,7 +142,7 @@ def calculate_opening_balance_universal(final_df, is_reverse_chrono):
             
             return {'Balance': f'{opening:.2f}', 'Source': 'Calculated'}
         except Exception as e:
-            print(f"[ERROR] Opening calc failed: {e}")
+            logger.warning("Opening calc failed: %s", e)
     
     # Handle separate debit/credit columns
     if balance_col and debit_col and credit_col:
@@ -80,10 +161,11 @@ def calculate_opening_balance_universal(final_df, is_reverse_chrono):
             
             return {'Balance': f'{opening:.2f}', 'Source': 'Calculated'}
         except Exception as e:
-            print(f"[ERROR] Opening calc failed: {e}")
+            logger.warning("Opening calc failed: %s", e)
     
     return None
 
+@time_function("bankDetector")
 def convert_date_columns(df):
     """Convert date columns to datetime type"""
     if df is None or df.empty:
@@ -100,9 +182,9 @@ def convert_date_columns(df):
                     if pd.notna(x) and str(x).strip() not in ['', '-', 'nan'] 
                     else pd.NaT
                 )
-                print(f"[DATE] Converted column '{col}' to datetime")
+                logger.debug("[DATE] Converted column '%s' to datetime", col)
             except Exception as e:
-                print(f"[DATE] Failed to convert column '{col}': {e}")
+                logger.warning("[DATE] Failed to convert column '%s': %s", col, e)
     
     return df
 
@@ -122,33 +204,26 @@ BANK_NAME_REGEX = re.compile(
     re.MULTILINE
 )
 
-# Cache OCR Instance
-_ocr_instance = None
-
-def get_ocr_instance():
-    global _ocr_instance
-    if _ocr_instance is None:
-        _ocr_instance = PaddleOCR(lang="en")
-    return _ocr_instance
-
-def decrypt_pdf_bytes(pdf_bytes, password):
-    """Decrypt password-protected PDF with multiple methods"""
+def _decrypt_into(pdf_source, password, output):
+    """Write the decrypted PDF to output; False if no password variant works"""
     # Method 1: Try PyMuPDF first (better encryption support)
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        doc = open_document(pdf_source)
         if doc.needs_pass:
             if doc.authenticate(password):
-                # Convert back to bytes
-                output_bytes = doc.tobytes()
+                # Saved without encryption
+                doc.save(output)
                 doc.close()
-                return output_bytes
+                return True
             doc.close()
     except Exception as e:
-        print(f"PyMuPDF decryption failed: {e}")
+        logger.warning("PyMuPDF decryption failed: %s", e)
+        output.seek(0)
+        output.truncate()
     
     # Method 2: Try PyPDF2 with multiple password variations
     try:
-        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        reader = open_reader(pdf_source)
         writer = PyPDF2.PdfWriter()
         
         # Try different password encodings
@@ -170,21 +245,33 @@ def decrypt_pdf_bytes(pdf_bytes, password):
                 continue
         
         if not decryption_successful:
-            return None
+            return False
         
         for page in reader.pages:
             writer.add_page(page)
         
-        output = io.BytesIO()
         writer.write(output)
-        return output.getvalue()
+        return True
     except Exception as e:
-        print(f"PyPDF2 decryption failed: {e}")
+        logger.warning("PyPDF2 decryption failed: %s", e)
+        return False
+
+@time_function("bankDetector")
+def decrypt_pdf_bytes(pdf_bytes, password):
+    """Decrypt password-protected PDF with multiple methods"""
+    output = io.BytesIO()
+    if not _decrypt_into(pdf_bytes, password, output):
         return None
+    return output.getvalue()
+
+@time_function("bankDetector")
+def decrypt_pdf(pdf_source, password):
+    """Like decrypt_pdf_bytes, but decrypts into a new SpooledPDF (None on failure)"""
+    return SpooledPDF.from_writer(lambda output: _decrypt_into(pdf_source, password, output))
 
 def load_reference_logos():
     """Load reference logos from logos folder"""
-    logos_folder = Path('logos')
+    logos_folder = Path(__file__).parent / 'logos'
     reference_logos = {}
     
     if not logos_folder.exists():
@@ -202,10 +289,20 @@ def load_reference_logos():
     
     return reference_logos
 
-def extract_logos_from_pdf_top_quarter(pdf_bytes):
+# Cache reference logos - decoded once per process (or once before fork)
+_reference_logos = None
+
+def get_reference_logos():
+    global _reference_logos
+    record_cache('reference_logos', _reference_logos is not None)
+    if _reference_logos is None:
+        _reference_logos = load_reference_logos()
+    return _reference_logos
+
+def extract_logos_from_pdf_top_quarter(pdf_source):
     """Extract images only from top 25% of first page"""
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        doc = open_document(pdf_source)
         page = doc[0]
         
         # Get page dimensions
@@ -286,10 +383,10 @@ def match_logo_with_references(extracted_logo, reference_logos):
     
     return None
 
-def extract_text_from_top_quarter(pdf_bytes):
+def extract_text_from_top_quarter(pdf_source):
     """Extract text only from top 25% of first page"""
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        doc = open_document(pdf_source)
         page = doc[0]
         
         # Get page dimensions
@@ -308,7 +405,7 @@ def extract_text_from_top_quarter(pdf_bytes):
     except Exception:
         # Fallback to PyPDF2 method
         try:
-            reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+            reader = open_reader(pdf_source)
             first_page = reader.pages[0]
             full_text = first_page.extract_text()
             
@@ -346,10 +443,11 @@ def extract_bank_name_from_text(text):
     
     return None
 
-def extract_balances_from_pdf(pdf_bytes):
+@time_function("bankDetector")
+def extract_balances_from_pdf(pdf_source):
     """Universal balance extraction - works for ANY bank"""
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        doc = open_document(pdf_source)
         full_text = ""
         for page in doc:
             full_text += page.get_text()
@@ -370,27 +468,28 @@ def extract_balances_from_pdf(pdf_bytes):
                 balance_val = match.group(1).replace(',', '')
                 cr_dr = match.group(2) if len(match.groups()) > 1 and match.group(2) else ''
                 opening_balance = {'Balance': balance_val + cr_dr, 'Source': 'PDF'}
-                print(f"[EXTRACT] Opening Balance found: {opening_balance}")
+                logger.debug("[EXTRACT] Opening Balance found: %s", opening_balance)
                 break
         
         # Disable closing balance PDF extraction - table data is more accurate
         
         return opening_balance, closing_balance
     except Exception as e:
-        print(f"[EXTRACT] Balance extraction error: {e}")
+        logger.warning("[EXTRACT] Balance extraction error: %s", e)
         return None, None
 
-def detect_bank_from_pdf(pdf_bytes):
+@time_function("bankDetector")
+def detect_bank_from_pdf(pdf_source):
     """Main function to detect bank name - IFSC first, then text, then logo"""
     try:
         # Method 1: IFSC code detection (most reliable)
-        text = extract_text_from_top_quarter(pdf_bytes)
+        text = extract_text_from_top_quarter(pdf_source)
         if text.strip():
             ifsc_code = extract_ifsc_from_text(text)
             if ifsc_code:
                 bank_name = get_bank_from_ifsc(ifsc_code)
                 if bank_name:
-                    print(f"[IFSC] Detected: {bank_name} (IFSC: {ifsc_code})")
+                    logger.info("[IFSC] Detected: %s (IFSC: %s)", bank_name, ifsc_code)
                     return bank_name
         
         # Method 2: Text-based bank name extraction
@@ -400,9 +499,9 @@ def detect_bank_from_pdf(pdf_bytes):
                 return bank_name
             
         # Method 3: Logo detection as fallback
-        reference_logos = load_reference_logos()
+        reference_logos = get_reference_logos()
         if reference_logos:
-            extracted_logos = extract_logos_from_pdf_top_quarter(pdf_bytes)
+            extracted_logos = extract_logos_from_pdf_top_quarter(pdf_source)
             for logo in extracted_logos[:2]:
                 bank_name = match_logo_with_references(logo, reference_logos)
                 if bank_name:
@@ -411,7 +510,7 @@ def detect_bank_from_pdf(pdf_bytes):
         return None
         
     except Exception as e:
-        print(f"Detection error: {e}")
+        logger.warning("Detection error: %s", e)
         return None
 
 def classify_bank_type(bank_name):
@@ -481,6 +580,7 @@ from bordered import (
     clean_extra_spaces as bordered_clean_extra_spaces,
     CHEQUE_NUMBER_REGEX
 )
+from bordered_stream import BorderedStream, STREAMING_MIN_PAGES
 
 from borderless import (
     has_header_in_first_row as borderless_has_header_in_first_row,
@@ -499,21 +599,21 @@ from borderless import (
 try:
     from jk_parser import process_jk_pdf
 except ImportError:
-    def process_jk_pdf(pdf_bytes, filename):
+    def process_jk_pdf(pdf_source, filename, bank=None):
         return None, None, None, None
 
 # Import Indian Bank parser
 try:
     from indian_parser import process_indian_pdf
 except ImportError:
-    def process_indian_pdf(pdf_bytes, filename):
+    def process_indian_pdf(pdf_source, filename, bank=None):
         return None, None, None, None
 
 # Import Canara Bank parser
 try:
     from canara_parser import process_canara_pdf
 except ImportError:
-    def process_canara_pdf(pdf_bytes, filename):
+    def process_canara_pdf(pdf_source, filename, bank=None):
         return None, None, None, None
 
 def calculate_opening_from_first_transaction(df):
@@ -551,31 +651,114 @@ def calculate_opening_from_first_transaction(df):
     
     return None
 
-def process_bordered_pdf(pdf_bytes, filename):
-    """Process PDF using bordered table logic - optimized"""
-    pdf_opening_balance, pdf_closing_balance = extract_balances_from_pdf(pdf_bytes)
+def finalize_statement(final_df, opening_balance, closing_balance, pdf_opening_balance):
+    """Order detection, balance fallbacks and date conversion shared by the table parsers"""
+    # Detect order BEFORE opening balance calculation
+    is_reverse_chrono = False
+    if len(final_df) >= 2:
+        date_col = None
+        for col in final_df.columns:
+            if 'date' in str(col).lower() and 'value' not in str(col).lower():
+                date_col = col
+                break
+        
+        if date_col:
+            try:
+                first_date = date_parser.parse(str(final_df.iloc[0][date_col]), fuzzy=True, dayfirst=True)
+                last_date = date_parser.parse(str(final_df.iloc[-1][date_col]), fuzzy=True, dayfirst=True)
+                is_reverse_chrono = first_date > last_date
+                logger.debug("[ORDER] Reverse chronological: %s", is_reverse_chrono)
+            except Exception as e:
+                logger.debug("[ORDER] Failed: %s", e)
+    
+    if not opening_balance:
+        opening_balance = pdf_opening_balance
+    
+    if not opening_balance:
+        opening_balance = calculate_opening_balance_universal(final_df, is_reverse_chrono)
+        if opening_balance:
+            logger.info("[FALLBACK] Opening Balance: %s", opening_balance)
+    
+    logger.info("FINAL OPENING BALANCE: %s", opening_balance)
+    
+    if len(final_df) > 0:
+        target_row = final_df.iloc[0] if is_reverse_chrono else final_df.iloc[-1]
+        for col in final_df.columns:
+            if 'balance' in str(col).lower():
+                balance_str = str(target_row[col]).replace('INR', '').replace(',', '').strip()
+                if balance_str and balance_str not in ['', '-', 'nan']:
+                    closing_balance = {'Balance': balance_str, 'Source': 'Table'}
+                    logger.debug("[TABLE] Closing Balance: %s", closing_balance)
+                    break
     
-    pdf_doc = PDF(pdf_bytes)
-    ocr = get_ocr_instance()
+    logger.info("FINAL CLOSING BALANCE: %s", closing_balance)
     
-    pdf_tables = pdf_doc.extract_tables(
-        ocr=ocr,
-        implicit_rows=False,
-        implicit_columns=False,
-        borderless_tables=False,
-        min_confidence=50
-    )
+    final_df = convert_date_columns(final_df)
     
+    return final_df, opening_balance, closing_balance
+
+def template_parse_holds(bank, result):
+    """Whether a statement read on a learned template is kept: rows found and balances that follow"""
+    if balances_follow(result[0]):
+        return True
+    logger.info("Layout template of %s gave rows whose balances do not follow; detecting tables instead", bank)
+    increment('layout_templates', result='rejected')
+    return False
+
+def process_bordered_pdf(pdf_source, filename, bank=None):
+    """Process PDF using bordered table logic - optimized
+    
+    With the standardized bank name a learned layout template is tried
+    before generic table detection. Its rows are only kept when their
+    balances follow from the amounts; otherwise, or without a template,
+    the tables are detected and a template is learned from them.
+    """
+    pdf_opening_balance, pdf_closing_balance = extract_balances_from_pdf(pdf_source)
+    
+    if STREAMING_MIN_PAGES and page_pipeline.page_count(pdf_source) >= STREAMING_MIN_PAGES:
+        return process_bordered_pdf_streaming(pdf_source, filename, pdf_opening_balance, bank)
+    
+    with pool_for(bank).engine() as ocr, measure("bordered.extract_tables"):
+        pdf_tables = layout_templates.extract_tables(pdf_source, bank, ocr)
+    if pdf_tables is not None:
+        result = bordered_statement(pdf_tables, pdf_opening_balance)
+        if template_parse_holds(bank, result):
+            return result
+    
+    return process_bordered_pdf_detected(pdf_source, pdf_opening_balance, bank)
+
+def process_bordered_pdf_detected(pdf_source, pdf_opening_balance, bank=None):
+    """Bordered logic on generically detected tables; learns the bank's template when the balances follow"""
+    with pool_for(bank).engine() as ocr, measure("bordered.extract_tables"):
+        pdf_tables = layout_templates.extract_tables_propagated(
+            pdf_source,
+            ocr=ocr,
+            rows='rules',
+            implicit_rows=False,
+            implicit_columns=False,
+            borderless_tables=False,
+            min_confidence=50
+        )
+    
+    result = bordered_statement(pdf_tables, pdf_opening_balance)
+    if balances_follow(result[0]):
+        layout_templates.learn(bank, pdf_source, pdf_tables, rows='rules')
+    return result
+
+def bordered_statement(pdf_tables, pdf_opening_balance):
+    """(df, opening, closing, total) from the page tables of a bordered statement"""
     all_pages = []
     cheque_column_index = None
     first_table_columns = None
     
-    print(f"[DEBUG] Total tables found: {sum(len(tables) for tables in pdf_tables.values())}")
+    logger.debug("Total tables found: %s", sum(len(tables) for tables in pdf_tables.values()))
     
     for page_num, page_tables in pdf_tables.items():
         for table in page_tables:
             df = table.df
-            print(f"[DEBUG] Page {page_num}, Table rows: {len(df)}, Has header: {bordered_has_header_in_first_row(df)}, Has transaction: {bordered_has_transaction_in_first_row(df)}")
+            if table_logger.isEnabledFor(logging.DEBUG):
+                table_logger.debug("Page %s, Table rows: %s, Has header: %s, Has transaction: %s", page_num, len(df),
+                                   bordered_has_header_in_first_row(df), bordered_has_transaction_in_first_row(df))
             if bordered_has_header_in_first_row(df) or bordered_has_transaction_in_first_row(df):
                 if not all_pages:
                     if bordered_has_header_in_first_row(df):
@@ -584,7 +767,7 @@ def process_bordered_pdf(pdf_bytes, filename):
                         header_row = df.columns.tolist()
                     
                     for i, col in enumerate(header_row):
-                        if CHEQUE_NUMBER_REGEX.search(col):
+                        if CHEQUE_NUMBER_REGEX.search(str(col)):
                             cheque_column_index = i
                             break
                     
@@ -605,80 +788,90 @@ def process_bordered_pdf(pdf_bytes, filename):
     if not all_pages:
         return None, None, None, None
     
-    final_df = pd.concat(all_pages, ignore_index=True)
-    final_df = final_df.fillna("")
+    with measure("bankDetector.concat"):
+        final_df = pd.concat(all_pages, ignore_index=True)
+        final_df = final_df.fillna("")
     
     final_df = bordered_process_header_and_duplicates(final_df)
     final_df, opening_balance = bordered_extract_opening_balance(final_df)
     final_df, closing_balance = bordered_extract_closing_balance(final_df)
     final_df, transaction_total = bordered_extract_transaction_total(final_df)
     
-    print(f"[DEBUG] Rows before merge: {len(final_df)}")
+    logger.debug("Rows before merge: %s", len(final_df))
     final_df = bordered_merge_multiline_transactions(final_df)
-    print(f"[DEBUG] Rows after merge: {len(final_df)}")
+    logger.debug("Rows after merge: %s", len(final_df))
     
     final_df = bordered_clean_extra_spaces(final_df)
     final_df = final_df.replace(r'[^\x00-\x7F]+', '-', regex=True)
     
-    # Detect order BEFORE opening balance calculation
-    is_reverse_chrono = False
-    if len(final_df) >= 2:
-        date_col = None
-        for col in final_df.columns:
-            if 'date' in str(col).lower() and 'value' not in str(col).lower():
-                date_col = col
-                break
-        
-        if date_col:
-            try:
-                first_date = date_parser.parse(str(final_df.iloc[0][date_col]), fuzzy=True, dayfirst=True)
-                last_date = date_parser.parse(str(final_df.iloc[-1][date_col]), fuzzy=True, dayfirst=True)
-                is_reverse_chrono = first_date > last_date
-                print(f"[ORDER] Reverse chronological: {is_reverse_chrono}")
-            except Exception as e:
-                print(f"[ORDER] Failed: {e}")
+    final_df, opening_balance, closing_balance = finalize_statement(
+        final_df, opening_balance, closing_balance, pdf_opening_balance)
     
-    if not opening_balance:
-        opening_balance = pdf_opening_balance
-    
-    if not opening_balance:
-        opening_balance = calculate_opening_balance_universal(final_df, is_reverse_chrono)
-        if opening_balance:
-            print(f"[FALLBACK] Opening Balance: {opening_balance}")
-    
-    print(f"\n=== FINAL OPENING BALANCE: {opening_balance} ===")
-    
-    if len(final_df) > 0:
-        target_row = final_df.iloc[0] if is_reverse_chrono else final_df.iloc[-1]
-        for col in final_df.columns:
-            if 'balance' in str(col).lower():
-                balance_str = str(target_row[col]).replace('INR', '').replace(',', '').strip()
-                if balance_str and balance_str not in ['', '-', 'nan']:
-                    closing_balance = {'Balance': balance_str, 'Source': 'Table'}
-                    print(f"[TABLE] Closing Balance: {closing_balance}")
-                    break
-    
-    print(f"=== FINAL CLOSING BALANCE: {closing_balance} ===\n")
+    return final_df, opening_balance, closing_balance, transaction_total
+
+def process_bordered_pdf_streaming(pdf_source, filename, pdf_opening_balance=None, bank=None):
+    """Bordered logic one page at a time - memory stays flat for very long statements"""
+    if pdf_opening_balance is None:
+        pdf_opening_balance, _ = extract_balances_from_pdf(pdf_source)
+    
+    stream = BorderedStream()
+    
+    with pool_for(bank).engine() as ocr, measure("bordered.stream_pages"):
+        for page_num, page_tables in page_pipeline.iter_page_tables(
+                pdf_source, ocr=ocr,
+                implicit_rows=False,
+                implicit_columns=False,
+                borderless_tables=False,
+                min_confidence=50):
+            for table in page_tables:
+                stream.add_table(table.df)
+    
+    final_df, opening_balance, closing_balance, transaction_total = stream.finish()
+    if final_df is None:
+        return None, None, None, None
+    logger.debug("Streamed %s tables into %s rows", stream.tables, len(final_df))
     
-    final_df = convert_date_columns(final_df)
+    final_df, opening_balance, closing_balance = finalize_statement(
+        final_df, opening_balance, closing_balance, pdf_opening_balance)
     
     return final_df, opening_balance, closing_balance, transaction_total
 
-def process_borderless_pdf(pdf_bytes, filename):
-    """Process PDF using borderless table logic - optimized"""
-    pdf_opening_balance, pdf_closing_balance = extract_balances_from_pdf(pdf_bytes)
+def process_borderless_pdf(pdf_source, filename, bank=None):
+    """Process PDF using borderless table logic - optimized
     
-    pdf_doc = PDF(pdf_bytes)
-    ocr = get_ocr_instance()
+    Learned layout templates are tried first, as in process_bordered_pdf.
+    """
+    pdf_opening_balance, pdf_closing_balance = extract_balances_from_pdf(pdf_source)
     
-    pdf_tables = pdf_doc.extract_tables(
-        ocr=ocr,
-        implicit_rows=True,
-        implicit_columns=True,
-        borderless_tables=True,
-        min_confidence=50
-    )
+    with pool_for(bank).engine() as ocr, measure("borderless.extract_tables"):
+        pdf_tables = layout_templates.extract_tables(pdf_source, bank, ocr)
+    if pdf_tables is not None:
+        result = borderless_statement(pdf_tables, pdf_opening_balance)
+        if template_parse_holds(bank, result):
+            return result
     
+    return process_borderless_pdf_detected(pdf_source, pdf_opening_balance, bank)
+
+def process_borderless_pdf_detected(pdf_source, pdf_opening_balance, bank=None):
+    """Borderless logic on generically detected tables; learns the bank's template when the balances follow"""
+    with pool_for(bank).engine() as ocr, measure("borderless.extract_tables"):
+        pdf_tables = layout_templates.extract_tables_propagated(
+            pdf_source,
+            ocr=ocr,
+            rows='lines',
+            implicit_rows=True,
+            implicit_columns=True,
+            borderless_tables=True,
+            min_confidence=50
+        )
+    
+    result = borderless_statement(pdf_tables, pdf_opening_balance)
+    if balances_follow(result[0]):
+        layout_templates.learn(bank, pdf_source, pdf_tables, rows='lines')
+    return result
+
+def borderless_statement(pdf_tables, pdf_opening_balance):
+    """(df, opening, closing, total) from the page tables of a borderless statement"""
     all_pages = []
     expected_columns = None
     
@@ -697,8 +890,9 @@ def process_borderless_pdf(pdf_bytes, filename):
     if not all_pages:
         return None, None, None, None
     
-    final_df = pd.concat(all_pages, ignore_index=True)
-    final_df = final_df.fillna("")
+    with measure("bankDetector.concat"):
+        final_df = pd.concat(all_pages, ignore_index=True)
+        final_df = final_df.fillna("")
     
     final_df = borderless_process_header_and_duplicates(final_df)
     final_df, opening_balance = borderless_extract_opening_balance(final_df)
@@ -709,46 +903,7 @@ def process_borderless_pdf(pdf_bytes, filename):
     final_df = final_df.replace('', '-')
     final_df = final_df.replace(r'[^\x00-\x7F]+', '-', regex=True)
     
-    # Detect order BEFORE opening balance calculation
-    is_reverse_chrono = False
-    if len(final_df) >= 2:
-        date_col = None
-        for col in final_df.columns:
-            if 'date' in str(col).lower() and 'value' not in str(col).lower():
-                date_col = col
-                break
-        
-        if date_col:
-            try:
-                first_date = date_parser.parse(str(final_df.iloc[0][date_col]), fuzzy=True, dayfirst=True)
-                last_date = date_parser.parse(str(final_df.iloc[-1][date_col]), fuzzy=True, dayfirst=True)
-                is_reverse_chrono = first_date > last_date
-                print(f"[ORDER] Reverse chronological: {is_reverse_chrono}")
-            except Exception as e:
-                print(f"[ORDER] Failed: {e}")
-    
-    if not opening_balance:
-        opening_balance = pdf_opening_balance
-    
-    if not opening_balance:
-        opening_balance = calculate_opening_balance_universal(final_df, is_reverse_chrono)
-        if opening_balance:
-            print(f"[FALLBACK] Opening Balance: {opening_balance}")
-    
-    print(f"\n=== FINAL OPENING BALANCE: {opening_balance} ===")
-    
-    if len(final_df) > 0:
-        target_row = final_df.iloc[0] if is_reverse_chrono else final_df.iloc[-1]
-        for col in final_df.columns:
-            if 'balance' in str(col).lower():
-                balance_str = str(target_row[col]).replace('INR', '').replace(',', '').strip()
-                if balance_str and balance_str not in ['', '-', 'nan']:
-                    closing_balance = {'Balance': balance_str, 'Source': 'Table'}
-                    print(f"[TABLE] Closing Balance: {closing_balance}")
-                    break
-    
-    print(f"=== FINAL CLOSING BALANCE: {closing_balance} ===\n")
-    
-    final_df = convert_date_columns(final_df)
+    final_df, opening_balance, closing_balance = finalize_statement(
+        final_df, opening_balance, closing_balance, pdf_opening_balance)
     
     return final_df, opening_balance, closing_balance, transaction_total
@@ -0,0 +1,131 @@
+"""
+Batched text recognition
+img2table's PaddleOCR hands every image to the full PaddleOCR pipeline,
+which detects and recognises one image at a time, so each call recognises
+only that image's text lines. BatchedOCR runs the two stages itself. It
+detects text lines on every image of the call (pages, table regions or
+column bands). All line crops of the call are then scaled to the
+recogniser's input height and sorted by width, so a batch pads little. Each
+batch is right-padded to its widest crop and recognised in one forward pass.
+The paddle OCR backend (ocr_backends) builds these when OCR_BATCHED is on.
+
+    OCR_REC_BATCH_SIZE     crops per recognition batch (default 16 per CPU thread, 8 - 64)
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from performance_analyzer import measure
+from tracing import current_span
+
+try:
+    from img2table.ocr._types import OCRData
+    from paddleocr import TextDetection, TextRecognition
+    BATCHING_SUPPORTED = True
+except ImportError:
+    # paddleocr 2.x only exposes the whole pipeline
+    BATCHING_SUPPORTED = False
+
+OCR_REC_BATCH_SIZE = int(os.getenv('OCR_REC_BATCH_SIZE', 0))
+
+# PP-OCR recognisers read 48 pixel high lines
+REC_HEIGHT = 48
+# Padded pixels per batch; past this the activations no longer fit in cache
+# and a few very long lines would pad a whole batch
+REC_BATCH_PIXELS = REC_HEIGHT * 320 * 64
+# Lines thinner than this are rules or specks, not text
+MIN_LINE_HEIGHT = 6
+
+def default_batch_size(threads):
+    return max(8, min(64, 16 * threads))
+
+def _line_box(poly, width, height):
+    """Axis-aligned (x1, y1, x2, y2) of a detected text polygon, clipped to the image"""
+    poly = np.asarray(poly)
+    x1, y1 = np.floor(poly.min(axis=0)).astype(int)
+    x2, y2 = np.ceil(poly.max(axis=0)).astype(int)
+    return max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+
+def _scaled(crop):
+    """crop at REC_HEIGHT, keeping its aspect ratio"""
+    height, width = crop.shape[:2]
+    return cv2.resize(crop, (max(1, round(width * REC_HEIGHT / height)), REC_HEIGHT),
+                      interpolation=cv2.INTER_AREA if height > REC_HEIGHT else cv2.INTER_LINEAR)
+
+def make_batches(widths, batch_size):
+    """Indexes grouped into batches, narrowest first, capped at batch_size and REC_BATCH_PIXELS"""
+    batches, current = [], []
+    for idx in sorted(range(len(widths)), key=widths.__getitem__):
+        # Sorted, so this crop is the widest of the batch so far
+        if current and (len(current) == batch_size
+                        or (len(current) + 1) * widths[idx] * REC_HEIGHT > REC_BATCH_PIXELS):
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
+
+def pad_batch(crops):
+    """Crops right-padded with white to the widest one"""
+    width = max(crop.shape[1] for crop in crops)
+    return [cv2.copyMakeBorder(crop, 0, 0, 0, width - crop.shape[1], cv2.BORDER_CONSTANT, value=(255, 255, 255))
+            for crop in crops]
+
+class BatchedOCR:
+    """img2table OCR instance: per-image text detection, batched recognition"""
+
+    def __init__(self, threads=1, batch_size=None, detector=None, recognizer=None):
+        self.batch_size = batch_size or OCR_REC_BATCH_SIZE or default_batch_size(threads)
+        self.detector = detector or TextDetection(cpu_threads=threads)
+        self.recognizer = recognizer or TextRecognition(cpu_threads=threads)
+
+    def _detect(self, images):
+        """[(image index, (x1, y1, x2, y2)), ...] of every text line"""
+        with measure('ocr.detect'):
+            lines = []
+            for image_idx, img in enumerate(images):
+                height, width = img.shape[:2]
+                for result in self.detector.predict(input=img, batch_size=1):
+                    for poly in result['dt_polys']:
+                        x1, y1, x2, y2 = _line_box(poly, width, height)
+                        if y2 - y1 >= MIN_LINE_HEIGHT and x2 > x1:
+                            lines.append((image_idx, (x1, y1, x2, y2)))
+            return lines
+
+    def _recognize(self, crops):
+        """[(text, score), ...] in the order of crops"""
+        with measure('ocr.recognize'):
+            scaled = [_scaled(crop) for crop in crops]
+            batches = make_batches([crop.shape[1] for crop in scaled], self.batch_size)
+            texts = [None] * len(crops)
+            for batch in batches:
+                results = self.recognizer.predict(input=pad_batch([scaled[idx] for idx in batch]),
+                                                  batch_size=len(batch))
+                for idx, result in zip(batch, results):
+                    texts[idx] = (result['rec_text'], result['rec_score'])
+            current_span().set_attributes(lines=len(crops), batches=len(batches))
+            return texts
+
+    def of(self, document):
+        images = document.images
+        lines = self._detect(images)
+        if not lines:
+            return None
+        crops = [images[image_idx][y1:y2, x1:x2] for image_idx, (x1, y1, x2, y2) in lines]
+
+        records = {}
+        for idx, ((image_idx, (x1, y1, x2, y2)), (text, score)) in enumerate(zip(lines, self._recognize(crops))):
+            if not text or not text.strip():
+                continue
+            word_id = f"word_{image_idx + 1}_{idx + 1}"
+            records.setdefault(image_idx, []).append({
+                "id": word_id,
+                "parent": word_id,
+                "value": text,
+                "confidence": int(100 * score),
+                "x1": int(x1), "y1": int(y1), "x2": int(x2), "y2": int(y2)
+            })
+        return OCRData(records=records) if records else None
@@ -0,0 +1,499 @@
+"""
+Corpus benchmark for the bank statement pipeline
+Runs every PDF under statements/ (and the sample PDFs in the repository root)
+through the real pipeline and records per-stage wall time, CPU time and peak RSS.
+
+Usage:
+    python benchmark.py                                  # run corpus, write benchmark_report.json
+    python benchmark.py --match CBI                      # only files whose path contains "CBI"
+    python benchmark.py --baseline base.json             # compare against a saved baseline
+    python benchmark.py --baseline base.json --save-baseline
+    python benchmark.py --passwords passwords.json       # {"HDFC_54212352.pdf": "secret", ...}
+    python benchmark.py --memory --match "Indian Bank"   # per-stage allocation / RSS attribution
+    python benchmark.py --ocr-backends paddle,onnx,tesseract,easyocr
+                                                         # OCR accuracy and pages/s, per-bank default
+
+The OCR comparison renders pages that have a text layer, OCRs the image and
+scores the words read against the text layer, so every text PDF in the
+corpus is labelled data. Per bank the fastest backend within --ocr-tolerance
+of the most accurate one is written to OCR_BACKEND_FILE (ocr_backends).
+
+Reports go to benchmark_report.json under LEDGERIT_DATA_DIR (data_dir)
+unless --output names another file.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+from data_dir import data_path, ensure_parent
+
+BACKEND_DIR = Path(__file__).parent
+REPO_ROOT = BACKEND_DIR.parent
+
+OCR_BANK_TYPES = ["jk_bank", "indian_bank", "bordered", "borderless"]
+
+# Dates, amounts and balances - the words a misread actually breaks
+NUMBER_TOKEN = re.compile(r'\d')
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+class StageRecorder:
+    """Records wall time, CPU time and peak RSS for each pipeline stage"""
+
+    def __init__(self, memory_profiler=None):
+        self.stages = {}
+        self.memory_profiler = memory_profiler
+
+    def measure(self, name):
+        recorder = self
+
+        class Stage:
+            def __enter__(self):
+                self.memory = None
+                if recorder.memory_profiler is not None:
+                    self.memory = recorder.memory_profiler.stage(name)
+                    self.memory.__enter__()
+                self.wall = time.perf_counter()
+                self.cpu = time.process_time()
+                return self
+
+            def __exit__(self, *args):
+                if self.memory is not None:
+                    self.memory.__exit__(*args)
+                recorder.stages[name] = {
+                    'wall_s': round(time.perf_counter() - self.wall, 4),
+                    'cpu_s': round(time.process_time() - self.cpu, 4),
+                    'peak_rss_mb': peak_rss_mb()
+                }
+
+        return Stage()
+
+def discover_corpus(match=None):
+    """All PDFs under statements/ plus the root sample PDFs, sorted by path"""
+    paths = [p for p in (REPO_ROOT / 'statements').rglob('*') if p.suffix.lower() == '.pdf']
+    paths += [p for p in REPO_ROOT.glob('*') if p.suffix.lower() == '.pdf']
+    paths = sorted(set(paths))
+    if match:
+        paths = [p for p in paths if match.lower() in str(p.relative_to(REPO_ROOT)).lower()]
+    return paths
+
+def count_ocr_pages(pdf_source):
+    """Pages without a text layer - img2table only runs the OCR model on these"""
+    from spooled_pdf import open_document
+    doc = open_document(pdf_source)
+    try:
+        return sum(1 for page in doc if not page.get_text().strip())
+    finally:
+        doc.close()
+
+def run_pipeline(pdf_path, password=None, memory=False):
+    """Push one PDF through the same steps as /upload and return its measurements"""
+    import bankDetector
+    from flask_app import parse_transactions, run_parser
+    from performance_analyzer import registry, clear_timing_data
+
+    clear_timing_data()
+    profiler = None
+    if memory:
+        from memory_profiling import MemoryProfiler
+        profiler = MemoryProfiler()
+        profiler.start()
+    try:
+        with ExitStack() as spools:
+            return _run_stages(pdf_path, password, profiler, spools, bankDetector, run_parser,
+                               parse_transactions, registry)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+def _run_stages(pdf_path, password, profiler, spools, bankDetector, run_parser, parse_transactions, registry):
+    from spooled_pdf import SpooledPDF, open_reader
+    recorder = StageRecorder(profiler)
+    result = {'file': str(Path(pdf_path).relative_to(REPO_ROOT)), 'status': 'ok'}
+
+    with recorder.measure('read'):
+        with open(pdf_path, 'rb') as f:
+            pdf_source = spools.enter_context(SpooledPDF.from_stream(f))
+
+    with recorder.measure('decrypt'):
+        reader = open_reader(pdf_source)
+        if reader.is_encrypted and reader.decrypt('') == 0:
+            if not password:
+                result['status'] = 'skipped'
+                result['error'] = 'password protected'
+                return result
+            pdf_source = bankDetector.decrypt_pdf(pdf_source, password)
+            if pdf_source is None:
+                result['status'] = 'error'
+                result['error'] = 'wrong password'
+                return result
+            spools.enter_context(pdf_source)
+            reader = open_reader(pdf_source)
+        result['pages'] = len(reader.pages)
+
+    with recorder.measure('detect'):
+        bank_name = bankDetector.detect_bank_from_pdf(pdf_source)
+
+    with recorder.measure('classify'):
+        bank_type, standardized_name = bankDetector.classify_bank_type(bank_name)
+        bank_type = bank_type or "bordered"
+
+    result['bank_name'] = bank_name
+    result['bank'] = standardized_name
+    result['bank_type'] = bank_type
+    result['ocr_pages'] = 0
+    if bank_type in OCR_BANK_TYPES:
+        result['ocr_pages'] = count_ocr_pages(pdf_source)
+        # Model load is a one-off per process - keep it out of the per-file totals
+        with recorder.measure('ocr_init'):
+            from ocr_pool import all_pools
+            for pool in all_pools():
+                pool.preload()
+
+    # The /upload dispatch, so learned templates and per-bank OCR pools are measured too
+    with recorder.measure('parse'):
+        df, _, _, _ = run_parser(bankDetector, bank_type, standardized_name, pdf_source, Path(pdf_path).name)
+
+    with recorder.measure('serialize'):
+        transactions, _ = parse_transactions(df)
+
+    result['rows'] = len(transactions)
+    if not transactions:
+        result['status'] = 'no_transactions'
+
+    result['stages'] = recorder.stages
+    # Finer-grained timers from the instrumented pipeline (extract_tables, merge, ...)
+    result['instrumented'] = {
+        name: {'count': hist.count, 'total_s': round(hist.total, 4), 'max_s': round(hist.max, 4)}
+        for name, hist in registry.histograms().items()
+    }
+    result['total_wall_s'] = round(sum(s['wall_s'] for n, s in recorder.stages.items() if n != 'ocr_init'), 4)
+    result['total_cpu_s'] = round(sum(s['cpu_s'] for n, s in recorder.stages.items() if n != 'ocr_init'), 4)
+    result['peak_rss_mb'] = peak_rss_mb()
+    if profiler is not None:
+        result['memory'] = profiler.report()
+    return result
+
+def run_isolated(pdf_path, password=None, memory=False):
+    """Run one file in a fresh interpreter so peak RSS belongs to that file alone"""
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--worker', str(pdf_path)]
+    if memory:
+        cmd.append('--memory')
+    env = os.environ.copy()
+    if password:
+        env['BENCHMARK_PDF_PASSWORD'] = password
+    proc = subprocess.run(cmd, cwd=BACKEND_DIR, capture_output=True, text=True, env=env)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith('BENCHMARK_RESULT '):
+            return json.loads(line[len('BENCHMARK_RESULT '):])
+    return {
+        'file': str(Path(pdf_path).relative_to(REPO_ROOT)),
+        'status': 'error',
+        'error': (proc.stderr.strip().splitlines() or ['worker crashed'])[-1]
+    }
+
+def compare_with_baseline(report, baseline, threshold=0.2, min_seconds=0.05):
+    """Flag files and stages that got slower than threshold (fraction) or changed row counts"""
+    base_files = {r['file']: r for r in baseline.get('results', [])}
+    regressions = []
+
+    for current in report['results']:
+        base = base_files.get(current['file'])
+        if not base or current.get('status') != 'ok' or base.get('status') != 'ok':
+            continue
+
+        if current.get('rows') != base.get('rows'):
+            regressions.append({'file': current['file'], 'metric': 'rows',
+                                'baseline': base.get('rows'), 'current': current.get('rows')})
+
+        pairs = [('total_wall_s', base.get('total_wall_s'), current.get('total_wall_s'))]
+        for stage, timing in current.get('stages', {}).items():
+            base_stage = base.get('stages', {}).get(stage)
+            if base_stage:
+                pairs.append((f'{stage}.wall_s', base_stage['wall_s'], timing['wall_s']))
+        for name, timing in current.get('instrumented', {}).items():
+            base_timer = base.get('instrumented', {}).get(name)
+            if base_timer:
+                pairs.append((f'{name}.total_s', base_timer['total_s'], timing['total_s']))
+
+        for metric, before, after in pairs:
+            if before is None or after is None:
+                continue
+            if after - before > min_seconds and after > before * (1 + threshold):
+                regressions.append({'file': current['file'], 'metric': metric, 'baseline': before,
+                                    'current': after, 'change_pct': round((after / before - 1) * 100, 1) if before else None})
+
+    return regressions
+
+def print_summary(report, regressions=None):
+    print(f"\n{'='*100}")
+    print("CORPUS BENCHMARK")
+    print(f"{'='*100}")
+    print(f"{'File':<60} {'Bank type':<12} {'Pages':>5} {'OCR':>4} {'Rows':>5} {'Wall(s)':>8} {'RSS(MB)':>8}")
+    for r in report['results']:
+        print(f"{r['file'][:60]:<60} {str(r.get('bank_type', '-')):<12} {r.get('pages', '-'):>5} "
+              f"{r.get('ocr_pages', '-'):>4} {r.get('rows', '-'):>5} {r.get('total_wall_s', '-'):>8} "
+              f"{r.get('peak_rss_mb', '-'):>8}  {r['status'] if r['status'] != 'ok' else ''}")
+
+    s = report['summary']
+    print(f"\nFiles: {s['files']} ok / {s['total_files']} | Pages: {s['pages']} | "
+          f"Wall: {s['total_wall_s']}s | Pages/s: {s['pages_per_second']}")
+
+    if regressions is not None:
+        if regressions:
+            print(f"\nREGRESSIONS ({len(regressions)}):")
+            for reg in regressions:
+                print(f"  {reg['file']}: {reg['metric']} {reg['baseline']} -> {reg['current']}")
+        else:
+            print("\nNo regressions against baseline")
+    print(f"{'='*100}\n")
+
+def build_report(results):
+    ok = [r for r in results if r['status'] == 'ok']
+    total_wall = round(sum(r['total_wall_s'] for r in ok), 3)
+    pages = sum(r.get('pages', 0) for r in ok)
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'results': results,
+        'summary': {
+            'total_files': len(results),
+            'files': len(ok),
+            'pages': pages,
+            'ocr_pages': sum(r.get('ocr_pages', 0) for r in ok),
+            'rows': sum(r.get('rows', 0) for r in ok),
+            'total_wall_s': total_wall,
+            'total_cpu_s': round(sum(r['total_cpu_s'] for r in ok), 3),
+            'pages_per_second': round(pages / total_wall, 3) if total_wall else None,
+            'max_peak_rss_mb': max((r.get('peak_rss_mb') or 0 for r in ok), default=None)
+        }
+    }
+
+def _tokens(texts):
+    return Counter(token for text in texts for token in text.split())
+
+def _numbers(tokens):
+    return Counter({token: count for token, count in tokens.items() if NUMBER_TOKEN.search(token)})
+
+def _f1(reference, read):
+    total = sum(reference.values()) + sum(read.values())
+    return 2 * sum((reference & read).values()) / total if total else None
+
+def score_tokens(reference, read):
+    """F1 of the words read against the text layer, over all words and over words with digits"""
+    return _f1(reference, read), _f1(_numbers(reference), _numbers(read))
+
+def text_layer_pages(pdf_source, limit):
+    """Yield (page image, reference tokens) for up to `limit` pages that have a text layer"""
+    import page_pipeline
+    from spooled_pdf import open_document
+    doc = open_document(pdf_source)
+    try:
+        picked = [page.number for page in doc if len(page.get_text().strip()) > 200][:limit]
+        references = {page_number: _tokens(word[4] for word in doc[page_number].get_text("words"))
+                      for page_number in picked}
+    finally:
+        doc.close()
+    for page_number, page in page_pipeline.iter_pages(pdf_source, picked):
+        yield page_pipeline.render_page(page, page_number), references[page_number]
+
+def benchmark_ocr_backends(paths, backends, pages_per_file, passwords):
+    """One result per (file, backend): accuracy against the text layer and pages/second"""
+    import bankDetector
+    import ocr_backends
+    from img2table.document._types import MockDocument
+    from ocr_pool import OCR_THREADS
+    from spooled_pdf import SpooledPDF, open_reader
+
+    threads = OCR_THREADS or os.cpu_count() or 1
+    engines = {}
+    for backend in backends:
+        try:
+            engines[backend] = ocr_backends.create_engine(backend, threads)
+        except Exception as e:
+            print(f"Skipping OCR backend {backend}: {e}")
+
+    results = []
+    for pdf_path in paths:
+        relative = str(pdf_path.relative_to(REPO_ROOT))
+        with ExitStack() as spools:
+            with open(pdf_path, 'rb') as f:
+                pdf_source = spools.enter_context(SpooledPDF.from_stream(f))
+            reader = open_reader(pdf_source)
+            if reader.is_encrypted and reader.decrypt('') == 0:
+                password = passwords.get(pdf_path.name)
+                pdf_source = bankDetector.decrypt_pdf(pdf_source, password) if password else None
+                if pdf_source is None:
+                    continue
+                spools.enter_context(pdf_source)
+            _, bank = bankDetector.classify_bank_type(bankDetector.detect_bank_from_pdf(pdf_source))
+            pages = list(text_layer_pages(pdf_source, pages_per_file))
+        if not pages:
+            # Scanned statements have nothing to score against
+            continue
+        print(f"OCR benchmark {relative} ({bank or 'unknown bank'}, {len(pages)} pages) ...")
+        for backend, engine in engines.items():
+            scores, start = [], time.perf_counter()
+            for img, reference in pages:
+                ocr_data = engine.of(MockDocument(images=[img]))
+                words = [word['value'] for words in (ocr_data.records.values() if ocr_data else ())
+                         for word in words]
+                scores.append(score_tokens(reference, _tokens(words)))
+            seconds = time.perf_counter() - start
+            token_scores = [score[0] for score in scores if score[0] is not None]
+            number_scores = [score[1] for score in scores if score[1] is not None]
+            results.append({
+                'file': relative,
+                'bank': bank,
+                'backend': backend,
+                'pages': len(pages),
+                'seconds': round(seconds, 3),
+                'pages_per_second': round(len(pages) / seconds, 3) if seconds else None,
+                'token_f1': round(sum(token_scores) / len(token_scores), 4) if token_scores else None,
+                'number_f1': round(sum(number_scores) / len(number_scores), 4) if number_scores else None
+            })
+    return results
+
+def choose_ocr_backends(results, tolerance=0.01):
+    """(overall backend, {bank: backend}): the fastest backend within tolerance of the best number accuracy"""
+    def pick(rows):
+        per_backend = {}
+        for r in rows:
+            totals = per_backend.setdefault(r['backend'], {'pages': 0, 'seconds': 0.0, 'weighted_f1': 0.0})
+            totals['pages'] += r['pages']
+            totals['seconds'] += r['seconds']
+            totals['weighted_f1'] += (r['number_f1'] if r['number_f1'] is not None else r['token_f1'] or 0) * r['pages']
+        if not per_backend:
+            return None
+        accuracy = {backend: t['weighted_f1'] / t['pages'] for backend, t in per_backend.items()}
+        best = max(accuracy.values())
+        candidates = [backend for backend in per_backend if accuracy[backend] >= best - tolerance]
+        return max(candidates, key=lambda backend: per_backend[backend]['pages'] / (per_backend[backend]['seconds'] or 1e-9))
+
+    banks = {}
+    for bank in sorted({r['bank'] for r in results if r['bank']}):
+        banks[bank] = pick([r for r in results if r['bank'] == bank])
+    return pick(results), banks
+
+def print_ocr_summary(results, default, banks):
+    print(f"\n{'='*100}")
+    print("OCR BACKENDS")
+    print(f"{'='*100}")
+    print(f"{'File':<55} {'Backend':<10} {'Pages':>5} {'Pages/s':>8} {'Words F1':>9} {'Numbers F1':>11}")
+    for r in results:
+        print(f"{r['file'][:55]:<55} {r['backend']:<10} {r['pages']:>5} {str(r['pages_per_second']):>8} "
+              f"{str(r['token_f1']):>9} {str(r['number_f1']):>11}")
+    print(f"\nDefault: {default}")
+    for bank, backend in banks.items():
+        print(f"  {bank}: {backend}")
+    print(f"{'='*100}\n")
+
+def run_ocr_benchmark(args, passwords):
+    import ocr_backends
+    backends = [backend.strip() for backend in args.ocr_backends.split(',') if backend.strip()]
+    results = benchmark_ocr_backends(discover_corpus(args.match), backends, args.ocr_pages, passwords)
+    default, banks = choose_ocr_backends(results, args.ocr_tolerance)
+    with open(ensure_parent(args.output), 'w') as f:
+        json.dump({'generated_at': datetime.now().isoformat(timespec='seconds'), 'ocr_results': results,
+                   'default': default, 'banks': banks}, f, indent=2, default=str)
+    print_ocr_summary(results, default, banks)
+    if default and not args.ocr_dry_run:
+        ocr_backends.backend_choice.save(default, banks)
+        print(f"OCR backend choice written to {ocr_backends.backend_choice.path}")
+    print(f"Report written to {args.output}")
+    return 0 if results else 1
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the parsing pipeline over the statements corpus")
+    arg_parser.add_argument('--output', default=data_path('benchmark_report.json'))
+    arg_parser.add_argument('--baseline', help="baseline report to compare against")
+    arg_parser.add_argument('--save-baseline', action='store_true', help="write this run to --baseline")
+    arg_parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown as a fraction (0.2 = 20%%)")
+    arg_parser.add_argument('--match', help="only run files whose path contains this text")
+    arg_parser.add_argument('--passwords', help="JSON file mapping file names to PDF passwords")
+    arg_parser.add_argument('--in-process', action='store_true', help="run all files in this process (RSS is cumulative)")
+    arg_parser.add_argument('--memory', action='store_true', help="attribute allocations and RSS to pipeline stages (slower)")
+    arg_parser.add_argument('--ocr-backends', help="compare these OCR backends (comma separated) instead of the pipeline")
+    arg_parser.add_argument('--ocr-pages', type=int, default=3, help="text-layer pages scored per file")
+    arg_parser.add_argument('--ocr-tolerance', type=float, default=0.01,
+                            help="accuracy a faster backend may give up against the most accurate one")
+    arg_parser.add_argument('--ocr-dry-run', action='store_true', help="report only, do not write OCR_BACKEND_FILE")
+    arg_parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        result = run_pipeline(Path(args.worker), os.getenv('BENCHMARK_PDF_PASSWORD'), args.memory)
+        print('BENCHMARK_RESULT ' + json.dumps(result, default=str))
+        return 0
+
+    passwords = {}
+    if args.passwords:
+        with open(args.passwords) as f:
+            passwords = json.load(f)
+
+    if args.ocr_backends:
+        return run_ocr_benchmark(args, passwords)
+
+    results = []
+    for pdf_path in discover_corpus(args.match):
+        print(f"Benchmarking {pdf_path.relative_to(REPO_ROOT)} ...")
+        password = passwords.get(pdf_path.name)
+        if args.in_process:
+            try:
+                results.append(run_pipeline(pdf_path, password, args.memory))
+            except Exception as e:
+                results.append({'file': str(pdf_path.relative_to(REPO_ROOT)), 'status': 'error', 'error': str(e)})
+        else:
+            results.append(run_isolated(pdf_path, password, args.memory))
+
+    report = build_report(results)
+    with open(ensure_parent(args.output), 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    regressions = None
+    if args.baseline and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(report, json.load(f), args.threshold)
+        report['regressions'] = regressions
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Baseline saved to {args.baseline}")
+
+    print_summary(report, regressions)
+    if args.memory:
+        from memory_profiling import print_memory_summary
+        for r in report['results']:
+            if r.get('memory'):
+                print_memory_summary(r['file'], r['memory'])
+    print(f"Report written to {args.output}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
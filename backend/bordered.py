@@ -1,22 +1,15 @@
 import pandas as pd
 from img2table.document import PDF
-try:
-    from img2table.ocr import PaddleOCR
-except ImportError:
-    # Fallback to EasyOCR if PaddleOCR is not available
-    import easyocr
-    class PaddleOCR:
-        def __init__(self, lang="en"):
-            self.reader = easyocr.Reader([lang])
-        
-        def __call__(self, image):
-            return self.reader.readtext(image)
-
 from pathlib import Path
 import re
 import PyPDF2
 import io
 from dateutil import parser as date_parser
+from performance_analyzer import time_function
+from logging_config import get_logger
+from ocr_backends import create_engine, backend_for
+
+logger = get_logger("bordered")
 
 def safe_str(value):
     """Convert any value to string safely - prevents regex errors"""
@@ -200,6 +193,7 @@ def find_best_header_row(df, threshold=2):
     
     return best_row if best_row != -1 else None
 
+@time_function("bordered")
 def process_header_and_duplicates(df):
     if df.empty:
         return df
@@ -225,18 +219,21 @@ def process_header_and_duplicates(df):
     
     rows_to_drop = [header_row_idx]
     for j, row in df.iterrows():
-        if j != header_row_idx:
-            matches = 0
-            for cell in row.dropna():
-                cell_str = safe_str(cell)
-                if HEADER_REGEX.search(cell_str):
-                    matches += 1
-            if matches >= 3:
-                rows_to_drop.append(j)
+        if j != header_row_idx and is_repeated_header_row(row):
+            rows_to_drop.append(j)
     
     df = df.drop(index=rows_to_drop).reset_index(drop=True)
     return df
 
+def is_repeated_header_row(row, threshold=3):
+    """Header rows repeated on later pages match several header keywords"""
+    matches = 0
+    for cell in row.dropna():
+        cell_str = safe_str(cell)
+        if HEADER_REGEX.search(cell_str):
+            matches += 1
+    return matches >= threshold
+
 def extract_opening_balance(df):
     if df.empty:
         return df, None
@@ -259,7 +256,7 @@ def extract_opening_balance(df):
                     balance_val = balance_val.replace(',', '').replace('INR', '').strip()
                     if balance_val and balance_val not in ['', '-']:
                         opening_balance = {'Balance': balance_val, 'Source': 'Table'}
-                        print(f"[TABLE] Opening Balance from B/F: {opening_balance}")
+                        logger.debug("[TABLE] Opening Balance from B/F: %s", opening_balance)
                         df = df.drop(index=idx).reset_index(drop=True)
                         return df, opening_balance
     
@@ -286,7 +283,7 @@ def extract_closing_balance(df):
                 
                 if balance_amount:
                     closing_balance = {'Balance': balance_amount, 'Source': 'Table'}
-                    print(f"[TABLE] Closing Balance: {closing_balance}")
+                    logger.debug("[TABLE] Closing Balance: %s", closing_balance)
                     df = df.iloc[:idx].reset_index(drop=True)
                     return df, closing_balance
     
@@ -306,33 +303,44 @@ def extract_transaction_total(df):
     
     return df, None
 
+def _is_empty(x):
+    return pd.isna(x) or str(x).strip() == ""
+
+def _has_date_in_first_col(row):
+    """Check if first column contains a valid date"""
+    if len(row) == 0:
+        return False
+    first_val = str(row.iloc[0]).strip()
+    if not first_val or first_val == "":
+        return False
+    return parse_date_universal(first_val) is not None
+
+@time_function("bordered")
 def merge_multiline_transactions(df: pd.DataFrame, max_empty=2) -> pd.DataFrame:
     df = df.copy()
-    rows_to_drop = []
+    rows_to_drop, _ = merge_continuation_rows(df, max_empty)
+    df.drop(index=rows_to_drop, inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return df
 
-    def is_empty(x):
-        return pd.isna(x) or str(x).strip() == ""
-    
-    def has_date_in_first_col(row):
-        """Check if first column contains a valid date"""
-        if df.empty or len(row) == 0:
-            return False
-        first_val = str(row.iloc[0]).strip()
-        if not first_val or first_val == "":
-            return False
-        return parse_date_universal(first_val) is not None
+def merge_continuation_rows(df, max_empty=2, base_row_idx=None, start=1):
+    """Fold continuation rows into the row above them, in place.
 
-    base_row_idx = None
+    Returns (rows_to_drop, base_row_idx). Passing base_row_idx/start lets a
+    caller resume the scan on the next chunk of a statement, with the last
+    base row carried over as row 0.
+    """
+    rows_to_drop = []
 
-    for i in range(1, len(df)):
+    for i in range(start, len(df)):
         row = df.iloc[i]
         
         # If row has a date in first column, it's a new transaction
-        if has_date_in_first_col(row):
+        if _has_date_in_first_col(row):
             base_row_idx = i
             continue
         
-        empty_count = sum(is_empty(v) for v in row)
+        empty_count = sum(_is_empty(v) for v in row)
 
         if empty_count <= max_empty:
             base_row_idx = i
@@ -342,10 +350,10 @@ def merge_multiline_transactions(df: pd.DataFrame, max_empty=2) -> pd.DataFrame:
             for col in df.columns:
                 curr_val = df.at[i, col]
 
-                if not is_empty(curr_val):
+                if not _is_empty(curr_val):
                     base_val = df.at[base_row_idx, col]
 
-                    if is_empty(base_val):
+                    if _is_empty(base_val):
                         df.at[base_row_idx, col] = str(curr_val).strip()
                     else:
                         df.at[base_row_idx, col] = (
@@ -354,10 +362,9 @@ def merge_multiline_transactions(df: pd.DataFrame, max_empty=2) -> pd.DataFrame:
 
             rows_to_drop.append(i)
 
-    df.drop(index=rows_to_drop, inplace=True)
-    df.reset_index(drop=True, inplace=True)
-    return df
+    return rows_to_drop, base_row_idx
 
+@time_function("bordered")
 def clean_extra_spaces(df):
     """Remove extra spaces from OCR text"""
     df = df.copy()
@@ -435,7 +442,7 @@ def main():
     else:
         pdf_doc = PDF(pdf_bytes)
     
-    ocr = PaddleOCR(lang="en")
+    ocr = create_engine(backend_for())
     
     pdf_tables = pdf_doc.extract_tables(
         ocr=ocr,
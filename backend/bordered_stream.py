@@ -0,0 +1,224 @@
+"""
+Bounded-memory, page-at-a-time post-processing for bordered statements
+process_bordered_pdf concatenates every table of every page and then
+copies the whole frame in each clean-up step. BorderedStream instead takes
+one table at a time and keeps only what crosses page boundaries:
+
+- the header (column names) and cheque column position; tables are held
+  back until a header row as strong as a repeated page header turns up, so
+  a partial header on page 1 does not win over the full one on page 2
+- the first rows until the opening balance check has run
+- the last three raw rows, which the closing balance / total checks need
+- the last transaction row, which may still receive continuation lines
+
+Finished rows are cleaned and appended to an on-disk spool.
+"""
+
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+from bordered import (
+    has_header_in_first_row,
+    has_transaction_in_first_row,
+    find_best_header_row,
+    process_header_and_duplicates,
+    is_repeated_header_row,
+    extract_opening_balance,
+    extract_closing_balance,
+    extract_transaction_total,
+    merge_continuation_rows,
+    clean_extra_spaces,
+    CHEQUE_NUMBER_REGEX
+)
+
+# Statements with at least this many pages use the streaming path (0 disables)
+STREAMING_MIN_PAGES = int(os.getenv('STREAMING_MIN_PAGES', 100))
+# Spooled rows stay in memory up to this size, then move to a temp file
+SPOOL_MEMORY_BYTES = int(os.getenv('STREAMING_SPOOL_MEMORY_MB', 16)) * 1024 * 1024
+
+# A weak header (fewer keywords than a repeated page header) is settled after this many rows
+HEADER_BUFFER_ROWS = int(os.getenv('STREAMING_HEADER_BUFFER_ROWS', 500))
+
+# extract_opening_balance looks at the first 5 rows, extract_closing_balance at the last 3
+OPENING_ROWS = 5
+TAIL_ROWS = 3
+
+class RowSpool:
+    """Append-only buffer of DataFrame chunks, spilling to disk when large"""
+
+    def __init__(self, max_memory=SPOOL_MEMORY_BYTES):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self.chunks = 0
+        self.rows = 0
+
+    def append(self, df):
+        if df.empty:
+            return
+        pickle.dump(df, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.chunks += 1
+        self.rows += len(df)
+
+    def read_all(self):
+        """Load every chunk back and close the spool"""
+        self._file.seek(0)
+        frames = [pickle.load(self._file) for _ in range(self.chunks)]
+        self._file.close()
+        return frames
+
+class BorderedStream:
+    """State carried across pages while streaming a bordered statement"""
+
+    def __init__(self):
+        self.cheque_column_index = None
+        self.first_table_columns = None
+        self.tables = 0
+        self.columns = None
+        self.header_buffer = []
+        self.raw_tail = None
+        self.opening_checked = False
+        self.opening_balance = None
+        self.pending = None
+        self.merged_any = False
+        self.spool = RowSpool()
+
+    def add_table(self, df):
+        """Same table selection and cheque column padding as process_bordered_pdf"""
+        has_header = has_header_in_first_row(df)
+        if not (has_header or has_transaction_in_first_row(df)):
+            return
+
+        if self.first_table_columns is None:
+            if has_header:
+                header_row = df.iloc[0].fillna("").astype(str).str.strip().tolist()
+            else:
+                header_row = df.columns.tolist()
+
+            for i, col in enumerate(header_row):
+                if CHEQUE_NUMBER_REGEX.search(str(col)):
+                    self.cheque_column_index = i
+                    break
+
+            self.first_table_columns = len(df.columns)
+        elif len(df.columns) == self.first_table_columns - 1 and self.cheque_column_index is not None:
+            df_list = df.values.tolist()
+            for row in df_list:
+                row.insert(self.cheque_column_index, "")
+            df = pd.DataFrame(df_list, columns=list(range(self.first_table_columns)))
+
+        self.tables += 1
+        self._add_rows(df.fillna(""))
+
+    def _add_rows(self, df):
+        if self.columns is None:
+            # Hold tables back until the header row is settled: process_bordered_pdf takes
+            # the best header of the whole statement, and once one matches as many keywords
+            # as a repeated page header every later copy is dropped the same way
+            self.header_buffer.append(df)
+            buffered = pd.concat(self.header_buffer, ignore_index=True).fillna("")
+            header_row_idx = find_best_header_row(buffered)
+            if header_row_idx is None:
+                return
+            if not is_repeated_header_row(buffered.iloc[header_row_idx]) and len(buffered) < HEADER_BUFFER_ROWS:
+                return
+            self._settle_header(buffered)
+            return
+        df = self._align(df)
+        repeated = [i for i, row in df.iterrows() if is_repeated_header_row(row)]
+        if repeated:
+            df = df.drop(index=repeated).reset_index(drop=True)
+        self._push(df)
+
+    def _settle_header(self, buffered):
+        self.header_buffer = []
+        df = process_header_and_duplicates(buffered)
+        self.columns = list(df.columns)
+        self._push(df)
+
+    def _align(self, df):
+        """Give a later table the header's column names"""
+        width = len(df.columns)
+        if width < len(self.columns):
+            df = df.reindex(columns=range(len(self.columns)), fill_value="")
+        elif width > len(self.columns):
+            # Wider than the header table: name extra columns like a blank header cell would be
+            for extra in range(len(self.columns), width):
+                name = ""
+                suffix = 0
+                while name in self.columns:
+                    suffix += 1
+                    name = f"_{suffix}"
+                self.columns.append(name)
+        df = df.copy()
+        df.columns = self.columns[:len(df.columns)]
+        return df
+
+    def _push(self, df):
+        tail = df if self.raw_tail is None else pd.concat([self.raw_tail, df], ignore_index=True).fillna("")
+
+        if not self.opening_checked:
+            if len(tail) < OPENING_ROWS:
+                self.raw_tail = tail
+                return
+            tail, self.opening_balance = extract_opening_balance(tail)
+            self.opening_checked = True
+
+        if len(tail) <= TAIL_ROWS:
+            self.raw_tail = tail
+            return
+
+        ready = tail.iloc[:-TAIL_ROWS]
+        self.raw_tail = tail.iloc[-TAIL_ROWS:].reset_index(drop=True)
+        self._merge(ready)
+
+    def _merge(self, ready, final=False):
+        if self.pending is not None:
+            frame = pd.concat([self.pending, ready], ignore_index=True).fillna("")
+            base_row_idx, start = 0, 1
+        else:
+            frame = ready.reset_index(drop=True)
+            # Row 0 of the statement is never a continuation line; later chunks are scanned in full
+            base_row_idx, start = None, (0 if self.merged_any else 1)
+        self.merged_any = True
+
+        rows_to_drop, base_row_idx = merge_continuation_rows(frame, base_row_idx=base_row_idx, start=start)
+        kept = frame.drop(index=rows_to_drop)
+
+        if base_row_idx is not None and not final:
+            # Every row after the last base row was folded into it, so it is the last kept row
+            self.pending = kept.loc[[base_row_idx]]
+            kept = kept.drop(index=base_row_idx)
+        else:
+            self.pending = None
+
+        if not kept.empty:
+            kept = clean_extra_spaces(kept.reset_index(drop=True))
+            self.spool.append(kept.replace(r'[^\x00-\x7F]+', '-', regex=True))
+
+    def finish(self):
+        """Flush the carried rows; returns (df, opening, closing, transaction_total)"""
+        if self.tables == 0:
+            return None, None, None, None
+
+        if self.header_buffer:
+            # Only a weak header, or none at all and the rows keep their positional columns
+            self._settle_header(pd.concat(self.header_buffer, ignore_index=True).fillna(""))
+
+        closing_balance = transaction_total = None
+        tail = self.raw_tail if self.raw_tail is not None else pd.DataFrame(columns=self.columns or [])
+        if not self.opening_checked:
+            tail, self.opening_balance = extract_opening_balance(tail)
+            self.opening_checked = True
+        tail, closing_balance = extract_closing_balance(tail)
+        tail, transaction_total = extract_transaction_total(tail)
+        if not tail.empty or self.pending is not None:
+            self._merge(tail, final=True)
+
+        frames = self.spool.read_all()
+        if frames:
+            final_df = pd.concat(frames, ignore_index=True).fillna("")
+        else:
+            final_df = pd.DataFrame(columns=self.columns or [])
+        return final_df, self.opening_balance, closing_balance, transaction_total
@@ -1,22 +1,15 @@
 import pandas as pd
 from img2table.document import PDF
-try:
-    from img2table.ocr import PaddleOCR
-except ImportError:
-    # Fallback to EasyOCR if PaddleOCR is not available
-    import easyocr
-    class PaddleOCR:
-        def __init__(self, lang="en"):
-            self.reader = easyocr.Reader([lang])
-        
-        def __call__(self, image):
-            return self.reader.readtext(image)
-
 from pathlib import Path
 import re
 import PyPDF2
 import io
 from dateutil import parser as date_parser
+from performance_analyzer import time_function
+from logging_config import get_logger
+from ocr_backends import create_engine, backend_for
+
+logger = get_logger("borderless")
 
 def safe_str(value):
     """Convert any value to string safely - prevents regex errors"""
@@ -253,6 +246,7 @@ def find_best_header_row(df, threshold=2):
     
     return best_row if best_row != -1 else None
 
+@time_function("borderless")
 def process_header_and_duplicates(df):
     if df.empty:
         return df
@@ -318,7 +312,7 @@ def extract_opening_balance(df):
                 
                 if balance_amount:
                     opening_balance = {'Balance': balance_amount, 'Source': 'Table'}
-                    print(f"[TABLE] Opening Balance: {opening_balance}")
+                    logger.debug("[TABLE] Opening Balance: %s", opening_balance)
                     df = df.iloc[idx+1:].reset_index(drop=True)
                     return df, opening_balance
     
@@ -345,7 +339,7 @@ def extract_closing_balance(df):
                 
                 if balance_amount:
                     closing_balance = {'Balance': balance_amount, 'Source': 'Table'}
-                    print(f"[TABLE] Closing Balance: {closing_balance}")
+                    logger.debug("[TABLE] Closing Balance: %s", closing_balance)
                     df = df.iloc[:idx].reset_index(drop=True)
                     return df, closing_balance
     
@@ -365,6 +359,7 @@ def extract_transaction_total(df):
     
     return df, None
 
+@time_function("borderless")
 def merge_multiline_transactions(df: pd.DataFrame, max_empty=5) -> pd.DataFrame:
     df = df.copy()
     rows_to_drop = []
@@ -403,6 +398,7 @@ def merge_multiline_transactions(df: pd.DataFrame, max_empty=5) -> pd.DataFrame:
     df.reset_index(drop=True, inplace=True)
     return df
 
+@time_function("borderless")
 def clean_extra_spaces(df):
     """Remove extra spaces from OCR text"""
     df = df.copy()
@@ -480,7 +476,7 @@ def main():
     else:
         pdf_doc = PDF(pdf_bytes)
     
-    ocr = PaddleOCR(lang="en")
+    ocr = create_engine(backend_for())
     
     pdf_tables = pdf_doc.extract_tables(
         ocr=ocr,
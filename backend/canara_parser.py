@@ -4,8 +4,90 @@ import pdfplumber
 from datetime import datetime
 import pandas as pd
 import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dateutil import parser as date_parser
+from performance_analyzer import time_function, measure
+from spooled_pdf import file_path
+from logging_config import get_logger
 
+logger = get_logger("canara_parser")
+
+# Statements with at least this many pages extract page text in worker processes (0 disables)
+CANARA_PARALLEL_MIN_PAGES = int(os.getenv('CANARA_PARALLEL_MIN_PAGES', 20))
+CANARA_TEXT_WORKERS = int(os.getenv('CANARA_TEXT_WORKERS', min(4, os.cpu_count() or 1)))
+
+_text_pool = None
+_text_pool_lock = threading.Lock()
+
+def _get_text_pool():
+    """One process pool for the life of the server, started on first use.
+
+    Workers come from a forkserver (spawn where there is none), never from a
+    fork of this multi-threaded server process: a forked child inherits
+    locks held by the logging, SMTP, bcrypt and OCR threads and can deadlock.
+    pdfplumber is pure Python, so threads would not run pages in parallel.
+    """
+    global _text_pool
+    with _text_pool_lock:
+        if _text_pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _text_pool = ProcessPoolExecutor(max_workers=CANARA_TEXT_WORKERS,
+                                             mp_context=multiprocessing.get_context(method))
+        return _text_pool
+
+def _discard_text_pool(pool):
+    global _text_pool
+    with _text_pool_lock:
+        if _text_pool is pool:
+            _text_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _plumber_input(pdf_source):
+    """pdfplumber opens paths and file objects - never a shared temp file"""
+    path = file_path(pdf_source)
+    if path is not None:
+        return path
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(pdf_source)
+    pdf_source.seek(0)
+    return pdf_source
+
+def _extract_page_range(pdf_source, start, stop, password=None):
+    # Runs in a worker process: each one opens its own copy of the document
+    with pdfplumber.open(_plumber_input(pdf_source), password=password) as pdf:
+        return [pdf.pages[i].extract_text() for i in range(start, stop)]
+
+def extract_page_texts(pdf_source, password=None):
+    """Text of every page, in order; large statements are split across processes"""
+    with pdfplumber.open(_plumber_input(pdf_source), password=password) as pdf:
+        page_count = len(pdf.pages)
+        workers = min(CANARA_TEXT_WORKERS, page_count)
+        if not CANARA_PARALLEL_MIN_PAGES or page_count < CANARA_PARALLEL_MIN_PAGES or workers < 2:
+            return [page.extract_text() for page in pdf.pages]
+    
+    # Workers get a path, or the raw bytes - buffers cannot be pickled
+    if file_path(pdf_source) is None and not isinstance(pdf_source, bytes):
+        pdf_source.seek(0)
+        pdf_source = pdf_source.read()
+    
+    # Twice as many chunks as workers evens out pages of different density
+    chunk = -(-page_count // (workers * 2))
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+    pool = _get_text_pool()
+    try:
+        futures = [pool.submit(_extract_page_range, pdf_source, start, stop, password) for start, stop in ranges]
+        return [text for future in futures for text in future.result()]
+    except BrokenProcessPool as e:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        logger.warning("Canara text workers failed, extracting in-process: %s", e)
+        _discard_text_pool(pool)
+        return _extract_page_range(pdf_source, 0, page_count, password)
+
+@time_function("canara_parser")
 def merge_multiline_transactions(df: pd.DataFrame, max_empty=2) -> pd.DataFrame:
     """Merge multiline transactions - same logic as other parsers"""
     df = df.copy()
@@ -44,6 +126,7 @@ def merge_multiline_transactions(df: pd.DataFrame, max_empty=2) -> pd.DataFrame:
     df.reset_index(drop=True, inplace=True)
     return df
 
+@time_function("canara_parser")
 def convert_date_columns(df):
     """Convert date columns to datetime type"""
     if df is None or df.empty:
@@ -60,9 +143,9 @@ def convert_date_columns(df):
                     if pd.notna(x) and str(x).strip() not in ['', '-', 'nan'] 
                     else pd.NaT
                 )
-                print(f"[DATE] Converted column '{col}' to datetime")
+                logger.debug("[DATE] Converted column '%s' to datetime", col)
             except Exception as e:
-                print(f"[DATE] Failed to convert column '{col}': {e}")
+                logger.warning("[DATE] Failed to convert column '%s': %s", col, e)
     
     return df
 
@@ -75,110 +158,115 @@ class Transaction:
         self.balance = balance
         self.bank_name = bank_name
 
+# Line patterns, compiled once per process
+DATE_LINE_REGEX = re.compile(r'\d{2}-\d{2}-\d{4}')
+PAGE_FOOTER_REGEX = re.compile(r'^page\s+\d+$', re.IGNORECASE)
+OPENING_BALANCE_REGEX = re.compile(r'Opening Balance\s+([0-9,]+\.?\d*)')
+AMOUNT_REGEX = re.compile(r'([0-9,]+\.\d{2})')
+AMOUNT_ONLY_REGEX = re.compile(r'^[0-9,]+\.\d{2}$')
+DEBIT_KEYWORDS = ('UPI/DR', 'NACH', 'WITHDRAWAL', 'ATM', 'DEBIT', '/DR/')
+
 class CanaraBankTransactionParser:
-    def parse_transactions(self, pdf_path, password=None):
+    @time_function("canara_parser")
+    def parse_transactions(self, pdf_source, password=None):
+        """pdf_source: bytes, a file object, a path or a SpooledPDF"""
         all_transactions = []
         
-        with pdfplumber.open(pdf_path, password=password) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                transactions = self._extract_from_text(text)
-                all_transactions.extend(transactions)
+        with measure("canara_parser.extract_text"):
+            page_texts = extract_page_texts(pdf_source, password)
+        
+        # Only the first page prints an opening balance; later pages continue from the last balance seen
+        balance = None
+        for text in page_texts:
+            transactions, balance = self._extract_from_text(text, balance)
+            all_transactions.extend(transactions)
         
         return all_transactions
     
-    def _extract_from_text(self, text):
-        transactions = []
-        lines = text.split('\n')
-        
-        # Filter out page headers
-        filtered_lines = []
-        for line in lines:
+    def _tokenize(self, text):
+        """Strip each line once, drop page footers and flag the line kinds the parser needs"""
+        tokens = []
+        for line in text.split('\n'):
             line = line.strip()
-            if not re.match(r'^page\s+\d+$', line, re.IGNORECASE):
-                filtered_lines.append(line)
-        lines = filtered_lines
+            if PAGE_FOOTER_REGEX.match(line):
+                continue
+            tokens.append((
+                line,
+                DATE_LINE_REGEX.match(line) is not None,
+                line.startswith('Chq:'),
+                'Date Particulars' in line or 'Opening Balance' in line,
+                'Closing Balance' in line
+            ))
+        return tokens
+    
+    def _extract_from_text(self, text, prev_balance=None):
+        """Transactions on one page and the balance after them.
         
-        # Get opening balance from first page
-        prev_balance = None
+        A transaction is the description lines since the last Chq:, date or
+        header line, its date line, and everything after it up to the next
+        Chq: line (inclusive), date line or Closing Balance line.
+        """
+        transactions = []
+        tokens = self._tokenize(text)
+        lines = [token[0] for token in tokens]
+        
+        # An opening balance on this page overrides the one carried over
         for line in lines:
             if 'Opening Balance' in line:
-                balance_match = re.search(r'Opening Balance\s+([0-9,]+\.?\d*)', line)
+                balance_match = OPENING_BALANCE_REGEX.search(line)
                 if balance_match:
                     prev_balance = self._parse_amount(balance_match.group(1))
                 break
         
-        # Find start of transactions (after header/opening balance)
-        start_idx = 0
-        for i, line in enumerate(lines):
-            if ('Date Particulars' in line or 'Opening Balance' in line or 
-                re.match(r'\d{2}-\d{2}-\d{4}', line.strip())):
-                if 'Date Particulars' in line or 'Opening Balance' in line:
-                    start_idx = i + 1
-                else:
-                    start_idx = i
-                break
+        started = False
+        desc_start = 0     # first line after the last Chq:/date/header line
+        block_start = None # first line of the open transaction
+        date_idx = None    # date line of the open transaction
         
-        # Collect transaction blocks
-        i = start_idx
-        while i < len(lines):
-            line = lines[i].strip()
+        for k, (line, is_date, is_chq, is_header, is_closing) in enumerate(tokens):
+            # Transactions start after the column header / opening balance, or at the first date
+            if not started:
+                if not (is_header or is_date):
+                    continue
+                started = True
+                desc_start = k
             
-            # Look for date pattern
-            if re.match(r'\d{2}-\d{2}-\d{4}', line):
-                # Found date line, now collect the complete transaction
-                date_line_idx = i
-                
-                # Collect description lines before the date (going backwards)
-                desc_start_idx = date_line_idx
-                for j in range(date_line_idx - 1, start_idx - 1, -1):
-                    prev_line = lines[j].strip()
-                    if (prev_line.startswith('Chq:') or 
-                        re.match(r'\d{2}-\d{2}-\d{4}', prev_line) or
-                        'Date Particulars' in prev_line or
-                        'Opening Balance' in prev_line):
-                        break
-                    desc_start_idx = j
-                
-                # Collect all lines from description start to Chq: line
-                tx_lines = []
-                for k in range(desc_start_idx, len(lines)):
-                    tx_lines.append(lines[k])
-                    if lines[k].strip().startswith('Chq:'):
-                        i = k + 1
-                        break
-                    if (k > date_line_idx and 
-                        (re.match(r'\d{2}-\d{2}-\d{4}', lines[k].strip()) or
-                         'Closing Balance' in lines[k])):
-                        i = k
-                        break
-                else:
-                    i = len(lines)
-                
-                tx = self._parse_transaction(tx_lines, prev_balance, date_line_idx - desc_start_idx)
+            if date_idx is not None and (is_chq or is_date or is_closing):
+                tx = self._parse_transaction(lines[block_start:k + 1], prev_balance, date_idx - block_start)
                 if tx:
                     transactions.append(tx)
                     prev_balance = tx.balance
-            else:
-                i += 1
+                date_idx = None
+            
+            if is_date:
+                block_start, date_idx = desc_start, k
+            
+            if is_date or is_chq or is_header:
+                desc_start = k + 1
+        
+        if date_idx is not None:
+            tx = self._parse_transaction(lines[block_start:], prev_balance, date_idx - block_start)
+            if tx:
+                transactions.append(tx)
+                prev_balance = tx.balance
         
-        return transactions
+        return transactions, prev_balance
     
     def _parse_transaction(self, lines, prev_balance, date_line_idx):
         try:
             # Find the date line
             date_line = lines[date_line_idx]
-            date_match = re.match(r'(\d{2}-\d{2}-\d{4})', date_line)
+            date_match = DATE_LINE_REGEX.match(date_line)
             if not date_match:
                 return None
             
-            date_str = date_match.group(1)
+            date_str = date_match.group(0)
             date = self._parse_date(date_str)
             if not date:
                 return None
             
             # Extract amounts from the date line
-            date_line_amounts = re.findall(r'([0-9,]+\.\d{2})', date_line)
+            date_line_amounts = AMOUNT_REGEX.findall(date_line)
             
             if len(date_line_amounts) < 1:
                 return None
@@ -189,7 +277,7 @@ class CanaraBankTransactionParser:
             # Determine transaction amount and type
             debit = 0
             credit = 0
-            full_text = ' '.join(lines)
+            full_text = ' '.join(lines).upper()
             
             if len(date_line_amounts) >= 2:
                 transaction_amount = self._parse_amount(date_line_amounts[-2])
@@ -202,12 +290,12 @@ class CanaraBankTransactionParser:
                         else:
                             credit = diff
                     else:
-                        if any(keyword in full_text.upper() for keyword in ['UPI/DR', 'NACH', 'WITHDRAWAL', 'ATM', 'DEBIT', '/DR/']):
+                        if any(keyword in full_text for keyword in DEBIT_KEYWORDS):
                             debit = transaction_amount
                         else:
                             credit = transaction_amount
                 else:
-                    if any(keyword in full_text.upper() for keyword in ['UPI/DR', 'NACH', 'WITHDRAWAL', 'ATM', 'DEBIT', '/DR/']):
+                    if any(keyword in full_text for keyword in DEBIT_KEYWORDS):
                         debit = transaction_amount
                     else:
                         credit = transaction_amount
@@ -224,11 +312,11 @@ class CanaraBankTransactionParser:
             # Add description lines before date
             for i in range(date_line_idx):
                 line = lines[i].strip()
-                if line and not re.match(r'^[0-9,]+\.\d{2}$', line):
+                if line and not AMOUNT_ONLY_REGEX.match(line):
                     description_parts.append(line)
             
             # Add any description from date line (after removing date and amounts)
-            desc_line = re.sub(r'\d{2}-\d{2}-\d{4}', '', date_line)
+            desc_line = DATE_LINE_REGEX.sub('', date_line)
             for amount in date_line_amounts:
                 desc_line = desc_line.replace(amount, '')
             desc_line = desc_line.strip()
@@ -238,7 +326,7 @@ class CanaraBankTransactionParser:
             # Add lines after date up to and including Chq: line
             for i in range(date_line_idx + 1, len(lines)):
                 line = lines[i].strip()
-                if line and not re.match(r'^[0-9,]+\.\d{2}$', line):
+                if line and not AMOUNT_ONLY_REGEX.match(line):
                     description_parts.append(line)
                     if line.startswith('Chq:'):
                         break
@@ -270,16 +358,15 @@ class CanaraBankTransactionParser:
         except:
             return 0.0
 
-def process_canara_pdf(pdf_bytes, filename):
-    """Process Canara Bank PDF and return DataFrame with transaction data"""
+def process_canara_pdf(pdf_source, filename, bank=None):
+    """Process Canara Bank PDF and return DataFrame with transaction data
+
+    Reads the text layer only; bank is accepted like the other parsers take it.
+    """
     parser = CanaraBankTransactionParser()
     
-    # Save bytes to temporary file for pdfplumber
-    with open('temp_canara.pdf', 'wb') as f:
-        f.write(pdf_bytes)
-    
     try:
-        transactions = parser.parse_transactions('temp_canara.pdf')
+        transactions = parser.parse_transactions(pdf_source)
         
         if not transactions:
             return None, None, None, None
@@ -317,11 +404,5 @@ def process_canara_pdf(pdf_bytes, filename):
         return df, opening_balance, closing_balance, None
         
     except Exception as e:
-        return None, None, None, None
-    finally:
-        # Clean up temp file
-        try:
-            import os
-            os.remove('temp_canara.pdf')
-        except:
-            pass
\ No newline at end of file
+        logger.warning("Canara parsing failed: %s", e)
+        return None, None, None, None
\ No newline at end of file
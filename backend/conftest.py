@@ -0,0 +1,20 @@
+"""
+Shared pytest fixtures for the backend tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+@pytest.fixture
+def without_ocr(monkeypatch):
+    """Parse statements with ocr=None: text-layer pages are read from the PDF, no OCR model is loaded"""
+    import bankDetector
+    from ocr_pool import OCRPool
+    pool = OCRPool(size=1, factory=lambda: None)
+    monkeypatch.setattr(bankDetector, "pool_for", lambda bank=None: pool)
+    return pool
@@ -2,6 +2,7 @@ from flask import request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from models.user import User
 from otp_service import otp_service
+from password_hasher import PasswordHasherBusy
 import re
 
 # JWT blacklist for logout
@@ -88,7 +89,10 @@ def signup():
             return jsonify({'error': 'Valid WhatsApp number is required'}), 400
         
         # Create user
-        user_id = User.create_user(email, password, name, phone)
+        try:
+            user_id = User.create_user(email, password, name, phone)
+        except PasswordHasherBusy as e:
+            return jsonify({'error': 'Server is busy, please try again shortly'}), 503, {'Retry-After': str(e.retry_after)}
         if not user_id:
             return jsonify({'error': 'User already exists'}), 409
         
@@ -129,8 +133,13 @@ def login():
             return jsonify({'error': 'Invalid credentials'}), 401
         
         # Verify password
-        if not User.verify_password(user['password'], password):
-            return jsonify({'error': 'Invalid credentials'}), 401
+        try:
+            if not User.verify_password(user['password'], password):
+                return jsonify({'error': 'Invalid credentials'}), 401
+        except PasswordHasherBusy as e:
+            return jsonify({'error': 'Server is busy, please try again shortly'}), 503, {'Retry-After': str(e.retry_after)}
+        
+        User.rehash_password_if_needed(str(user['_id']), user['password'], password)
         
         # Create access token
         access_token = create_access_token(identity=str(user['_id']))
@@ -0,0 +1,29 @@
+"""
+Where the service writes the files it generates
+Traces, learned layout templates, the OCR backend choice and benchmark
+reports go under LEDGERIT_DATA_DIR instead of next to the source or into
+whatever directory the server was started in. The directory is created
+when something is first written there.
+
+    LEDGERIT_DATA_DIR     default backend/instance (git-ignored)
+
+File names given in the other settings (LEDGERIT_TRACE_FILE, ...) are
+resolved against it unless they are absolute.
+"""
+
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATA_DIR = Path(os.getenv('LEDGERIT_DATA_DIR') or Path(__file__).parent / 'instance').resolve()
+
+def data_path(name):
+    """Absolute path for a generated file; relative names are placed under DATA_DIR"""
+    return str(DATA_DIR / name)
+
+def ensure_parent(path):
+    """Create the directory path will be written to"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    return path
@@ -2,9 +2,12 @@ from pymongo import MongoClient
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from logging_config import get_logger
 
 load_dotenv()
 
+logger = get_logger("database")
+
 class Database:
     _instance = None
     _client = None
@@ -24,9 +27,9 @@ class Database:
             mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/ledgerit')
             self._client = MongoClient(mongodb_uri)
             self._db = self._client.get_database()
-            print("Connected to MongoDB successfully")
+            logger.info("Connected to MongoDB successfully")
         except Exception as e:
-            print(f"Failed to connect to MongoDB: {e}")
+            logger.error("Failed to connect to MongoDB: %s", e)
             raise e
     
     def get_db(self):
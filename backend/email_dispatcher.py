@@ -0,0 +1,181 @@
+import os
+import queue
+import smtplib
+import threading
+import time
+from dotenv import load_dotenv
+from logging_config import get_logger
+
+load_dotenv()
+
+logger = get_logger("email")
+
+# Errors worth retrying: dropped connections, timeouts and 4xx replies.
+# Refused recipients and bad credentials will not fix themselves.
+PERMANENT_SMTP_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError)
+
+class SMTPConnectionPool:
+    """Keeps logged-in SMTP connections alive between sends and reconnects on failure"""
+
+    def __init__(self, server, port, user=None, password=None, size=2, use_tls=True, timeout=30):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        if self.use_tls:
+            conn.starttls()
+        if self.user and self.password:
+            conn.login(self.user, self.password)
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def acquire(self):
+        """Return a live connection, reusing an idle one when the server still answers NOOP"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            try:
+                if conn.noop()[0] == 250:
+                    return conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close(conn)
+
+    def release(self, conn, healthy=True):
+        if not healthy:
+            self._close(conn)
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._close(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+class EmailDispatcher:
+    """Sends email from background threads so HTTP handlers never wait on SMTP"""
+
+    def __init__(self, pool, queue_size=100, workers=2, max_retries=3, retry_backoff=1.0):
+        self.pool = pool
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'retried': 0, 'dropped': 0}
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"email-dispatcher-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, msg):
+        """Queue a message for delivery. Returns False when the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait(msg)
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stop(self, timeout=10):
+        """Drain pending messages, stop the workers and close pooled connections"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+        self.pool.close_all()
+
+    def _worker(self):
+        while True:
+            msg = self._queue.get()
+            try:
+                if msg is None:
+                    return
+                self._deliver(msg)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, msg):
+        for attempt in range(self.max_retries + 1):
+            conn = None
+            try:
+                conn = self.pool.acquire()
+                conn.send_message(msg)
+                self.pool.release(conn)
+                self._count('sent')
+                return True
+            except PERMANENT_SMTP_ERRORS as e:
+                if conn is not None:
+                    self.pool.release(conn, healthy=False)
+                logger.error("Email error (not retrying) for %s: %s", msg['To'], e)
+                break
+            except (smtplib.SMTPException, OSError) as e:
+                if conn is not None:
+                    self.pool.release(conn, healthy=False)
+                if attempt == self.max_retries:
+                    logger.error("Email error for %s: %s", msg['To'], e)
+                    break
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning("Email error for %s: %s - retrying in %.1fs", msg['To'], e, delay)
+                self._count('retried')
+                time.sleep(delay)
+
+        self._count('failed')
+        return False
+
+def create_dispatcher_from_env():
+    """Build a dispatcher from the SMTP_* / EMAIL_* environment settings"""
+    pool = SMTPConnectionPool(
+        server=os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+        port=int(os.getenv('SMTP_PORT', 587)),
+        user=os.getenv('EMAIL_USER'),
+        password=os.getenv('EMAIL_PASSWORD'),
+        size=int(os.getenv('SMTP_POOL_SIZE', 2)),
+        use_tls=os.getenv('SMTP_USE_TLS', 'true').lower() != 'false',
+        timeout=int(os.getenv('SMTP_TIMEOUT', 30))
+    )
+    return EmailDispatcher(
+        pool,
+        queue_size=int(os.getenv('EMAIL_QUEUE_SIZE', 100)),
+        workers=int(os.getenv('EMAIL_WORKERS', 2)),
+        max_retries=int(os.getenv('EMAIL_MAX_RETRIES', 3)),
+        retry_backoff=float(os.getenv('EMAIL_RETRY_BACKOFF', 1.0))
+    )
@@ -1,15 +1,13 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, g
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, create_access_token
 from flask_bcrypt import Bcrypt
 import io
-import pandas as pd
-import PyPDF2
+import functools
 import xml.etree.ElementTree as ET
 from datetime import datetime
 import re
-import sys
-import importlib
+import time
 from dotenv import load_dotenv
 import os
 
@@ -21,6 +19,13 @@ from routes.auth_routes import auth_bp
 from routes.subscription_routes import subscription_bp
 from controllers.auth_controller import check_token_blacklist
 from models.user import User
+from admission import ocr_admission, AdmissionRejected
+from performance_analyzer import time_function
+from metrics import record_parse, render_prometheus
+from tracing import traced, start_span, current_span
+from logging_config import get_logger
+
+logger = get_logger("flask_app")
 
 def clean_xml_text(text):
     """Remove invalid XML characters"""
@@ -34,33 +39,16 @@ def clean_xml_text(text):
     cleaned = ''.join(char for char in cleaned if ord(char) < 65534)
     return cleaned.strip()
 
-# Force reload modules
-if 'ifsc_detector' in sys.modules:
-    importlib.reload(sys.modules['ifsc_detector'])
-if 'bankDetector' in sys.modules:
-    importlib.reload(sys.modules['bankDetector'])
-if 'bordered' in sys.modules:
-    importlib.reload(sys.modules['bordered'])
-
-from bankDetector import detect_bank_from_pdf, classify_bank_type, process_bordered_pdf, process_borderless_pdf, decrypt_pdf_bytes
-
-try:
-    from jk_parser import process_jk_pdf
-except ImportError:
-    def process_jk_pdf(pdf_bytes, filename):
-        return None, None, None, None
-
-try:
-    from indian_parser import process_indian_pdf
-except ImportError:
-    def process_indian_pdf(pdf_bytes, filename):
-        return None, None, None, None
+@functools.lru_cache(maxsize=None)
+def parsing_stack():
+    """Import the PDF/OCR parsing modules on first use.
 
-try:
-    from canara_parser import process_canara_pdf
-except ImportError:
-    def process_canara_pdf(pdf_bytes, filename):
-        return None, None, None, None
+    bankDetector pulls in PyMuPDF, OpenCV, img2table, PaddleOCR and the bank
+    specific parsers. Keeping it out of module import lets auth and
+    subscription only workers start in well under a second.
+    """
+    import bankDetector
+    return bankDetector
 
 app = Flask(__name__)
 CORS(app)
@@ -80,15 +68,36 @@ def check_if_token_revoked(jwt_header, jwt_payload):
 app.register_blueprint(auth_bp)
 app.register_blueprint(subscription_bp)
 
+def keep_until_teardown(spool):
+    """Delete a request's spooled PDF once the request ends, however it ends"""
+    g.setdefault('pdf_spools', []).append(spool)
+    return spool
+
+@app.teardown_request
+def close_pdf_spools(exc):
+    for spool in g.pop('pdf_spools', []):
+        spool.close()
+
 @app.route('/')
 def home():
     return jsonify({'message': 'Bank Statement API is running'})
 
+@app.route('/metrics')
+def metrics():
+    # Optional shared secret so the scrape endpoint is not public
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/test')
 def test():
     return jsonify({'status': 'API is working'})
 
+@time_function("flask_app")
 def parse_transactions(df):
+    import pandas as pd
+    
     if df is None or df.empty:
         return [], []
     
@@ -128,14 +137,36 @@ def parse_transactions(df):
     
     return transactions, column_names
 
+def run_parser(parser, bank_type, standardized_name, pdf_source, filename):
+    """Dispatch to the parser for bank_type; returns (df, opening, closing, total)"""
+    if bank_type in ["jk_bank", "indian_bank", "canara_bank"]:
+        if bank_type == "jk_bank":
+            logger.info("%s detected, using JK parser", standardized_name)
+            return parser.process_jk_pdf(pdf_source, filename, bank=standardized_name)
+        elif bank_type == "indian_bank":
+            logger.info("%s detected, using Indian Bank parser", standardized_name)
+            return parser.process_indian_pdf(pdf_source, filename, bank=standardized_name)
+        else:
+            logger.info("%s detected, using Canara Bank parser", standardized_name)
+            return parser.process_canara_pdf(pdf_source, filename, bank=standardized_name)
+    elif bank_type == "bordered":
+        logger.info("Calling process_bordered_pdf")
+        return parser.process_bordered_pdf(pdf_source, filename, bank=standardized_name)
+    else:
+        logger.info("Calling process_borderless_pdf")
+        return parser.process_borderless_pdf(pdf_source, filename, bank=standardized_name)
+
 @app.route('/upload', methods=['POST'])
 @jwt_required()
+@traced("upload")
 def upload_file():
     try:
         user_id = get_jwt_identity()
         
         # Check subscription status first
-        if not User.check_subscription_status(user_id):
+        with start_span("mongo.check_subscription_status"):
+            subscription_ok = User.check_subscription_status(user_id)
+        if not subscription_ok:
             return jsonify({
                 'error': 'Subscription expired or page limit reached',
                 'redirect': '/subscription'
@@ -147,78 +178,84 @@ def upload_file():
         file = request.files['file']
         password = request.form.get('password', '')
         
-        pdf_bytes = file.read()
+        from spooled_pdf import SpooledPDF, open_reader
+        parser = parsing_stack()
+        
+        # Spool to disk instead of holding the upload (and its decrypted copy) in memory
+        pdf_source = keep_until_teardown(SpooledPDF.from_stream(file.stream))
         
         # Handle password protection and count pages after decryption
         try:
-            reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+            reader = open_reader(pdf_source)
             if reader.is_encrypted:
                 # Try empty password first (some PDFs report as encrypted but don't need password)
                 if reader.decrypt('') == 0:  # Empty password failed
                     if not password:
                         return jsonify({'error': 'PDF is password protected'}), 401
                     
-                    decrypted_bytes = decrypt_pdf_bytes(pdf_bytes, password)
-                    if decrypted_bytes is None:
+                    decrypted = parser.decrypt_pdf(pdf_source, password)
+                    if decrypted is None:
                         return jsonify({'error': 'Wrong password'}), 401
-                    pdf_bytes = decrypted_bytes
+                    pdf_source = keep_until_teardown(decrypted)
                     
                     # Count pages after successful decryption
-                    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+                    reader = open_reader(pdf_source)
             
             page_count = len(reader.pages)
+            current_span().set_attributes(filename=file.filename, pages=page_count)
         except UnicodeDecodeError:
             return jsonify({'error': 'PDF file is corrupted or has encoding issues'}), 400
         except Exception as e:
             return jsonify({'error': f'Invalid PDF file: {str(e)}'}), 400
         
         # Validate bank statement BEFORE updating page count
-        bank_name = detect_bank_from_pdf(pdf_bytes)
+        bank_name = parser.detect_bank_from_pdf(pdf_source)
         if not bank_name:
             return jsonify({'error': 'Could not detect bank name. Please upload a valid bank statement.'}), 400
         
-        bank_type, standardized_name = classify_bank_type(bank_name)
-        print(f"\nDEBUG: bank_type={bank_type}, standardized_name={standardized_name}")
+        bank_type, standardized_name = parser.classify_bank_type(bank_name)
+        logger.debug("bank_type=%s, standardized_name=%s", bank_type, standardized_name)
         
         if not bank_type:
             bank_type = "bordered"
+        current_span().set_attributes(bank=standardized_name or bank_name, bank_type=bank_type)
         
-        # Process bank statement based on type
-        if bank_type in ["jk_bank", "indian_bank", "canara_bank"]:
-            if bank_type == "jk_bank":
-                print(f">>> {standardized_name} detected, using JK parser <<<")
-                df, opening_balance, closing_balance, transaction_total = process_jk_pdf(pdf_bytes, file.filename)
-            elif bank_type == "indian_bank":
-                print(f">>> {standardized_name} detected, using Indian Bank parser <<<")
-                df, opening_balance, closing_balance, transaction_total = process_indian_pdf(pdf_bytes, file.filename)
-            else:
-                print(f">>> {standardized_name} detected, using Canara Bank parser <<<")
-                df, opening_balance, closing_balance, transaction_total = process_canara_pdf(pdf_bytes, file.filename)
-        elif bank_type == "bordered":
-            print(">>> Calling process_bordered_pdf <<<")
-            df, opening_balance, closing_balance, transaction_total = process_bordered_pdf(pdf_bytes, file.filename)
-        else:
-            print(">>> Calling process_borderless_pdf <<<")
-            df, opening_balance, closing_balance, transaction_total = process_borderless_pdf(pdf_bytes, file.filename)
+        # Process bank statement based on type - OCR runs behind the admission controller
+        try:
+            with ocr_admission.slot(user_id):
+                parse_start = time.perf_counter()
+                df = None
+                try:
+                    with start_span("parse", bank=standardized_name or bank_name, bank_type=bank_type,
+                                    pages=page_count) as span:
+                        df, opening_balance, closing_balance, transaction_total = run_parser(
+                            parser, bank_type, standardized_name, pdf_source, file.filename)
+                        span.set_attribute('rows', 0 if df is None else len(df))
+                finally:
+                    record_parse(standardized_name or bank_name, bank_type, page_count,
+                                 time.perf_counter() - parse_start, df is not None and not df.empty)
+        except AdmissionRejected as e:
+            response = jsonify({'error': 'Server is busy processing other statements, please retry shortly'})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
         
         # Validate that transactions were found
         if df is None or df.empty:
             return jsonify({'error': 'No transactions found in the PDF. Please ensure this is a valid bank statement with transaction tables.'}), 400
         
         # Only update page count AFTER successful validation and processing
-        User.update_pages_used(user_id, page_count)
+        with start_span("mongo.update_pages_used", pages=page_count):
+            User.update_pages_used(user_id, page_count)
         
-        print("\n" + "="*80)
-        print(f"Uploaded: {file.filename}")
-        print(f"Bank: {bank_name} | Type: {bank_type}")
-        print("="*80)
-        print(df)
-        print("="*80 + "\n")
+        logger.info("Uploaded: %s | Bank: %s | Type: %s | Rows: %d", file.filename, bank_name, bank_type, len(df))
+        # DataFrame repr is only built when DEBUG is enabled
+        logger.debug("Parsed transactions:\n%s", df)
         
         transactions, column_names = parse_transactions(df)
         
         # Get updated user stats
-        user_stats = User.get_user_stats(user_id)
+        with start_span("mongo.get_user_stats"):
+            user_stats = User.get_user_stats(user_id)
         
         # Extract opening and closing balance values
         opening_bal_value = None
@@ -226,15 +263,15 @@ def upload_file():
         
         if opening_balance and 'Balance' in opening_balance:
             opening_bal_value = opening_balance['Balance']
-            print(f"[DEBUG] Backend opening balance: {opening_bal_value}")
+            logger.debug("Backend opening balance: %s", opening_bal_value)
         else:
-            print("[DEBUG] No opening balance from backend")
+            logger.debug("No opening balance from backend")
         
         if closing_balance and 'Balance' in closing_balance:
             closing_bal_value = closing_balance['Balance']
-            print(f"[DEBUG] Backend closing balance: {closing_bal_value}")
+            logger.debug("Backend closing balance: %s", closing_bal_value)
         else:
-            print("[DEBUG] No closing balance from backend")
+            logger.debug("No closing balance from backend")
         
         return jsonify({
             'transactions': transactions,
@@ -251,10 +288,13 @@ def upload_file():
         })
         
     except Exception as e:
+        logger.exception("Upload failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/export/csv', methods=['POST'])
 def export_csv():
+    import pandas as pd
+    
     try:
         data = request.json
         transactions = data.get('transactions', [])
@@ -0,0 +1,48 @@
+"""
+gunicorn settings for the OCR API
+The app is imported in the master with LEDGERIT_PRELOAD=true, which loads the
+OCR model, reference logos and compiled patterns once. Workers then share
+those pages copy-on-write instead of each loading their own copy.
+
+With LEDGERIT_METRICS_DIR set, each worker's metrics snapshot is removed when
+it exits and the directory is emptied when the master starts, so /metrics only
+sums the workers that are alive.
+"""
+
+import gc
+import os
+
+os.environ.setdefault('LEDGERIT_PRELOAD', 'true')
+
+wsgi_app = 'wsgi:app'
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# One request thread per pooled OCR engine, so a worker serves uploads concurrently
+threads = int(os.getenv('GUNICORN_THREADS', os.getenv('OCR_POOL_SIZE', 2)))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+preload_app = True
+
+METRICS_DIR = os.getenv('LEDGERIT_METRICS_DIR')
+
+def on_starting(server):
+    if METRICS_DIR:
+        from performance_analyzer import clear_snapshots
+        clear_snapshots(METRICS_DIR)
+
+def when_ready(server):
+    # Move everything loaded so far into the permanent generation so the
+    # collector never touches (and un-shares) those pages in the workers
+    gc.collect()
+    gc.freeze()
+
+def post_fork(server, worker):
+    # The warm-up inference runs per worker: OpenMP thread pools started in
+    # the master do not survive fork, so only the weights are loaded there.
+    if os.getenv('LEDGERIT_WARMUP', 'true').lower() == 'true':
+        from warmup import warm_up
+        warm_up()
+
+def child_exit(server, worker):
+    if METRICS_DIR:
+        from performance_analyzer import remove_snapshot
+        remove_snapshot(METRICS_DIR, worker.pid)
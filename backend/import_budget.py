@@ -0,0 +1,74 @@
+"""
+Import-time budget check for API-only processes
+Fails when `import flask_app` is slower than the budget or drags in the parsing stack
+Usage: python import_budget.py [budget_seconds]
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules that belong to the OCR/PDF parsing stack and must load lazily
+HEAVY_MODULES = [
+    'pandas', 'numpy', 'PyPDF2', 'fitz', 'cv2', 'img2table', 'paddleocr', 'paddle',
+    'easyocr', 'pdfplumber', 'bankDetector', 'bordered', 'borderless',
+    'jk_parser', 'indian_parser', 'canara_parser'
+]
+
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import flask_app
+elapsed = time.perf_counter() - start
+print(json.dumps({'elapsed': elapsed, 'heavy': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+def parse_importtime(stderr, top=15):
+    """Return the slowest modules from `python -X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line.split(':', 1)[1].split('|')
+        try:
+            rows.append((int(fields[1]), int(fields[0]), fields[2].strip()))
+        except ValueError:
+            continue
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def check_import_budget(budget_seconds=1.0):
+    """Import flask_app in a fresh interpreter and compare against the budget"""
+    backend_dir = Path(__file__).parent
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+        cwd=backend_dir, capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        return False
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print(f"\n{'='*80}")
+    print(f"flask_app import time: {report['elapsed']:.3f}s (budget {budget_seconds:.3f}s)")
+    print(f"{'='*80}\n")
+    for cumulative_us, self_us, name in parse_importtime(result.stderr):
+        print(f"{cumulative_us / 1e6:8.3f}s  {name}")
+
+    ok = True
+    if report['heavy']:
+        print(f"\nFAIL: parsing stack imported eagerly: {', '.join(report['heavy'])}")
+        ok = False
+    if report['elapsed'] > budget_seconds:
+        print(f"\nFAIL: import took {report['elapsed']:.3f}s, budget is {budget_seconds:.3f}s")
+        ok = False
+    if ok:
+        print("\nOK: API-only import is within budget")
+    return ok
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else float(os.getenv('IMPORT_BUDGET_SECONDS', 1.0))
+    sys.exit(0 if check_import_budget(budget) else 1)
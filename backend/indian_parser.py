@@ -1,12 +1,14 @@
 import pandas as pd
 import re
-from img2table.document import PDF
-from img2table.ocr import PaddleOCR
 from dateutil import parser as date_parser
+from performance_analyzer import time_function, measure
+import page_pipeline
+from ocr_pool import pool_for
+from logging_config import get_logger
 
-def get_ocr_instance():
-    return PaddleOCR(lang="en")
+logger = get_logger("indian_parser")
 
+@time_function("indian_parser")
 def convert_date_columns(df):
     """Convert date columns to datetime type"""
     if df is None or df.empty:
@@ -23,25 +25,24 @@ def convert_date_columns(df):
                     if pd.notna(x) and str(x).strip() not in ['', '-', 'nan'] 
                     else pd.NaT
                 )
-                print(f"[DATE] Converted column '{col}' to datetime")
+                logger.debug("[DATE] Converted column '%s' to datetime", col)
             except Exception as e:
-                print(f"[DATE] Failed to convert column '{col}': {e}")
+                logger.warning("[DATE] Failed to convert column '%s': %s", col, e)
     
     return df
 
-def process_indian_pdf(pdf_bytes, filename):
-    """Process Indian Bank PDF with custom logic"""
+def process_indian_pdf(pdf_source, filename, bank=None):
+    """Process Indian Bank PDF with custom logic; bank picks the OCR pool (standardized name)"""
     try:
-        pdf_doc = PDF(pdf_bytes)
-        ocr = get_ocr_instance()
-        
-        pdf_tables = pdf_doc.extract_tables(
-            ocr=ocr,
-            implicit_rows=True,
-            implicit_columns=True,
-            borderless_tables=True,
-            min_confidence=50
-        )
+        with pool_for(bank).engine() as ocr, measure("indian_parser.extract_tables"):
+            pdf_tables = page_pipeline.extract_tables(
+                pdf_source,
+                ocr=ocr,
+                implicit_rows=True,
+                implicit_columns=True,
+                borderless_tables=True,
+                min_confidence=50
+            )
         
         all_rows = []
         pending_transaction = None
@@ -72,7 +73,7 @@ def process_indian_pdf(pdf_bytes, filename):
                             previous_balance = balance_match.group(1)
                             if opening_balance_value is None:
                                 opening_balance_value = previous_balance
-                            print(f"Found opening balance: {previous_balance}")
+                            logger.debug("Found opening balance: %s", previous_balance)
                         continue
                     
                     # Date pattern: DD/MM/YYYY or DD/MM/YY
@@ -167,7 +168,5 @@ def process_indian_pdf(pdf_bytes, filename):
         return final_df, opening_balance, closing_balance, None
         
     except Exception as e:
-        print(f"Indian Bank Parser error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Indian Bank Parser error: %s", e)
         return None, None, None, None
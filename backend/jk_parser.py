@@ -1,10 +1,14 @@
 import pandas as pd
 import re
-from img2table.document import PDF
-from img2table.ocr import PaddleOCR
 import PyPDF2
 import io
 from dateutil import parser as date_parser
+from performance_analyzer import time_function, measure
+import page_pipeline
+from ocr_pool import pool_for
+from logging_config import get_logger
+
+logger = get_logger("jk_parser")
 
 def safe_str(value):
     """Convert any value to string safely - prevents regex errors"""
@@ -12,9 +16,7 @@ def safe_str(value):
         return ""
     return str(value).strip()
 
-def get_ocr_instance():
-    return PaddleOCR(lang="en")
-
+@time_function("jk_parser")
 def convert_date_columns(df):
     """Convert date columns to datetime type"""
     if df is None or df.empty:
@@ -31,25 +33,24 @@ def convert_date_columns(df):
                     if pd.notna(x) and str(x).strip() not in ['', '-', 'nan'] 
                     else pd.NaT
                 )
-                print(f"[DATE] Converted column '{col}' to datetime")
+                logger.debug("[DATE] Converted column '%s' to datetime", col)
             except Exception as e:
-                print(f"[DATE] Failed to convert column '{col}': {e}")
+                logger.warning("[DATE] Failed to convert column '%s': %s", col, e)
     
     return df
 
-def process_jk_pdf(pdf_bytes, filename):
-    """Process JK Bank PDF with custom logic"""
+def process_jk_pdf(pdf_source, filename, bank=None):
+    """Process JK Bank PDF with custom logic; bank picks the OCR pool (standardized name)"""
     try:
-        pdf_doc = PDF(pdf_bytes)
-        ocr = get_ocr_instance()
-        
-        pdf_tables = pdf_doc.extract_tables(
-            ocr=ocr,
-            implicit_rows=True,
-            implicit_columns=True,
-            borderless_tables=True,
-            min_confidence=50
-        )
+        with pool_for(bank).engine() as ocr, measure("jk_parser.extract_tables"):
+            pdf_tables = page_pipeline.extract_tables(
+                pdf_source,
+                ocr=ocr,
+                implicit_rows=True,
+                implicit_columns=True,
+                borderless_tables=True,
+                min_confidence=50
+            )
         
         all_rows = []
         pending_transaction = None
@@ -66,7 +67,7 @@ def process_jk_pdf(pdf_bytes, filename):
                 # Check if this page is a summary/footer page
                 page_text = " ".join([str(cell) for row in df.iterrows() for cell in row[1] if pd.notna(cell) and str(cell).strip()])
                 if any(phrase in page_text.upper() for phrase in ["PAGE TOTAL:", "GRAND TOTAL:", "END OF STATEMENT", "FUNDS IN CLEARING"]):
-                    print(f"Skipping summary page {page_num}")
+                    logger.debug("Skipping summary page %s", page_num)
                     continue
                 
                 for idx, row in df.iterrows():
@@ -86,7 +87,7 @@ def process_jk_pdf(pdf_bytes, filename):
                             previous_balance = balance_match.group(1)
                             if opening_balance_value is None:  # Only set once
                                 opening_balance_value = previous_balance
-                            print(f"Found B/F balance: {previous_balance}")
+                            logger.debug("Found B/F balance: %s", previous_balance)
                         continue
                     
                     date_match = re.search(r'\b(\d{2}-\d{2}-\d{4})\b', row_text)
@@ -194,18 +195,16 @@ def process_jk_pdf(pdf_bytes, filename):
         
         # Opening balance is the B/F balance we captured
         opening_balance = {'Balance': opening_balance_value} if opening_balance_value else None
-        print(f"\nOpening balance (B/F): {opening_balance}")
+        logger.info("Opening balance (B/F): %s", opening_balance)
         
         # Closing balance is the last transaction balance
         closing_balance = None
         if len(final_df) > 0:
             closing_balance = {'Balance': final_df.iloc[-1]['Balance']}
-            print(f"Closing balance: {closing_balance}\n")
+            logger.info("Closing balance: %s", closing_balance)
         
         return final_df, opening_balance, closing_balance, None
         
     except Exception as e:
-        print(f"JK Parser error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("JK Parser error: %s", e)
         return None, None, None, None
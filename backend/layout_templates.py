@@ -0,0 +1,742 @@
+"""
+Learned per-bank layout templates
+Statements from one bank share their column edges and header row across
+documents, yet every upload re-runs img2table's generic table detection.
+After a successful generic parse the geometry of the header table is
+recorded here, keyed by the standardized bank name and a fingerprint of the
+layout (page size, column count, header labels). Later uploads of that bank
+are read on the fixed grid instead:
+
+- text-layer pages: the PDF words are bucketed into the column bands
+- scanned pages: each column band is cropped and OCRed, all bands in one batch;
+  date and amount bands are read on the digit vocabulary (numeric_columns)
+- rows are cut at the horizontal rules (bordered layouts) or start at each
+  line with a date or an amount, wrapped lines joining the row above
+
+A template that does not fit - page size, header row not found on the first
+page read, or too many words crossing a column edge - raises TemplateMismatch
+and the parser falls back to generic detection for the whole document. So
+does a template read whose balances do not follow from its amounts row by
+row (bankDetector.balances_follow), and only generic parses whose balances
+do are learned from.
+
+Within one statement the same applies without a stored template: with
+LAYOUT_PROPAGATION the column edges of the first transaction page are reused
+to read the following pages on its grid (PropagatedLayout), so their columns
+line up with the first page by construction. A page the grid does not fit is
+detected on its own as before.
+
+    LAYOUT_TEMPLATES          true / false (default false)
+    LAYOUT_TEMPLATE_FILE      JSON store (default layout_templates.json under LEDGERIT_DATA_DIR)
+    LAYOUT_PROPAGATION        true / false (default false)
+    LAYOUT_MAX_STRADDLE       share of words allowed across a column edge (default 0.1)
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import page_pipeline
+from data_dir import data_path, ensure_parent
+from logging_config import get_logger
+from numeric_columns import ColumnTypes, column_type, constrain, OCR_NUMERIC_COLUMNS, DATE, AMOUNT, TEXT
+from page_classifier import DATE_REGEX, AMOUNT_REGEX
+from performance_analyzer import measure, increment
+from spooled_pdf import open_document
+from tracing import current_span
+
+try:
+    from img2table.document._types import MockDocument
+    from img2table.tables.extraction import BBox, TableCell, ExtractedTable
+    TEMPLATES_SUPPORTED = True
+except ImportError:
+    # img2table 1.x keeps its table objects elsewhere and has no MockDocument
+    TEMPLATES_SUPPORTED = False
+
+logger = get_logger("layout_templates")
+
+LAYOUT_TEMPLATES = os.getenv('LAYOUT_TEMPLATES', 'false').lower() == 'true' and TEMPLATES_SUPPORTED
+LAYOUT_TEMPLATE_FILE = data_path(os.getenv('LAYOUT_TEMPLATE_FILE', 'layout_templates.json'))
+LAYOUT_PROPAGATION = os.getenv('LAYOUT_PROPAGATION', 'false').lower() == 'true' and TEMPLATES_SUPPORTED
+LAYOUT_MAX_STRADDLE = float(os.getenv('LAYOUT_MAX_STRADDLE', 0.1))
+
+# Templates kept per bank, least recently learned dropped first
+MAX_TEMPLATES_PER_BANK = 4
+# Page sizes (points) within this distance count as the same paper
+PAGE_SIZE_TOLERANCE = 2
+# Share of header labels that must be found in their own column
+HEADER_MATCH_SHARE = 0.75
+RULES_DPI = 72
+# A gap this many times the usual line pitch ends a table without rules
+TABLE_GAP_FACTOR = 2.5
+# Column titles; a row with three of them is a header row
+HEADER_LABEL_REGEX = re.compile(
+    r'\b(date|narration|particulars|description|remarks|debit|credit|withdrawal|deposit|'
+    r'balance|amount|chq|cheque|ref)',
+    re.IGNORECASE
+)
+
+class TemplateMismatch(Exception):
+    """The document does not follow the template's layout"""
+
+def _normalize(label):
+    return re.sub(r'[^a-z0-9]', '', str(label or '').lower())
+
+def _has_digit(words):
+    return any(char.isdigit() for word in words for char in word[4])
+
+def _cell_text(words):
+    """Words of a cell, lines broken as img2table breaks them"""
+    text = words[0][4]
+    for previous, word in zip(words, words[1:]):
+        below = (word[1] + word[3]) / 2 - (previous[1] + previous[3]) / 2 > (word[3] - word[1]) / 2
+        text += ('\n' if below else ' ') + word[4]
+    return text
+
+def _is_dated(texts):
+    return (any(DATE_REGEX.search(text) for text in texts)
+            and any(AMOUNT_REGEX.search(text) and not DATE_REGEX.search(text) for text in texts))
+
+def _is_dated_row(cells):
+    return _is_dated([' '.join(word[4] for word in words) for words in cells.values()])
+
+def _starts_row(texts, kinds):
+    """Whether {column: text} has a date in a date column or an amount in an amount column.
+
+    Other lines are wrapped text of the row above. Without a date column
+    any date next to an amount starts a row.
+    """
+    if DATE not in kinds:
+        return _is_dated(texts.values())
+    for column, text in texts.items():
+        kind = kinds[column] if column < len(kinds) else TEXT
+        if (kind == DATE and DATE_REGEX.search(text)) or (kind == AMOUNT and AMOUNT_REGEX.search(text)):
+            return True
+    return False
+
+class LayoutTemplate:
+    """Column edges and header labels, positions as fractions of the page size"""
+
+    def __init__(self, bank, page_size, columns, header, header_top, rows='rules', learned_at=None):
+        self.bank = bank
+        self.page_size = [round(page_size[0], 1), round(page_size[1], 1)]
+        self.columns = columns
+        self.header = header
+        self.header_top = header_top
+        self.rows = rows
+        self.learned_at = learned_at or time.time()
+
+    @property
+    def fingerprint(self):
+        labels = hashlib.sha1('|'.join(self.header).encode()).hexdigest()[:10]
+        return f"{round(self.page_size[0])}x{round(self.page_size[1])}-{len(self.columns) - 1}-{labels}"
+
+    def fits_page(self, width, height):
+        return (abs(self.page_size[0] - width) <= PAGE_SIZE_TOLERANCE
+                and abs(self.page_size[1] - height) <= PAGE_SIZE_TOLERANCE)
+
+    def to_dict(self):
+        return {
+            'bank': self.bank,
+            'fingerprint': self.fingerprint,
+            'page_size': self.page_size,
+            'columns': self.columns,
+            'header': self.header,
+            'header_top': self.header_top,
+            'rows': self.rows,
+            'learned_at': self.learned_at
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['bank'], data['page_size'], data['columns'], data['header'],
+                   data['header_top'], data.get('rows', 'rules'), data.get('learned_at'))
+
+class TemplateStore:
+    """JSON file of templates, re-read when another worker has rewritten it"""
+
+    def __init__(self, path=LAYOUT_TEMPLATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._mtime = None
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._templates = {
+                (entry['bank'], entry['fingerprint']): LayoutTemplate.from_dict(entry)
+                for entry in data.get('templates', [])
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable layout template file %s: %s", self.path, e)
+        self._mtime = mtime
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(ensure_parent(self.path)))
+        fd, tmp_path = tempfile.mkstemp(prefix='.layout-', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'templates': [t.to_dict() for t in self._templates.values()]}, f, indent=1)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def find(self, bank, width, height):
+        """Templates of bank for this page size, most recently learned first"""
+        with self._lock:
+            self._load()
+            matches = [t for (name, _), t in self._templates.items() if name == bank and t.fits_page(width, height)]
+        return sorted(matches, key=lambda t: t.learned_at, reverse=True)
+
+    def record(self, template):
+        with self._lock:
+            self._load()
+            self._templates[(template.bank, template.fingerprint)] = template
+            same_bank = sorted((t for t in self._templates.values() if t.bank == template.bank),
+                               key=lambda t: t.learned_at, reverse=True)
+            for stale in same_bank[MAX_TEMPLATES_PER_BANK:]:
+                del self._templates[(stale.bank, stale.fingerprint)]
+            try:
+                self._save()
+            except OSError as e:
+                # Still used by this process, just not shared
+                logger.warning("Could not write layout templates to %s: %s", self.path, e)
+
+template_store = TemplateStore()
+
+def _page_size(src, page_number=0):
+    doc = open_document(src)
+    try:
+        rect = doc[page_number].rect
+        return rect.width, rect.height
+    finally:
+        doc.close()
+
+def _is_header_row(cells):
+    return sum(1 for cell in cells if cell.value and HEADER_LABEL_REGEX.search(cell.value)) >= 3
+
+def learn_template(bank, src, pdf_tables, rows='rules'):
+    """(template, page_number, table) from the first table that starts with a header row, or None"""
+    for page_number in sorted(pdf_tables):
+        for table in pdf_tables[page_number]:
+            bbox = table.bbox
+            if not table.content or not bbox.image_width:
+                continue
+            first_row = next(iter(table.content.values()))
+            if not _is_header_row(first_row):
+                continue
+            # Cells spanning several columns repeat in the row; keep each once
+            cells = []
+            for cell in first_row:
+                if not cells or (cell.bbox.x1, cell.bbox.x2) != (cells[-1].bbox.x1, cells[-1].bbox.x2):
+                    cells.append(cell)
+            if len(cells) < 3:
+                return None
+            columns = [round(cell.bbox.x1 / bbox.image_width, 4) for cell in cells]
+            columns.append(round(cells[-1].bbox.x2 / bbox.image_width, 4))
+            width, height = _page_size(src, page_number)
+            template = LayoutTemplate(
+                bank, (width, height), columns,
+                header=[_normalize(cell.value) for cell in cells],
+                header_top=round(cells[0].bbox.y1 / bbox.image_height, 4),
+                rows=rows
+            )
+            return template, page_number, table
+    return None
+
+def _joined_rows(table, kinds):
+    """Cell texts row by row with wrapped lines joined to the row above, as the grid reads them.
+
+    A cell merged across columns counts in its first column. Texts are
+    compared normalized: the readers break lines differently and decode
+    some dashes differently.
+    """
+    rows = []
+    for row in table.content.values():
+        if len(row) != len(kinds):
+            return None
+        texts, seen = {}, set()
+        for column, cell in enumerate(row):
+            if cell.value and id(cell) not in seen:
+                texts[column] = cell.value
+            seen.add(id(cell))
+        if rows and not _starts_row(texts, kinds):
+            for column, text in texts.items():
+                rows[-1][column] += _normalize(text)
+        else:
+            rows.append([_normalize(texts.get(column)) for column in range(len(kinds))])
+    return rows
+
+def reproduces(template, src, page_number, table):
+    """Whether reading page_number on the grid gives the rows generic detection found, cell for cell.
+
+    Generic detection gives each wrapped line a row of its own; joined to
+    their rows, its cells must equal the grid's and the grid must have
+    no more rows than that.
+    """
+    reader = GridReader(template, src)
+    try:
+        for _, page in page_pipeline.iter_pages(src, [page_number]):
+            if not page_pipeline.has_text_layer(page):
+                # Checking a scanned page would take another OCR pass
+                return False
+            grid = reader.page_tables(page, page_number)
+        if not grid:
+            return False
+        kinds = [column_type(label) for label in template.header]
+        expected = _joined_rows(table, kinds)
+        return (expected is not None and len(grid[0].content) == len(expected)
+                and _joined_rows(grid[0], kinds) == expected)
+    except TemplateMismatch:
+        return False
+    finally:
+        reader.close()
+
+def learn(bank, src, pdf_tables, rows='rules'):
+    """Record the layout of a statement that generic detection parsed successfully
+    (the parser checks its balances before calling this).
+
+    Only kept when the grid reads the page it was learned from cell for
+    cell as generic detection did (reproduces), so a later upload of the
+    same layout parses the same and layouts the grid cannot read (shaded
+    rows, rules that do not separate rows) keep going through generic
+    detection.
+    """
+    if not LAYOUT_TEMPLATES or not bank:
+        return None
+    try:
+        with measure('layout_templates.learn'):
+            learned = learn_template(bank, src, pdf_tables, rows)
+            if learned is None:
+                increment('layout_templates', result='not_learned')
+                return None
+            template, page_number, table = learned
+            if not reproduces(template, src, page_number, table):
+                increment('layout_templates', result='not_learned')
+                return None
+            template_store.record(template)
+        return template
+    except Exception as e:
+        logger.warning("Could not learn a layout template for %s: %s", bank, e)
+        return None
+
+class GridReader:
+    """Reads pages on a template's fixed grid; passed to page_pipeline as `layout`"""
+
+    def __init__(self, template, src, ocr=None, header_seen=False):
+        self.template = template
+        self._ocr = ocr
+        self._kinds = [column_type(label) for label in template.header]
+        self._doc = open_document(src)
+        # The header row is only required on the first page read
+        self._pages_read = int(header_seen)
+
+    def close(self):
+        self._doc.close()
+
+    def _text_words(self, page_number):
+        page = self._doc[page_number]
+        width, height = page.rect.width, page.rect.height
+        return [(x1 / width, y1 / height, x2 / width, y2 / height, text)
+                for x1, y1, x2, y2, text, *_ in page.get_text("words")]
+
+    def _ocr_words(self, page, page_number):
+        if self._ocr is None:
+            raise TemplateMismatch("scanned page and no OCR engine")
+        img = page_pipeline.render_page(page, page_number)
+        height, width = img.shape[:2]
+        edges = [int(edge * width) for edge in self.template.columns]
+        bands = list(zip(edges, edges[1:]))
+        ocr_data = self._ocr.of(document=MockDocument(images=[img[:, x1:x2] for x1, x2 in bands]))
+        # Each band is one column, so its header says whether it holds digits
+        kinds = [column_type(label) if OCR_NUMERIC_COLUMNS else TEXT for label in self.template.header]
+        words = []
+        for band, records in (ocr_data.records.items() if ocr_data is not None else ()):
+            offset = bands[band][0]
+            words.extend(((word['x1'] + offset) / width, word['y1'] / height,
+                          (word['x2'] + offset) / width, word['y2'] / height, constrain(word['value'], kinds[band]))
+                         for word in records if word.get('value'))
+        return words, img
+
+    def _check_straddle(self, words):
+        edges = self.template.columns
+        inside = [word for word in words if word[0] >= edges[0] and word[2] <= edges[-1]]
+        straddling = 0
+        for x1, _, x2, _, _ in inside:
+            for edge in edges[1:-1]:
+                # Only a real share of the word on both sides counts
+                if min(edge - x1, x2 - edge) > 0.3 * (x2 - x1):
+                    straddling += 1
+                    break
+        if inside and straddling / len(inside) > LAYOUT_MAX_STRADDLE:
+            raise TemplateMismatch(f"{straddling} of {len(inside)} words cross a column edge")
+
+    def _lines(self, words):
+        """Words grouped into text lines, each as {column: [words]}"""
+        edges = self.template.columns
+        words = sorted((word for word in words if edges[0] <= (word[0] + word[2]) / 2 <= edges[-1]),
+                       key=lambda word: (word[1] + word[3]) / 2)
+        if not words:
+            return []
+        word_height = float(np.median([word[3] - word[1] for word in words]))
+        lines, current, centre = [], [], None
+        for word in words:
+            middle = (word[1] + word[3]) / 2
+            if current and middle - centre > word_height / 2:
+                lines.append(current)
+                current = []
+            current.append(word)
+            centre = sum((w[1] + w[3]) / 2 for w in current) / len(current)
+        lines.append(current)
+
+        grouped = []
+        for line in lines:
+            cells = {}
+            for word in sorted(line):
+                column = min(bisect.bisect_right(edges, (word[0] + word[2]) / 2) - 1, len(edges) - 2)
+                cells.setdefault(column, []).append(word)
+            grouped.append(cells)
+        return grouped
+
+    def _with_line(self, texts, cells, above):
+        """Normalized header texts with a line's cells added, or None when they are not more of the labels"""
+        labels = self.template.header
+        texts = dict(texts)
+        for column, words in cells.items():
+            part = _normalize(_cell_text(words))
+            text = part + texts.get(column, '') if above else texts.get(column, '') + part
+            if part and text not in (labels[column] if column < len(labels) else ''):
+                return None
+            texts[column] = text
+        return texts
+
+    def _header_lines(self, lines):
+        """(first, last) index of the lines of the header row, or None.
+
+        Labels may wrap ("Tran" over "Type"), so the lines above and below a
+        line with the labels join the header while they only add to labels
+        that are not complete yet.
+        """
+        labels = self.template.header
+        wanted = [i for i, label in enumerate(labels) if label]
+        if not wanted:
+            return None
+        for idx, cells in enumerate(lines):
+            texts = {column: _normalize(_cell_text(words)) for column, words in cells.items()}
+            first = last = idx
+            while first > 0 and (joined := self._with_line(texts, lines[first - 1], above=True)) is not None:
+                texts, first = joined, first - 1
+            while last + 1 < len(lines) and (joined := self._with_line(texts, lines[last + 1], above=False)) is not None:
+                texts, last = joined, last + 1
+            found = sum(1 for i in wanted if texts.get(i) == labels[i])
+            if found / len(wanted) >= HEADER_MATCH_SHARE:
+                return first, last
+        return None
+
+    def _starts_row(self, cells):
+        return _starts_row({column: ' '.join(word[4] for word in words) for column, words in cells.items()},
+                           self._kinds)
+
+    def _bands(self, page, img=None):
+        """(top, bottom) page fractions between horizontal rules whose column rules match the template.
+
+        Only the first run of matching bands counts - a following table with
+        other columns ends it. Returns None when the page has no rules at all.
+        """
+        if img is None:
+            img = page.render(scale=RULES_DPI / 72, grayscale=True).to_numpy()
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        height, width = img.shape
+        edges = self.template.columns
+        x1, x2 = int(edges[0] * width), int(edges[-1] * width)
+        ink = (img < 160).astype(np.uint8)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(1, (x2 - x1) // 2), 1))
+        line_rows = np.flatnonzero(cv2.morphologyEx(ink[:, x1:x2], cv2.MORPH_OPEN, kernel).any(axis=1))
+        rules = []
+        for y in line_rows:
+            # Thick rules render as several adjacent pixel rows
+            if not rules or y - rules[-1][1] > 1:
+                rules.append([y, y])
+            else:
+                rules[-1][1] = y
+        if len(rules) < 2:
+            return None
+
+        tolerance = max(2, int(0.01 * width))
+        inner_edges = [int(edge * width) for edge in edges[1:-1]]
+        bands, started = [], False
+        for (_, top), (bottom, _) in zip(rules, rules[1:]):
+            band = ink[top + 1:bottom, :]
+            if band.shape[0] < 3:
+                continue
+            separators = np.flatnonzero(band.mean(axis=0) > 0.8)
+            matched = sum(1 for edge in inner_edges if np.any(np.abs(separators - edge) <= tolerance))
+            stray = sum(1 for x in separators
+                        if x1 + tolerance < x < x2 - tolerance and min(abs(edge - x) for edge in inner_edges) > tolerance)
+            if matched * 2 >= len(inner_edges) and not stray:
+                bands.append((top / height, bottom / height))
+                started = True
+            elif started:
+                break
+        return bands
+
+    @staticmethod
+    def _flows_across(cells):
+        """Running text: words in neighbouring columns only a space apart"""
+        words = sorted((word, column) for column, column_words in cells.items() for word in column_words)
+        for (left, left_column), (right, right_column) in zip(words, words[1:]):
+            if left_column != right_column and right[0] - left[2] < 0.5 * (left[3] - left[1]):
+                return True
+        return False
+
+    def _unruled_table(self, lines, header):
+        """Lines from the header (or first dated row) until running text or a wide gap"""
+        spread = [i for i, cells in enumerate(lines) if len(cells) >= 2]
+        if header is None:
+            # Continuation pages: the letterhead may repeat, the column header need not
+            header = next((i for i, cells in enumerate(lines) if _is_dated_row(cells)), None)
+        if header is None or not spread:
+            return []
+        lines = lines[header:spread[-1] + 1]
+        # A dated row may run its narration up to the next column; a note has no date or amount
+        flowing = next((i for i, cells in enumerate(lines)
+                        if i and self._flows_across(cells) and not self._starts_row(cells)), None)
+        if flowing is not None:
+            lines = lines[:flowing]
+        middles = [np.mean([(word[1] + word[3]) / 2 for words in cells.values() for word in words])
+                   for cells in lines]
+        pitches = np.diff(middles)
+        if len(pitches) < 2:
+            return lines
+        # Footers and notes sit further below the last row than rows sit below each other
+        gaps = np.flatnonzero(pitches > TABLE_GAP_FACTOR * np.median(pitches))
+        return lines[:gaps[0] + 1] if len(gaps) else lines
+
+    @staticmethod
+    def _band_of(cells, bands):
+        word = next(iter(cells.values()))[0]
+        middle = (word[1] + word[3]) / 2
+        return next((i for i, (top, bottom) in enumerate(bands) if top <= middle <= bottom), None)
+
+    def _joined_lines(self, lines, header):
+        """Rows of a table without rules: a line that starts no row is wrapped text of the row above"""
+        rows = []
+        for cells in lines:
+            if rows and not (header and len(rows) == 1) and not self._starts_row(cells):
+                for column, words in cells.items():
+                    rows[-1].setdefault(column, []).extend(words)
+            else:
+                rows.append({column: list(words) for column, words in cells.items()})
+        return rows
+
+    def _rows(self, lines, bands, header=False):
+        """Text lines in the same band form one row, unless they put two figures in one column.
+
+        Without rules a row runs from a line with a date or amount to the next.
+        """
+        if bands is None:
+            return self._joined_lines(lines, header)
+        widths = [b - a for a, b in zip(self.template.columns, self.template.columns[1:])]
+        text_column = widths.index(max(widths))
+        rows, current_band = [], None
+        for cells in lines:
+            band = self._band_of(cells, bands)
+            if band is None:
+                continue
+            # Two figures in one column are two rows (e.g. a total above the closing balance)
+            clash = rows and any(
+                column != text_column and column in rows[-1]
+                and _has_digit(rows[-1][column]) and _has_digit(words)
+                for column, words in cells.items()
+            )
+            if rows and band == current_band and not clash:
+                for column, words in cells.items():
+                    rows[-1].setdefault(column, []).extend(words)
+            else:
+                rows.append({column: list(words) for column, words in cells.items()})
+            current_band = band
+        return rows
+
+    def _table(self, rows, page_size):
+        width, height = page_size
+        edges = [int(edge * width) for edge in self.template.columns]
+        content = OrderedDict()
+        for row_idx, cells in enumerate(rows):
+            words = [word for column_words in cells.values() for word in column_words]
+            y1 = int(min(word[1] for word in words) * height)
+            y2 = int(max(word[3] for word in words) * height)
+            content[row_idx] = [
+                TableCell(bbox=BBox(x1=edges[i], y1=y1, x2=edges[i + 1], y2=y2),
+                          value=_cell_text(cells[i]) if i in cells else None)
+                for i in range(len(edges) - 1)
+            ]
+        first, last = next(iter(content.values())), content[len(content) - 1]
+        return ExtractedTable(
+            bbox=BBox(x1=edges[0], y1=first[0].bbox.y1, x2=edges[-1], y2=last[0].bbox.y2,
+                      image_width=width, image_height=height),
+            title=None,
+            content=content
+        )
+
+    def page_tables(self, page, page_number):
+        """[ExtractedTable] for one page, or raise TemplateMismatch"""
+        with measure('page.template_extract'):
+            img = None
+            if page_pipeline.has_text_layer(page):
+                words = self._text_words(page_number)
+                self._check_straddle(words)
+            else:
+                words, img = self._ocr_words(page, page_number)
+
+            lines = self._lines(words)
+            header = None
+            header_lines = self._header_lines(lines)
+            if header_lines is not None:
+                header, last = header_lines
+                cells = {}
+                for line in lines[header:last + 1]:
+                    for column, column_words in line.items():
+                        cells.setdefault(column, []).extend(column_words)
+                lines = lines[:header] + [cells] + lines[last + 1:]
+            first_page = self._pages_read == 0
+            self._pages_read += 1
+            if first_page and header is None:
+                raise TemplateMismatch(f"header row not found on page {page_number}")
+
+            bands = self._bands(page, img) if self.template.rows == 'rules' else None
+            rows_below = lines[header + 1:] if header is not None else lines
+            if bands and not any(self._band_of(cells, bands) is not None for cells in rows_below):
+                # Rules around the header row or a letterhead box only, the rows are not ruled
+                bands = None
+            if bands is None:
+                lines = self._unruled_table(lines, header)
+            elif header is not None:
+                lines = lines[header:]
+
+            if bands == [] and lines:
+                raise TemplateMismatch(f"no rows between rules match the columns on page {page_number}")
+            rows = self._rows(lines, bands, header is not None)
+            if not rows:
+                current_span().set_attributes(page=page_number, tables=0)
+                return []
+            image_size = (int(page.get_width() * page_pipeline.RENDER_DPI / 72),
+                          int(page.get_height() * page_pipeline.RENDER_DPI / 72))
+            table = self._table(rows, image_size)
+            current_span().set_attributes(page=page_number, tables=1, rows=len(rows))
+            return [table]
+
+def extract_tables(src, bank, ocr=None):
+    """{page_number: [ExtractedTable]} read on a learned template, or None to use generic detection"""
+    if not LAYOUT_TEMPLATES or not bank:
+        return None
+    candidates = template_store.find(bank, *_page_size(src))
+    if not candidates:
+        increment('layout_templates', result='miss')
+        return None
+
+    for template in candidates:
+        reader = GridReader(template, src, ocr)
+        try:
+            with measure('layout_templates.extract'):
+                pdf_tables = page_pipeline.extract_tables(src, ocr=ocr, layout=reader)
+        except TemplateMismatch as e:
+            logger.info("Layout template %s does not fit: %s", template.fingerprint, e)
+            increment('layout_templates', result='mismatch')
+            continue
+        finally:
+            reader.close()
+        increment('layout_templates', result='hit')
+        current_span().set_attributes(layout_template=template.fingerprint)
+        return pdf_tables
+    return None
+
+class PropagatedLayout:
+    """Generic detection up to the first transaction page, that page's grid after it.
+
+    Passed to page_pipeline as `layout` like GridReader. The grid is only
+    propagated when it has as many columns as the detected table and, on
+    text-layer pages, reproduces its rows; that page is then read on the
+    grid as well, so the statement parses as it will on a template
+    learned from it.
+    """
+
+    def __init__(self, src, ocr=None, rows='rules', **options):
+        self._src = src
+        self._ocr = ocr
+        self._rows = rows
+        self._options = options
+        self._document = page_pipeline.table_source(src, options.get('pdf_text_extraction', True))
+        self._reader = None
+        self._learning = True
+        self._column_types = ColumnTypes()
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+
+    def _propagate(self, page, page_number, tables):
+        """This page's tables, read on its grid when that is propagated"""
+        learned = learn_template(None, self._src, {page_number: tables}, self._rows)
+        if learned is None:
+            # No header table yet - cover pages and summaries come first
+            return tables
+        self._learning = False
+        template, _, table = learned
+        if len(template.columns) - 1 != len(table.content[next(iter(table.content))]):
+            # Merged header cells: grid rows would not line up with this page's
+            increment('layout_propagation', result='not_aligned')
+            return tables
+        text_layer = page_pipeline.has_text_layer(page)
+        if text_layer and not reproduces(template, self._src, page_number, table):
+            increment('layout_propagation', result='not_reproduced')
+            return tables
+        self._reader = GridReader(template, self._src, self._ocr, header_seen=True)
+        current_span().set_attributes(layout_propagated_from=page_number)
+        # Reading a scanned page again would take another OCR pass
+        return self._reader.page_tables(page, page_number) if text_layer else tables
+
+    def page_tables(self, page, page_number):
+        if self._reader is not None:
+            try:
+                tables = self._reader.page_tables(page, page_number)
+                increment('layout_propagation', result='grid')
+                return tables
+            except TemplateMismatch as e:
+                logger.debug("Page %s does not fit the propagated layout: %s", page_number, e)
+                increment('layout_propagation', result='mismatch')
+
+        tables = page_pipeline.extract_page_tables_adaptive(self._document, page, page_number, self._ocr,
+                                                            column_types=self._column_types, **self._options)
+        if self._learning:
+            return self._propagate(page, page_number, tables)
+        return tables
+
+def extract_tables_propagated(src, ocr=None, rows='rules', pages=None, **options):
+    """page_pipeline.extract_tables, reading the pages after the first transaction page on its grid"""
+    if not LAYOUT_PROPAGATION:
+        return page_pipeline.extract_tables(src, ocr=ocr, pages=pages, **options)
+    layout = PropagatedLayout(src, ocr, rows, **options)
+    try:
+        return page_pipeline.extract_tables(src, ocr=ocr, pages=pages, layout=layout)
+    finally:
+        layout.close()
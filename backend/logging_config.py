@@ -0,0 +1,121 @@
+"""
+Leveled, non-blocking logging for the backend
+Records go through a QueueHandler to one background QueueListener thread,
+so request threads never block on stdout. Messages use %-style arguments
+and are only formatted when a handler actually emits them.
+
+    LOG_LEVEL          DEBUG / INFO / WARNING / ERROR (default INFO)
+    LOG_FORMAT         text or json (default text)
+    LOG_SAMPLE_EVERY   keep 1 in N records from sampled loggers (default 100)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 100))
+
+ROOT_LOGGER = 'ledgerit'
+
+# LogRecord attributes that are not user supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Let the first record and then every Nth one through.
+
+    For per-row/per-table debug output that would otherwise flood the log
+    on large statements.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        with self._lock:
+            keep = self._seen % self.every == 0
+            self._seen += 1
+        return keep
+
+_listener = None
+_queue_handler = None
+_setup_lock = threading.Lock()
+
+def _build_handler():
+    handler = logging.StreamHandler()
+    if LOG_FORMAT == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    return handler
+
+def _start_listener(handlers):
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return log_queue
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+def _restart_after_fork():
+    # The listener thread does not survive fork and its queue lock may have
+    # been held mid-put; give the child its own queue and listener.
+    if _listener is None:
+        return
+    _queue_handler.queue = _start_listener(_listener.handlers)
+
+def setup_logging():
+    """Attach the queue handler to the ledgerit logger once per process"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        _queue_handler = logging.handlers.QueueHandler(_start_listener([_build_handler()]))
+        # Stops whichever listener this process ends up with, also after fork
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        root.addHandler(_queue_handler)
+        root.propagate = False
+
+def get_logger(name, sample_every=None):
+    """Logger under the ledgerit namespace; sample_every keeps 1 in N records"""
+    setup_logging()
+    logger = logging.getLogger(f'{ROOT_LOGGER}.{name}')
+    if sample_every and not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        logger.addFilter(SamplingFilter(sample_every))
+    return logger
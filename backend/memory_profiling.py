@@ -0,0 +1,197 @@
+"""
+Memory profiling mode for the parsing pipeline
+Attributes Python allocations (tracemalloc) and resident set size (sampled
+on a background thread) to the pipeline stage that was running, using the
+performance_analyzer stage hook - every measure()/time_function stage
+(page.render, page.extract_tables, bankDetector.concat,
+bordered.merge_multiline_transactions, ...) is covered without extra code.
+
+Profiling is meant for single-file benchmark runs: tracemalloc's peak is
+process wide, so concurrent requests would blur the attribution.
+
+    python benchmark.py --memory --match "Indian Bank"
+"""
+
+import os
+import threading
+import tracemalloc
+
+from performance_analyzer import add_stage_hook, remove_stage_hook
+
+MB = 1024 * 1024
+
+# Keep the profiler's own bookkeeping out of the allocation sites
+_SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+def current_rss_mb():
+    """Resident set size right now (not the peak) in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / MB
+    except ImportError:
+        return None
+
+class _StageFrame:
+    __slots__ = ('name', 'start_traced', 'peak_traced', 'start_rss', 'peak_rss', 'start_snapshot')
+
+    def __init__(self, name, traced, rss):
+        self.name = name
+        self.start_traced = traced
+        self.peak_traced = traced
+        self.start_rss = rss
+        self.peak_rss = rss
+        self.start_snapshot = None
+
+class MemoryProfiler:
+    """Per-stage tracemalloc peaks, retained memory and sampled RSS.
+
+    Stages nest: a parent's peak includes its children's. tracemalloc's peak
+    is reset on every stage entry and exit, so each reading belongs to the
+    innermost stage open at the time - that stage is reported as owning the
+    allocation peak, and likewise for the sampled RSS peak.
+    """
+
+    def __init__(self, sample_interval=0.01, top_allocations=5, traceback_frames=1):
+        self.sample_interval = sample_interval
+        self.top_allocations = top_allocations
+        self.traceback_frames = traceback_frames
+        self.stages = {}
+        self.peak_rss = 0.0
+        self.peak_rss_stack = []
+        self.peak_traced = 0
+        self.peak_traced_stack = []
+        self._stack = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='rss-sampler', daemon=True)
+        self._sampler.start()
+        add_stage_hook(self.stage)
+
+    def stop(self):
+        remove_stage_hook(self.stage)
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        tracemalloc.stop()
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        with self._lock:
+            for frame in self._stack:
+                frame.peak_rss = max(frame.peak_rss, rss)
+            if rss > self.peak_rss:
+                self.peak_rss = rss
+                self.peak_rss_stack = [frame.name for frame in self._stack]
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    def _note_peak(self, peak):
+        # Called under the lock just before reset_peak(): the stack top owns this peak
+        if peak > self.peak_traced:
+            self.peak_traced = peak
+            self.peak_traced_stack = [frame.name for frame in self._stack]
+
+    def _enter(self, name):
+        traced, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            # Fold the peak so far into the open stages before resetting it
+            self._note_peak(peak)
+            for frame in self._stack:
+                frame.peak_traced = max(frame.peak_traced, peak)
+            tracemalloc.reset_peak()
+            frame = _StageFrame(name, traced, current_rss_mb() or 0.0)
+            self._stack.append(frame)
+        if self.top_allocations:
+            frame.start_snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        return frame
+
+    def _exit(self, frame):
+        traced, peak = tracemalloc.get_traced_memory()
+        rss = current_rss_mb() or 0.0
+        with self._lock:
+            self._note_peak(peak)
+            frame.peak_traced = max(frame.peak_traced, peak)
+            frame.peak_rss = max(frame.peak_rss, rss)
+            self._stack.remove(frame)
+            for parent in self._stack:
+                parent.peak_traced = max(parent.peak_traced, frame.peak_traced)
+                parent.peak_rss = max(parent.peak_rss, frame.peak_rss)
+            tracemalloc.reset_peak()
+
+        peak_delta = (frame.peak_traced - frame.start_traced) / MB
+        stats = self.stages.setdefault(frame.name, {
+            'calls': 0, 'peak_alloc_mb': 0.0, 'retained_mb': 0.0,
+            'peak_rss_mb': 0.0, 'rss_growth_mb': 0.0, 'top_allocations': []
+        })
+        stats['calls'] += 1
+        stats['retained_mb'] = round(max(stats['retained_mb'], (traced - frame.start_traced) / MB), 2)
+        stats['peak_rss_mb'] = round(max(stats['peak_rss_mb'], frame.peak_rss), 1)
+        stats['rss_growth_mb'] = round(max(stats['rss_growth_mb'], frame.peak_rss - frame.start_rss), 1)
+        if peak_delta >= stats['peak_alloc_mb']:
+            stats['peak_alloc_mb'] = round(peak_delta, 2)
+            # Allocation sites are kept for the worst call of each stage only
+            if frame.start_snapshot is not None:
+                stats['top_allocations'] = self._top_allocations(frame.start_snapshot)
+        frame.start_snapshot = None
+
+    def _top_allocations(self, before):
+        diff = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS).compare_to(before, 'lineno')
+        return [
+            {'site': str(stat.traceback[0]), 'size_diff_mb': round(stat.size_diff / MB, 2)}
+            for stat in diff[:self.top_allocations] if stat.size_diff > 0
+        ]
+
+    def stage(self, name):
+        """Context manager attributing memory to `name` (also used as the stage hook)"""
+        profiler = self
+
+        class _Stage:
+            def __enter__(self):
+                self.frame = profiler._enter(name)
+                return self
+
+            def __exit__(self, *args):
+                profiler._exit(self.frame)
+                return False
+
+        return _Stage()
+
+    def report(self):
+        """Stages sorted by peak allocation, plus which stage held each peak"""
+        self._sample()
+        with self._lock:
+            self._note_peak(tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0)
+        stages = dict(sorted(self.stages.items(), key=lambda item: item[1]['peak_alloc_mb'], reverse=True))
+        return {
+            'peak_rss_mb': round(self.peak_rss, 1),
+            'peak_rss_stage': ' > '.join(self.peak_rss_stack) or None,
+            'peak_alloc_mb': round(self.peak_traced / MB, 2),
+            'peak_alloc_stage': ' > '.join(self.peak_traced_stack) or None,
+            'stages': stages
+        }
+
+def print_memory_summary(file_name, memory):
+    print(f"\n{file_name}: peak RSS {memory['peak_rss_mb']} MB during [{memory['peak_rss_stage']}]")
+    print(f"  Python allocation peak {memory['peak_alloc_mb']} MB during [{memory['peak_alloc_stage']}]")
+    print(f"  {'Stage':<45} {'Calls':>5} {'Peak alloc':>11} {'Retained':>9} {'RSS peak':>9} {'RSS +':>7}")
+    for name, stats in memory['stages'].items():
+        print(f"  {name[:45]:<45} {stats['calls']:>5} {stats['peak_alloc_mb']:>9.2f}MB "
+              f"{stats['retained_mb']:>7.2f}MB {stats['peak_rss_mb']:>7.1f}MB {stats['rss_growth_mb']:>5.1f}MB")
+        for alloc in stats['top_allocations'][:3]:
+            print(f"      {alloc['size_diff_mb']:>7.2f}MB  {alloc['site']}")
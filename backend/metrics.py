@@ -0,0 +1,160 @@
+"""
+Prometheus text-format exporter for the /metrics endpoint
+Everything is read from the performance_analyzer registry (stage timers and
+pipeline counters) plus the OCR admission controller and engine pool, so nothing here adds
+work to the request path beyond a few counter increments.
+
+With several worker processes set LEDGERIT_METRICS_DIR: each worker dumps its
+registry there after every upload and /metrics merges all of them. The gunicorn
+hooks (gunicorn.conf.py) delete a worker's file when it exits.
+"""
+
+import math
+import os
+import re
+
+from performance_analyzer import BUCKETS, registry, increment, dump_snapshot, load_snapshots
+from admission import ocr_admission
+from logging_config import get_logger
+
+METRICS_DIR = os.getenv('LEDGERIT_METRICS_DIR')
+PREFIX = 'ledgerit'
+
+logger = get_logger('metrics')
+
+def record_parse(bank, bank_type, pages, seconds, success):
+    """Count one parser run and the pages/seconds it took"""
+    outcome = 'success' if success else 'failure'
+    increment('parser_runs', bank=bank, bank_type=bank_type, outcome=outcome)
+    increment('parser_seconds', seconds, bank=bank)
+    increment('parser_pages', pages, bank=bank)
+    if METRICS_DIR:
+        try:
+            dump_snapshot(METRICS_DIR)
+        except OSError as e:
+            logger.warning("[METRICS] Could not write snapshot: %s", e)
+
+def record_cache(cache, hit):
+    increment('cache_requests', cache=cache, result='hit' if hit else 'miss')
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + '}'
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _stage_name(name):
+    # Timer names look like "bankDetector.detect_bank_from_pdf"
+    return re.sub(r'[^A-Za-z0-9_.]', '_', name)
+
+def _render_histograms(lines, histograms):
+    metric = f'{PREFIX}_stage_duration_seconds'
+    lines.append(f'# HELP {metric} Latency of each instrumented pipeline stage')
+    lines.append(f'# TYPE {metric} histogram')
+    for name in sorted(histograms):
+        hist = histograms[name]
+        stage = _stage_name(name)
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS + (math.inf,), hist.counts):
+            cumulative += bucket_count
+            lines.append(f'{metric}_bucket{_labels({"stage": stage, "le": _number(bound)})} {cumulative}')
+        lines.append(f'{metric}_sum{_labels({"stage": stage})} {_number(hist.total)}')
+        lines.append(f'{metric}_count{_labels({"stage": stage})} {hist.count}')
+
+def _render_series(lines, metric, metric_type, help_text, series):
+    lines.append(f'# HELP {metric} {help_text}')
+    lines.append(f'# TYPE {metric} {metric_type}')
+    for labels, value in series:
+        lines.append(f'{metric}{_labels(labels)} {_number(value)}')
+
+def _collect_counters(counters, name):
+    return [(labels, value) for counter, labels, value in counters if counter == name]
+
+def render_prometheus():
+    """Render all pipeline metrics in Prometheus text exposition format 0.0.4"""
+    if METRICS_DIR:
+        histograms, counters = load_snapshots(METRICS_DIR)
+    else:
+        histograms, counters = registry.histograms(), registry.counters()
+
+    lines = []
+    _render_histograms(lines, histograms)
+
+    runs = _collect_counters(counters, 'parser_runs')
+    _render_series(lines, f'{PREFIX}_parser_runs_total', 'counter',
+                   'Parser runs by bank and outcome', runs)
+
+    pages = dict((labels['bank'], value) for labels, value in _collect_counters(counters, 'parser_pages'))
+    seconds = dict((labels['bank'], value) for labels, value in _collect_counters(counters, 'parser_seconds'))
+    _render_series(lines, f'{PREFIX}_pages_processed_total', 'counter',
+                   'PDF pages parsed, by bank', [({'bank': bank}, value) for bank, value in sorted(pages.items())])
+    _render_series(lines, f'{PREFIX}_parser_seconds_total', 'counter',
+                   'Time spent inside bank parsers, by bank', [({'bank': bank}, value) for bank, value in sorted(seconds.items())])
+    _render_series(lines, f'{PREFIX}_seconds_per_page', 'gauge',
+                   'Average parser seconds per page, by bank',
+                   [({'bank': bank}, seconds.get(bank, 0.0) / count) for bank, count in sorted(pages.items()) if count])
+
+    total_pages = sum(pages.values())
+    total_seconds = sum(seconds.values())
+    _render_series(lines, f'{PREFIX}_pages_per_second', 'gauge',
+                   'Overall parser throughput since start',
+                   [({}, total_pages / total_seconds if total_seconds else 0.0)])
+
+    cache_requests = _collect_counters(counters, 'cache_requests')
+    _render_series(lines, f'{PREFIX}_cache_requests_total', 'counter',
+                   'Cache lookups by cache and result', cache_requests)
+    ratios = {}
+    for labels, value in cache_requests:
+        hits, total = ratios.get(labels['cache'], (0, 0))
+        ratios[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    _render_series(lines, f'{PREFIX}_cache_hit_ratio', 'gauge', 'Cache hit ratio by cache',
+                   [({'cache': cache}, hits / total) for cache, (hits, total) in sorted(ratios.items()) if total])
+
+    _render_series(lines, f'{PREFIX}_ocr_pages_total', 'counter',
+                   'Scanned pages OCRed, by the resolution they were finally read at',
+                   _collect_counters(counters, 'ocr_pages'))
+    _render_series(lines, f'{PREFIX}_ocr_dpi_escalations_total', 'counter',
+                   'Scanned pages re-rendered at a higher resolution after poor OCR confidence',
+                   _collect_counters(counters, 'ocr_dpi_escalations'))
+    _render_series(lines, f'{PREFIX}_ocr_cells_corrected_total', 'counter',
+                   'OCRed date / amount cells put back on the digit vocabulary',
+                   _collect_counters(counters, 'ocr_cells_corrected'))
+    _render_series(lines, f'{PREFIX}_pages_skipped_total', 'counter',
+                   'Pages skipped before rendering, by the kind they were classified as',
+                   _collect_counters(counters, 'pages_skipped'))
+    _render_series(lines, f'{PREFIX}_layout_template_lookups_total', 'counter',
+                   'Layout template lookups and learning by result (hit, miss, mismatch, rejected, not_learned)',
+                   _collect_counters(counters, 'layout_templates'))
+    _render_series(lines, f'{PREFIX}_layout_propagation_total', 'counter',
+                   'Pages read on the grid of the first transaction page, and why propagation did not apply',
+                   _collect_counters(counters, 'layout_propagation'))
+
+    # Admission state is live and per process
+    admission = ocr_admission.snapshot()
+    _render_series(lines, f'{PREFIX}_ocr_queue_depth', 'gauge',
+                   'Uploads waiting for an OCR slot', [({}, admission['queued'])])
+    _render_series(lines, f'{PREFIX}_ocr_active_jobs', 'gauge',
+                   'Uploads currently holding an OCR slot', [({}, admission['active'])])
+    _render_series(lines, f'{PREFIX}_ocr_max_concurrency', 'gauge',
+                   'Configured OCR slots', [({}, admission['max_concurrency'])])
+    _render_series(lines, f'{PREFIX}_ocr_rejected_total', 'counter',
+                   'Uploads rejected by admission control', [({}, admission['rejected'])])
+    _render_series(lines, f'{PREFIX}_ocr_wait_seconds_total', 'counter',
+                   'Total time uploads spent queued for an OCR slot', [({}, admission['wait_seconds'])])
+
+    # Imported here: ocr_pool itself records its cache hits through this module
+    from ocr_pool import ocr_pool
+    pool = ocr_pool.snapshot()
+    _render_series(lines, f'{PREFIX}_ocr_engines', 'gauge', 'OCR engines loaded, by state',
+                   [({'state': 'idle'}, pool['idle']), ({'state': 'in_use'}, pool['in_use'])])
+    _render_series(lines, f'{PREFIX}_ocr_engine_waits_total', 'counter',
+                   'Checkouts that had to wait for a free OCR engine', [({}, pool['waits'])])
+
+    return '\n'.join(lines) + '\n'
@@ -1,11 +1,9 @@
 from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db
-from flask_bcrypt import Bcrypt
+from password_hasher import password_hasher
 import os
 
-bcrypt = Bcrypt()
-
 class User:
     collection = db.users
     
@@ -15,7 +13,7 @@ class User:
         if User.find_by_email(email):
             return None
         
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_password = password_hasher.hash(password)
         
         user_data = {
             'email': email,
@@ -56,7 +54,21 @@ class User:
     @staticmethod
     def verify_password(stored_password, provided_password):
         """Verify password"""
-        return bcrypt.check_password_hash(stored_password, provided_password)
+        return password_hasher.verify(stored_password, provided_password)
+    
+    @staticmethod
+    def rehash_password_if_needed(user_id, stored_password, provided_password):
+        """Upgrade a verified password hash in the background when the bcrypt cost changed"""
+        if not password_hasher.needs_rehash(stored_password):
+            return False
+        
+        def save(new_hash):
+            User.collection.update_one(
+                {'_id': ObjectId(user_id), 'password': stored_password},
+                {'$set': {'password': new_hash, 'updated_at': datetime.utcnow()}}
+            )
+        
+        return password_hasher.rehash_in_background(provided_password, save)
     
     @staticmethod
     def update_pages_used(user_id, pages_count):
@@ -0,0 +1,126 @@
+"""
+Digit-only decoding for date and amount columns
+Most OCRed cells are dates, amounts and balances, yet the recogniser reads
+them against its full character set and returns O for 0, S for 5 or l for
+1, which later breaks float() in the balance calculations. Once the header
+row says which columns hold dates or amounts, their cells are brought back
+onto the digit / separator vocabulary - on the header's page and on the
+continuation pages after it (ColumnTypes). Narration and reference columns keep
+whatever the recogniser read.
+
+The engines behind ocr_backends return text, not per-character scores, so
+the vocabulary is applied to the decoded text: each part of a number
+between separators that reads as digits once the usual confusions are
+undone is replaced by those digits. Words (Cr, Dr, month names, "Opening
+Balance") are left alone.
+
+    OCR_NUMERIC_COLUMNS   true / false (default true)
+"""
+
+import os
+import re
+
+from performance_analyzer import increment
+
+OCR_NUMERIC_COLUMNS = os.getenv('OCR_NUMERIC_COLUMNS', 'true').lower() == 'true'
+
+DATE, AMOUNT, TEXT = 'date', 'amount', 'text'
+
+# Also matches the normalized labels of layout templates ("valuedt", "withdrawalamt")
+DATE_HEADER_REGEX = re.compile(r'date|dt\b', re.IGNORECASE)
+AMOUNT_HEADER_REGEX = re.compile(r'debit|credit|withdraw|deposit|balance|amount|amt\b', re.IGNORECASE)
+# Letters recognisers put in place of digits
+CONFUSABLE_DIGITS = str.maketrans({
+    'O': '0', 'o': '0', 'Q': '0', 'D': '0',
+    'I': '1', 'l': '1', 'i': '1', '|': '1', '!': '1',
+    'Z': '2', 'z': '2',
+    'S': '5', 's': '5',
+    'G': '6', 'b': '6',
+    'T': '7',
+    'B': '8',
+    'g': '9', 'q': '9'
+})
+SEPARATOR_REGEX = re.compile(r'([\s.,/:-]+)')
+# Balance suffixes stay words
+SUFFIX_REGEX = re.compile(r'(\s*\(?(?:cr|dr)\)?\.?)$', re.IGNORECASE)
+
+def column_type(label):
+    """DATE, AMOUNT or TEXT for a header label"""
+    label = str(label or '')
+    if DATE_HEADER_REGEX.search(label):
+        return DATE
+    if AMOUNT_HEADER_REGEX.search(label):
+        return AMOUNT
+    return TEXT
+
+def constrain(text, kind):
+    """text of a DATE / AMOUNT cell on the digit vocabulary; TEXT cells unchanged"""
+    if kind == TEXT or not text:
+        return text
+    suffix = SUFFIX_REGEX.search(text)
+    body = text[:suffix.start()] if suffix else text
+    parts = SEPARATOR_REGEX.split(body)
+    digits = [part.translate(CONFUSABLE_DIGITS) for part in parts]
+    if not any(char.isdigit() for char in body) and (len(parts) == 1 or not all(d.isdigit() for d in digits[::2] if d)):
+        # No digit read and not shaped like a number either: a word such as "To" or "Opening Balance"
+        return text
+    body = ''.join(d if d.isdigit() else part for part, d in zip(parts, digits))
+    return body + (suffix.group(1) if suffix else '')
+
+def _header_types(row):
+    """Column types of a header row, or None when it does not look like one"""
+    kinds = [column_type(cell.value) for cell in row]
+    return kinds if sum(kind != TEXT for kind in kinds) >= 2 else None
+
+class ColumnTypes:
+    """Column types of the last header row seen in a document.
+
+    Continuation pages usually repeat no header; their tables take the
+    types of the last header when they have as many columns.
+    """
+
+    def __init__(self):
+        self.kinds = None
+
+    def for_table(self, rows):
+        """(types, index of the first row to constrain) for a table's rows, or (None, None)"""
+        for idx, row in enumerate(rows):
+            kinds = _header_types(row)
+            if kinds is not None:
+                self.kinds = kinds
+                return kinds, idx + 1
+        if rows and self.kinds is not None and len(rows[0]) == len(self.kinds):
+            return self.kinds, 0
+        return None, None
+
+def constrain_tables(tables, column_types=None):
+    """Apply the digit vocabulary to the date / amount columns of OCRed ExtractedTables, in place.
+
+    The types come from the table's own header row or, for tables without
+    one, from the last header column_types saw on an earlier page. Cells
+    merged across columns (the same cell repeated in a row) may hold
+    narration and are left alone.
+    """
+    if not OCR_NUMERIC_COLUMNS:
+        return tables
+    if column_types is None:
+        column_types = ColumnTypes()
+    corrected = 0
+    for table in tables:
+        rows = list(table.content.values())
+        kinds, first = column_types.for_table(rows)
+        if kinds is None:
+            continue
+        for row in rows[first:]:
+            counts = {}
+            for cell in row:
+                counts[id(cell)] = counts.get(id(cell), 0) + 1
+            for cell, kind in zip(row, kinds):
+                if counts[id(cell)] == 1 and cell.value:
+                    value = constrain(cell.value, kind)
+                    if value != cell.value:
+                        cell.value = value
+                        corrected += 1
+    if corrected:
+        increment('ocr_cells_corrected', corrected)
+    return tables
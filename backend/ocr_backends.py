@@ -0,0 +1,164 @@
+"""
+OCR engines behind one interface
+Every backend builds an object with img2table's OCR interface,
+of(document) -> OCRData, so page_pipeline, the table region crop and the
+layout template grid work the same whichever engine reads the pixels.
+
+    paddle      PaddleOCR; text lines recognised in batches with OCR_BATCHED (batched_ocr)
+    easyocr     EasyOCR
+    tesseract   Tesseract (the tesseract binary must be installed)
+    onnx        RapidOCR on ONNX Runtime, meant for int8 models (see quantize below)
+
+With OCR_BACKEND=auto the engine is chosen per bank from OCR_BACKEND_FILE,
+which `python benchmark.py --ocr-backends ...` writes after measuring
+accuracy and pages/second on the corpus; banks it has not measured use its
+overall choice, and paddle when there is no file. The libraries are only
+imported when an engine is built.
+
+    OCR_BACKEND           auto / paddle / easyocr / tesseract / onnx (default auto)
+    OCR_BACKEND_FILE      per-bank choice (default ocr_backends.json under LEDGERIT_DATA_DIR)
+    OCR_BATCHED           batched recognition for paddle (default true)
+    OCR_ONNX_DET_MODEL    detection model for onnx (default: RapidOCR's bundled model)
+    OCR_ONNX_REC_MODEL    recognition model for onnx (default: RapidOCR's bundled model)
+
+Int8 models for the onnx backend:
+
+    python ocr_backends.py quantize det.onnx det_int8.onnx
+"""
+
+import json
+import os
+import sys
+import threading
+
+from data_dir import data_path, ensure_parent
+from logging_config import get_logger
+
+logger = get_logger("ocr_backends")
+
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto').lower()
+OCR_BACKEND_FILE = data_path(os.getenv('OCR_BACKEND_FILE', 'ocr_backends.json'))
+OCR_BATCHED = os.getenv('OCR_BATCHED', 'true').lower() == 'true'
+OCR_ONNX_DET_MODEL = os.getenv('OCR_ONNX_DET_MODEL')
+OCR_ONNX_REC_MODEL = os.getenv('OCR_ONNX_REC_MODEL')
+
+DEFAULT_BACKEND = 'paddle'
+
+def _paddle(threads):
+    if OCR_BATCHED:
+        from batched_ocr import BatchedOCR, BATCHING_SUPPORTED
+        if BATCHING_SUPPORTED:
+            return BatchedOCR(threads=threads)
+    from img2table.ocr import PaddleOCR
+    return PaddleOCR(lang="en", kw={"cpu_threads": threads})
+
+def _easyocr(threads):
+    import torch
+    from img2table.ocr import EasyOCR
+    # EasyOCR runs on torch, which otherwise takes every core
+    torch.set_num_threads(threads)
+    return EasyOCR(lang=["en"], kw={"gpu": False})
+
+def _tesseract(threads):
+    from img2table.ocr import TesseractOCR
+    return TesseractOCR(n_threads=threads, lang="eng")
+
+def _onnx(threads):
+    from img2table.ocr import RapidOCR
+    params = {
+        "Global.use_cls": False,
+        "EngineConfig.onnxruntime.intra_op_num_threads": threads
+    }
+    if OCR_ONNX_DET_MODEL:
+        params["Det.model_path"] = OCR_ONNX_DET_MODEL
+    if OCR_ONNX_REC_MODEL:
+        params["Rec.model_path"] = OCR_ONNX_REC_MODEL
+    return RapidOCR(params=params)
+
+BACKENDS = {
+    'paddle': _paddle,
+    'easyocr': _easyocr,
+    'tesseract': _tesseract,
+    'onnx': _onnx
+}
+
+def create_engine(backend, threads=1):
+    """A new OCR engine of the given backend limited to `threads` CPU threads"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[backend](threads)
+
+class BackendChoice:
+    """Per-bank backends from OCR_BACKEND_FILE, re-read when the benchmark rewrites it"""
+
+    def __init__(self, path=OCR_BACKEND_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._choice = {}
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._mtime, self._choice = None, {}
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                self._choice = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read OCR backend choice from %s: %s", self.path, e)
+            self._choice = {}
+        self._mtime = mtime
+
+    def backend_for(self, bank=None):
+        with self._lock:
+            self._load()
+            choice = self._choice
+        backend = choice.get('banks', {}).get(bank) or choice.get('default') or DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            logger.warning("Unknown OCR backend %r chosen for %s, using %s", backend, bank, DEFAULT_BACKEND)
+            return DEFAULT_BACKEND
+        return backend
+
+    def backends(self):
+        """Every backend the choice names - the default and each bank's"""
+        with self._lock:
+            self._load()
+            choice = self._choice
+        named = {choice.get('default') or DEFAULT_BACKEND, *choice.get('banks', {}).values()}
+        return sorted(backend for backend in named if backend in BACKENDS)
+
+    def save(self, default, banks):
+        with self._lock:
+            with open(ensure_parent(self.path), 'w') as f:
+                json.dump({'default': default, 'banks': banks}, f, indent=2)
+            self._mtime = None
+
+backend_choice = BackendChoice()
+
+def backend_for(bank=None):
+    """OCR_BACKEND, or the benchmarked choice for bank when it is "auto" """
+    if OCR_BACKEND != 'auto':
+        return OCR_BACKEND
+    return backend_choice.backend_for(bank)
+
+def chosen_backends():
+    """Backends requests can be served with, so all of them can be loaded before fork"""
+    if OCR_BACKEND != 'auto':
+        return [OCR_BACKEND]
+    return backend_choice.backends()
+
+def quantize(model_path, output_path):
+    """Write an int8 (dynamic, weights only) copy of an ONNX model"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != 'quantize':
+        print("Usage: python ocr_backends.py quantize <model.onnx> <model_int8.onnx>")
+        sys.exit(2)
+    print(quantize(sys.argv[2], sys.argv[3]))
@@ -0,0 +1,139 @@
+"""
+Bounded pool of OCR engines for threaded workers
+PaddleOCR inference is not safe to run concurrently on one engine, so the
+parsers check an engine out for the duration of their table extraction and
+check it back in afterwards. With OCR_POOL_SIZE engines a single process can
+serve that many uploads at once, each engine limited to OCR_THREADS CPU
+threads so the total stays predictable.
+
+    OCR_POOL_SIZE   engines per process (default 2)
+    OCR_THREADS     CPU threads per engine (default: cores / pool size)
+
+The admission controller's OCR_MAX_CONCURRENCY defaults to OCR_POOL_SIZE, so
+requests normally queue there and never wait on the pool itself.
+
+Each pool holds engines of one OCR backend (ocr_backends). ocr_pool serves
+the default one; pool_for(bank) returns the pool of the backend chosen for a
+bank, creating it on first use. all_pools() returns the pools of every
+backend the selection names, so they can be preloaded before fork.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+import ocr_backends
+from metrics import record_cache
+
+load_dotenv()
+
+OCR_POOL_SIZE = int(os.getenv('OCR_POOL_SIZE', 2))
+OCR_THREADS = int(os.getenv('OCR_THREADS', 0))
+
+class OCRPool:
+    """Checkout/checkin pool, growing lazily up to `size` engines"""
+
+    def __init__(self, size=2, threads=None, factory=None, backend=None):
+        self.size = max(1, size)
+        self.backend = backend or ocr_backends.backend_for()
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.size)
+        self._factory = factory or self._create_engine
+        self._cond = threading.Condition()
+        self._idle = []
+        self._created = 0
+        self.stats = {'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0, 'timed_out': 0}
+
+    def _create_engine(self):
+        return ocr_backends.create_engine(self.backend, self.threads)
+
+    def checkout(self, timeout=None):
+        """Take an idle engine, build a new one while under size, else wait"""
+        start = time.perf_counter()
+        with self._cond:
+            self.stats['checkouts'] += 1
+            waited = False
+            while not self._idle and self._created >= self.size:
+                remaining = None if timeout is None else start + timeout - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    self.stats['timed_out'] += 1
+                    raise TimeoutError("No OCR engine became free")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self.stats['waits'] += 1
+                self.stats['wait_seconds'] += time.perf_counter() - start
+            if self._idle:
+                record_cache('ocr_instance', True)
+                return self._idle.pop()
+            # Reserve the slot, then load the model outside the lock
+            self._created += 1
+
+        try:
+            engine = self._factory()
+        except BaseException:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+        record_cache('ocr_instance', False)
+        return engine
+
+    def checkin(self, engine):
+        with self._cond:
+            self._idle.append(engine)
+            self._cond.notify()
+
+    @contextmanager
+    def engine(self, timeout=None):
+        engine = self.checkout(timeout)
+        try:
+            yield engine
+        finally:
+            self.checkin(engine)
+
+    def preload(self):
+        """Build every engine now - in the gunicorn master they are then shared copy-on-write"""
+        engines = [self.checkout() for _ in range(self.size)]
+        for engine in engines:
+            self.checkin(engine)
+        return engines
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'backend': self.backend,
+                'size': self.size,
+                'threads': self.threads,
+                'created': self._created,
+                'idle': len(self._idle),
+                'in_use': self._created - len(self._idle),
+                **self.stats
+            }
+
+ocr_pool = OCRPool(size=OCR_POOL_SIZE, threads=OCR_THREADS or None)
+
+_backend_pools = {}
+_backend_pools_lock = threading.Lock()
+
+def _pool_of(backend):
+    if backend == ocr_pool.backend:
+        return ocr_pool
+    with _backend_pools_lock:
+        if backend not in _backend_pools:
+            _backend_pools[backend] = OCRPool(size=OCR_POOL_SIZE, threads=OCR_THREADS or None, backend=backend)
+        return _backend_pools[backend]
+
+def pool_for(bank=None):
+    """Pool of the OCR backend chosen for bank"""
+    return _pool_of(ocr_backends.backend_for(bank))
+
+def all_pools():
+    """The default pool and the pool of every backend in the selection"""
+    pools = [ocr_pool]
+    for backend in ocr_backends.chosen_backends():
+        pool = _pool_of(backend)
+        if pool not in pools:
+            pools.append(pool)
+    return pools
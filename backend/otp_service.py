@@ -1,41 +1,17 @@
 import random
 import time
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 from dotenv import load_dotenv
+from email_dispatcher import create_dispatcher_from_env
+from logging_config import get_logger
 
 load_dotenv()
 
-class OTPService:
-    def __init__(self):
-        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        self.smtp_port = int(os.getenv('SMTP_PORT', 587))
-        self.email_user = os.getenv('EMAIL_USER')
-        self.email_password = os.getenv('EMAIL_PASSWORD')
-        self.otp_storage = {}
-    
-    def generate_otp(self):
-        return str(random.randint(100000, 999999))
-    
-    def send_otp(self, email):
-        otp = self.generate_otp()
-        
-        self.otp_storage[email] = {
-            'otp': otp,
-            'expires_at': time.time() + 300,
-            'attempts': 0
-        }
-        
-        if self.email_user and self.email_password:
-            try:
-                msg = MIMEMultipart()
-                msg['From'] = self.email_user
-                msg['To'] = email
-                msg['Subject'] = "Ledgerit - Email Verification Code"
-                
-                body = f"""
+logger = get_logger("otp")
+
+OTP_EMAIL_TEMPLATE = """
                 <!DOCTYPE html>
                 <html>
                 <head>
@@ -122,23 +98,50 @@ class OTPService:
                 </body>
                 </html>
 
-                """
-                
-                msg.attach(MIMEText(body, 'html'))
-                
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                server.starttls()
-                server.login(self.email_user, self.email_password)
-                server.send_message(msg)
-                server.quit()
-                
+"""
+
+# Split once at import so each OTP email is two string concatenations
+_OTP_EMAIL_HEAD, _OTP_EMAIL_TAIL = OTP_EMAIL_TEMPLATE.split('{otp}')
+
+def render_otp_email(otp):
+    """Fill the pre-rendered verification template with an OTP"""
+    return _OTP_EMAIL_HEAD + otp + _OTP_EMAIL_TAIL
+
+class OTPService:
+    def __init__(self):
+        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+        self.smtp_port = int(os.getenv('SMTP_PORT', 587))
+        self.email_user = os.getenv('EMAIL_USER')
+        self.email_password = os.getenv('EMAIL_PASSWORD')
+        self.otp_storage = {}
+        self.dispatcher = create_dispatcher_from_env() if self.email_user and self.email_password else None
+    
+    def generate_otp(self):
+        return str(random.randint(100000, 999999))
+    
+    def send_otp(self, email):
+        otp = self.generate_otp()
+        
+        self.otp_storage[email] = {
+            'otp': otp,
+            'expires_at': time.time() + 300,
+            'attempts': 0
+        }
+        
+        if self.dispatcher:
+            msg = MIMEMultipart()
+            msg['From'] = self.email_user
+            msg['To'] = email
+            msg['Subject'] = "Ledgerit - Email Verification Code"
+            msg.attach(MIMEText(render_otp_email(otp), 'html'))
+            
+            if self.dispatcher.submit(msg):
                 return True, "OTP sent to your email"
-            except Exception as e:
-                print(f"Email error: {e}")
-                print(f"DEV MODE - OTP for {email}: {otp}")
-                return True, f"OTP sent (Dev mode: {otp})"
+            
+            del self.otp_storage[email]
+            return False, "Email service is busy, please try again shortly"
         else:
-            print(f"DEV MODE - OTP for {email}: {otp}")
+            logger.warning("DEV MODE - OTP for %s: %s", email, otp)
             return True, f"OTP sent (Dev mode: {otp})"
     
     def verify_otp(self, email, otp):
@@ -0,0 +1,128 @@
+"""
+Cheap page classification before rendering and OCR
+Statements often end with pages of terms, branch addresses or insurance
+notices that the parsers only recognise - and drop - after the page was
+rendered at full resolution and OCRed. classify_page labels a page first:
+
+    transactions   dated rows with amounts, or any dates at all
+    summary        totals / closing balance, or amounts without dates
+    boilerplate    no dates, amounts or totals
+
+Pages with a usable text layer are classified from their text. Scanned pages
+are classified from a 36 DPI thumbnail as transactions or boilerplate: ink
+density, ruling lines, and how many text lines break into three or more
+separate blocks (table rows do, running text does not). The image test is
+deliberately conservative - it only calls a page boilerplate when it is
+blank, unruled and has no table-like lines.
+
+    PAGE_CLASSIFIER          true / false (default true)
+    PAGE_SKIP_KINDS          kinds never rendered or OCRed (default "boilerplate")
+    PAGE_MIN_TABLE_LINES     table-like lines a scanned page needs (default 3)
+"""
+
+import os
+import re
+
+import cv2
+import numpy as np
+
+from performance_analyzer import measure
+from tracing import current_span
+
+PAGE_CLASSIFIER = os.getenv('PAGE_CLASSIFIER', 'true').lower() == 'true'
+PAGE_SKIP_KINDS = frozenset(kind.strip() for kind in os.getenv('PAGE_SKIP_KINDS', 'boilerplate').split(',') if kind.strip())
+PAGE_MIN_TABLE_LINES = int(os.getenv('PAGE_MIN_TABLE_LINES', 3))
+
+TRANSACTIONS, SUMMARY, BOILERPLATE = 'transactions', 'summary', 'boilerplate'
+
+# Text layers shorter than this (a print stamp on a scan) say nothing about the page
+MIN_TEXT_CHARS = 200
+THUMBNAIL_DPI = 36
+# Under this share of dark pixels the page is blank
+MIN_INK_SHARE = 0.005
+
+DATE_REGEX = re.compile(
+    r'\b\d{1,2}[-/.](?:\d{1,2}|[A-Za-z]{3})[-/.]\d{2,4}\b'
+    r'|\b(?:JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)[A-Z]*\s?\d{1,2},?\s\d{4}\b',
+    re.IGNORECASE
+)
+# Whole numbers and one or two decimals ("300", "2598.1", "1,250.00"), optionally with a
+# Cr/Dr suffix directly after ("1,250.00Cr"); not the parts of a date, time or reference
+AMOUNT_REGEX = re.compile(r'(?<![\w/.,:-])\d[\d,]*(?:\.\d{1,2})?(?:\s?(?:CR|DR)\b|(?![\w/,:-]|\.\d))',
+                          re.IGNORECASE)
+SUMMARY_KEYWORDS = ("GRAND TOTAL", "PAGE TOTAL", "FUNDS IN CLEARING", "CLOSING BALANCE",
+                    "STATEMENT SUMMARY", "END OF STATEMENT")
+
+def classify_text(text):
+    dates = len(DATE_REGEX.findall(text))
+    amounts = len(AMOUNT_REGEX.findall(text))
+    if dates >= 2 and amounts >= 2:
+        return TRANSACTIONS
+    upper = text.upper()
+    if any(keyword in upper for keyword in SUMMARY_KEYWORDS):
+        return SUMMARY
+    if dates:
+        # However its amounts are printed, a dated page is never skipped
+        return TRANSACTIONS
+    return SUMMARY if amounts else BOILERPLATE
+
+def _count_runs(mask):
+    """Separate runs of True in a 1-D mask - rules several pixels thick count once"""
+    mask = np.asarray(mask, dtype=np.int8)
+    return int(np.count_nonzero(np.diff(np.concatenate(([0], mask))) == 1))
+
+def classify_image(gray):
+    """Classify a grayscale thumbnail as TRANSACTIONS or BOILERPLATE.
+
+    A thumbnail cannot tell a summary from a transaction page, so SUMMARY
+    is only ever returned from text. A page is a table when it is ruled
+    (PAGE_MIN_TABLE_LINES horizontal rules and at least two vertical ones)
+    or, once the rules are removed, has PAGE_MIN_TABLE_LINES lines of three
+    or more separate blocks.
+    """
+    ink = (gray < 160).astype(np.uint8)
+    if ink.mean() < MIN_INK_SHARE:
+        return BOILERPLATE
+
+    height, width = ink.shape
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (width // 4, 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 8)))
+    if _count_runs(horizontal.any(axis=1)) >= PAGE_MIN_TABLE_LINES and _count_runs(vertical.any(axis=0)) >= 2:
+        return TRANSACTIONS
+
+    # Close the gaps between words but not between columns
+    blocks = cv2.dilate(ink & ~(horizontal | vertical), cv2.getStructuringElement(cv2.MORPH_RECT, (5, 1)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(blocks)
+    per_line = {}
+    for _, y, _, h, _ in stats[1:count]:
+        line = (y + h // 2) // 4
+        per_line[line] = per_line.get(line, 0) + 1
+    table_lines = sum(1 for blocks_on_line in per_line.values() if blocks_on_line >= 3)
+    return TRANSACTIONS if table_lines >= PAGE_MIN_TABLE_LINES else BOILERPLATE
+
+def page_text(page):
+    """Text layer of a pypdfium2 page"""
+    text_page = page.get_textpage()
+    try:
+        return text_page.get_text_range()
+    finally:
+        text_page.close()
+
+def has_dates(page):
+    """Whether the page's text layer has a date anywhere"""
+    return DATE_REGEX.search(page_text(page)) is not None
+
+def classify_page(page, page_number=None):
+    """Label a pypdfium2 page without rendering it at full resolution"""
+    with measure('page.classify'):
+        text = page_text(page)
+
+        if len(text.strip()) >= MIN_TEXT_CHARS:
+            kind, source = classify_text(text), 'text'
+        else:
+            gray = page.render(scale=THUMBNAIL_DPI / 72, grayscale=True).to_numpy()
+            if gray.ndim == 3:
+                gray = gray[:, :, 0]
+            kind, source = classify_image(gray), 'thumbnail'
+        current_span().set_attributes(page=page_number, kind=kind, source=source)
+        return kind
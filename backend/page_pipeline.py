@@ -0,0 +1,275 @@
+"""
+Page-at-a-time table extraction
+Drop-in replacement for PDF(src).extract_tables(...) that renders and
+extracts one page at a time, so each page gets its own render / table
+detection / OCR spans and timings instead of one opaque call per document.
+
+`src` may be bytes, a path or a SpooledPDF: pages are rendered from the file
+and img2table only gets the bytes when it needs the PDF text layer.
+
+Scanned pages (no text layer) are OCRed at the lowest of OCR_DPI_STEPS first
+and re-rendered one step up only when the OCR confidence is poor, and only
+their table regions are OCRed (table_regions). Pages page_classifier labels
+as boilerplate are skipped before rendering and come back with no tables,
+and once a page closes the statement (closing balance, end of statement,
+grand total below the last dated row of its last table) with no dated or
+transaction-like page after it, the rest is not read.
+"""
+
+import os
+import re
+
+import cv2
+import pypdfium2
+from img2table.document import PDF
+
+from numeric_columns import ColumnTypes, constrain_tables
+from page_classifier import classify_page, has_dates, DATE_REGEX, PAGE_CLASSIFIER, PAGE_SKIP_KINDS, TRANSACTIONS
+from performance_analyzer import measure, increment
+from spooled_pdf import file_path, pdfium_input, read_bytes
+from table_regions import TableRegionOCR, OCR_TABLE_CROP
+from tracing import current_span, TracedOCR, ENABLED as TRACING_ENABLED
+
+# Same resolution img2table renders at - and the scale it maps the PDF text layer to
+RENDER_DPI = 200
+
+# Resolutions tried for pages without a text layer, lowest first; "200" turns escalation off
+OCR_DPI_STEPS = sorted(int(dpi) for dpi in os.getenv('OCR_DPI_STEPS', '150,200').split(','))
+# A pass is redone one step up when its words average below this confidence (0-100) ...
+ESCALATE_MEAN_CONFIDENCE = float(os.getenv('OCR_ESCALATE_MEAN_CONFIDENCE', 80))
+# ... or when more than this share of them falls below min_confidence and is dropped
+ESCALATE_REJECTED_SHARE = float(os.getenv('OCR_ESCALATE_REJECTED_SHARE', 0.15))
+
+# Stop once a page ends the statement and no later page looks like transactions
+STOP_AT_STATEMENT_END = os.getenv('STOP_AT_STATEMENT_END', 'true').lower() == 'true'
+# Unlike a per-page "C/F" or "Page Total", these only appear where the statement ends
+STATEMENT_END_REGEX = re.compile(r'\b(closing\s*balance|end\s*of\s*statement|grand\s*total)\b', re.IGNORECASE)
+# ... and only in this many rows at the bottom of the page's last table, not in a summary box above it
+STATEMENT_END_ROWS = 3
+
+def page_count(src):
+    doc = pypdfium2.PdfDocument(pdfium_input(src))
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+def iter_pages(src, pages=None):
+    """Yield (page_number, pypdfium2 page) opening the document only once"""
+    doc = pypdfium2.PdfDocument(pdfium_input(src))
+    try:
+        page_numbers = range(len(doc)) if pages is None else pages
+        for page_number in page_numbers:
+            page = doc[page_number]
+            try:
+                yield page_number, page
+            finally:
+                page.close()
+    finally:
+        doc.close()
+
+def render_page(page, page_number, dpi=RENDER_DPI):
+    """RGB image of one page"""
+    with measure('page.render'):
+        current_span().set_attributes(page=page_number, dpi=dpi)
+        return cv2.cvtColor(page.render(scale=dpi / 72).to_numpy(), cv2.COLOR_BGR2RGB)
+
+def render_pages(src, pages=None, dpi=RENDER_DPI):
+    """Yield (page_number, RGB image)"""
+    for page_number, page in iter_pages(src, pages):
+        yield page_number, render_page(page, page_number, dpi)
+
+def has_text_layer(page):
+    """img2table's own test: more than one character in the PDF text layer"""
+    text_page = page.get_textpage()
+    try:
+        return text_page.count_chars() > 1
+    finally:
+        text_page.close()
+
+def _word_confidences(ocr_data):
+    if ocr_data is None:
+        return []
+    records = getattr(ocr_data, 'records', None)
+    if records is not None:
+        # img2table 2.x: {page: [word dict, ...]}
+        return [word['confidence'] for words in records.values() for word in words
+                if word.get('confidence') is not None]
+    # img2table 1.x: OCRDataframe over a polars frame
+    return [confidence for confidence in ocr_data.df['confidence'].to_list() if confidence is not None]
+
+class ConfidenceProbe:
+    """OCR proxy that keeps the word confidences of the pass it ran"""
+
+    def __init__(self, ocr, min_confidence=50):
+        self._ocr = ocr
+        self.min_confidence = min_confidence
+        self.confidences = []
+
+    def of(self, document):
+        ocr_data = self._ocr.of(document=document)
+        self.confidences = _word_confidences(ocr_data)
+        return ocr_data
+
+    def __getattr__(self, name):
+        return getattr(self._ocr, name)
+
+    def summary(self):
+        """(mean confidence, share of words under min_confidence); (None, None) if nothing was read"""
+        if not self.confidences:
+            return None, None
+        rejected = sum(1 for confidence in self.confidences if confidence < self.min_confidence)
+        return sum(self.confidences) / len(self.confidences), rejected / len(self.confidences)
+
+    def poor(self):
+        # Nothing read at all may just as well be a table the low resolution missed
+        mean, rejected = self.summary()
+        return mean is None or mean < ESCALATE_MEAN_CONFIDENCE or rejected > ESCALATE_REJECTED_SHARE
+
+def table_source(src, pdf_text_extraction=True):
+    """What to hand img2table for src - resolve once per document, not per page.
+
+    With the page images supplied img2table reads the file only for its text
+    layer, so without text extraction a path is enough.
+    """
+    if pdf_text_extraction:
+        return read_bytes(src)
+    return file_path(src) or src
+
+def extract_page_tables(src, page_number, img, ocr, implicit_rows=False, implicit_columns=False,
+                        borderless_tables=False, min_confidence=50, pdf_text_extraction=True):
+    """Detect and read the tables of one already rendered page"""
+    with measure('page.extract_tables'):
+        span = current_span()
+        page_doc = PDF(table_source(src, pdf_text_extraction), pages=[page_number], _images=[img],
+                       pdf_text_extraction=pdf_text_extraction)
+        if ocr is not None and OCR_TABLE_CROP:
+            ocr = TableRegionOCR(ocr, implicit_rows=implicit_rows, implicit_columns=implicit_columns,
+                                 borderless_tables=borderless_tables)
+        tables = page_doc.extract_tables(
+            ocr=TracedOCR(ocr) if TRACING_ENABLED and ocr is not None else ocr,
+            implicit_rows=implicit_rows,
+            implicit_columns=implicit_columns,
+            borderless_tables=borderless_tables,
+            min_confidence=min_confidence
+        ).get(page_number, [])
+        span.set_attributes(page=page_number, tables=len(tables), rows=sum(len(table.df) for table in tables))
+        return tables
+
+def extract_page_tables_adaptive(src, page, page_number, ocr, min_confidence=50,
+                                 pdf_text_extraction=True, column_types=None, **options):
+    """Tables of one page, OCRing scanned pages at the lowest resolution that reads well.
+
+    Pages with a text layer never reach the OCR engine and always render at
+    RENDER_DPI, where img2table places the PDF text. On OCRed pages the date
+    and amount columns are put back on the digit vocabulary (numeric_columns);
+    pass the document's ColumnTypes so pages without a header row get the
+    types of the last one.
+    """
+    scanned = ocr is not None and not has_text_layer(page)
+    if not scanned or len(OCR_DPI_STEPS) == 1:
+        img = render_page(page, page_number)
+        tables = extract_page_tables(src, page_number, img, ocr, min_confidence=min_confidence,
+                                     pdf_text_extraction=pdf_text_extraction, **options)
+        return constrain_tables(tables, column_types) if scanned else tables
+
+    for dpi in OCR_DPI_STEPS:
+        img = render_page(page, page_number, dpi)
+        probe = ConfidenceProbe(ocr, min_confidence)
+        tables = extract_page_tables(src, page_number, img, probe, min_confidence=min_confidence,
+                                     pdf_text_extraction=pdf_text_extraction and dpi == RENDER_DPI, **options)
+        del img
+        mean, rejected = probe.summary()
+        current_span().set_attributes(dpi=dpi, mean_confidence=mean, rejected_share=rejected)
+        if dpi == OCR_DPI_STEPS[-1] or not probe.poor():
+            break
+        increment('ocr_dpi_escalations', from_dpi=dpi)
+    increment('ocr_pages', dpi=dpi)
+    return constrain_tables(tables, column_types)
+
+def _row_matches(row, regex):
+    return any(isinstance(cell, str) and regex.search(cell) for cell in row)
+
+def ends_statement(tables):
+    """Whether the page closes the statement.
+
+    The closing balance / end of statement marker has to be in the last
+    STATEMENT_END_ROWS rows of the page's last table with no dated row below
+    it, so an "Opening Balance | ... | Closing Balance" box on the first page
+    does not count.
+    """
+    if not tables:
+        return False
+    rows = tables[-1].df.values.tolist()
+    for row in reversed(rows[-STATEMENT_END_ROWS:]):
+        if _row_matches(row, STATEMENT_END_REGEX):
+            return True
+        if _row_matches(row, DATE_REGEX):
+            return False
+    return False
+
+def iter_page_tables(src, ocr=None, implicit_rows=False, implicit_columns=False,
+                     borderless_tables=False, min_confidence=50, pdf_text_extraction=True, pages=None,
+                     layout=None):
+    """Yield (page_number, [ExtractedTable, ...]) one page at a time.
+
+    Pages after the end of the statement are not yielded at all. With a
+    `layout` (layout_templates.GridReader) pages are read on its fixed grid
+    instead of by img2table's table detection.
+    """
+    document = table_source(src, pdf_text_extraction) if layout is None else None
+    page_numbers = list(range(page_count(src)) if pages is None else pages)
+    kinds = {}
+    column_types = ColumnTypes()
+
+    def kind_of(page, page_number):
+        if page_number not in kinds:
+            kinds[page_number] = classify_page(page, page_number)
+        return kinds[page_number]
+
+    def statement_continues(after):
+        # Cheap check of what is left: any page with a date, or a scan that looks like a table
+        return any(has_dates(page) or kind_of(page, page_number) == TRANSACTIONS
+                   for page_number, page in iter_pages(src, page_numbers[after:]))
+
+    for position, (page_number, page) in enumerate(iter_pages(src, page_numbers), start=1):
+        if PAGE_CLASSIFIER:
+            kind = kind_of(page, page_number)
+            if kind in PAGE_SKIP_KINDS:
+                increment('pages_skipped', kind=kind)
+                yield page_number, []
+                continue
+        if layout is not None:
+            tables = layout.page_tables(page, page_number)
+        else:
+            tables = extract_page_tables_adaptive(
+                document, page, page_number, ocr,
+                implicit_rows=implicit_rows,
+                implicit_columns=implicit_columns,
+                borderless_tables=borderless_tables,
+                min_confidence=min_confidence,
+                pdf_text_extraction=pdf_text_extraction,
+                column_types=column_types
+            )
+        yield page_number, tables
+
+        remaining = len(page_numbers) - position
+        if STOP_AT_STATEMENT_END and remaining and ends_statement(tables) and not statement_continues(position):
+            current_span().set_attributes(statement_end_page=page_number, pages_not_read=remaining)
+            increment('pages_skipped', remaining, kind='after_statement_end')
+            return
+
+def extract_tables(src, ocr=None, implicit_rows=False, implicit_columns=False,
+                   borderless_tables=False, min_confidence=50, pdf_text_extraction=True, pages=None,
+                   layout=None):
+    """Same result shape as img2table: {page_number: [ExtractedTable, ...]}"""
+    return dict(iter_page_tables(
+        src, ocr,
+        implicit_rows=implicit_rows,
+        implicit_columns=implicit_columns,
+        borderless_tables=borderless_tables,
+        min_confidence=min_confidence,
+        pdf_text_extraction=pdf_text_extraction,
+        pages=pages,
+        layout=layout
+    ))
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask_bcrypt import Bcrypt
+from dotenv import load_dotenv
+from logging_config import get_logger
+
+load_dotenv()
+
+logger = get_logger("password_hasher")
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify requests are already waiting, or one waited too long"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool so login bursts cannot take every core"""
+
+    def __init__(self, rounds=12, max_workers=2, max_pending=32, timeout=10):
+        self.bcrypt = Bcrypt()
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'hash': {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'wait_seconds': 0.0},
+            'verify': {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'wait_seconds': 0.0},
+            'rehash': {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'wait_seconds': 0.0},
+            'rejected': 0,
+            'timed_out': 0
+        }
+
+    def _record(self, op, wait, elapsed):
+        with self._stats_lock:
+            entry = self.stats[op]
+            entry['count'] += 1
+            entry['total_seconds'] += elapsed
+            entry['wait_seconds'] += wait
+            entry['max_seconds'] = max(entry['max_seconds'], elapsed)
+
+    def _timed(self, op, submitted, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._record(op, start - submitted, time.perf_counter() - start)
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.stats['rejected'] += 1
+            raise PasswordHasherBusy("Too many password operations in progress")
+
+    def _run(self, op, fn, *args):
+        self._acquire_slot()
+        try:
+            future = self._executor.submit(self._timed, op, time.perf_counter(), fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot belongs to the job, not the caller: a caller that gives up
+        # leaves the job queued or running, and it still counts as pending
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._stats_lock:
+                self.stats['timed_out'] += 1
+            raise PasswordHasherBusy(f"Password {op} did not finish within {self.timeout}s",
+                                     retry_after=max(1, round(self.timeout))) from None
+
+    def _hash(self, password):
+        return self.bcrypt.generate_password_hash(password, self.rounds).decode('utf-8')
+
+    def hash(self, password):
+        """Hash a password with the configured work factor"""
+        return self._run('hash', self._hash, password)
+
+    def verify(self, pw_hash, password):
+        """Check a password against a stored bcrypt hash"""
+        return self._run('verify', self.bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True when a stored hash was made with a different cost than configured"""
+        try:
+            return int(pw_hash.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+    def rehash_in_background(self, password, on_done):
+        """Hash again with the current cost and hand the result to on_done.
+
+        Skipped silently when the pool is saturated - the next login will retry.
+        """
+        try:
+            self._acquire_slot()
+        except PasswordHasherBusy:
+            return False
+
+        def task():
+            try:
+                on_done(self._timed('rehash', submitted, self._hash, password))
+            except Exception as e:
+                logger.warning("Password rehash failed: %s", e)
+            finally:
+                self._slots.release()
+
+        submitted = time.perf_counter()
+        self._executor.submit(task)
+        return True
+
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_LOG_ROUNDS', 12)),
+    max_workers=int(os.getenv('BCRYPT_MAX_WORKERS', 2)),
+    max_pending=int(os.getenv('BCRYPT_MAX_PENDING', 32)),
+    timeout=float(os.getenv('BCRYPT_TIMEOUT', 10))
+)
@@ -1,42 +1,262 @@
-import time
+import bisect
+import contextlib
 import functools
-import pandas as pd
-from collections import defaultdict
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Upper bounds (seconds) of the latency histogram buckets; anything slower lands in +Inf
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Read once at import: when disabled, time_function returns the undecorated
+# function and measure() hands back a shared no-op context manager.
+ENABLED = os.getenv('LEDGERIT_INSTRUMENTATION', 'true').lower() != 'false'
+
+class Histogram:
+    """Fixed-bucket latency histogram - constant memory no matter how many calls"""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.min = seconds if self.min is None else min(self.min, seconds)
+
+    def quantile(self, q):
+        """Bucket upper bound that covers the q-th fraction of observations"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(BUCKETS + (self.max,), self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'counts': list(self.counts), 'count': self.count, 'total': self.total,
+                'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls()
+        hist.counts = list(data['counts'])
+        hist.count = data['count']
+        hist.total = data['total']
+        hist.min = data['min']
+        hist.max = data['max']
+        return hist
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+class TimingRegistry:
+    """Per-process, lock-protected collection of named histograms and counters.
+
+    Each worker process keeps its own registry (reset after fork); use
+    dump_snapshot()/load_snapshots() to combine workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def increment(self, name, value=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {name: hist.to_dict() for name, hist in self._histograms.items()}
+
+    def counters(self):
+        """[(name, {label: value}, count), ...] for every counter"""
+        with self._lock:
+            return [(name, dict(labels), value) for (name, labels), value in self._counters.items()]
+
+    def histograms(self):
+        """Copies of the current histograms, safe to read without the lock"""
+        return {name: Histogram.from_dict(data) for name, data in self.snapshot().items()}
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def _reset_after_fork(self):
+        # The child must not inherit the parent's counts or a lock held mid-update
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+registry = TimingRegistry()
 
-# Global timing storage
-timing_data = defaultdict(list)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry._reset_after_fork)
+
+def record(name, seconds):
+    """Add one observation to a named timer"""
+    if ENABLED:
+        registry.observe(name, seconds)
+
+def increment(name, value=1, **labels):
+    """Add to a labelled counter, e.g. increment('cache_requests', cache='ocr', result='hit')"""
+    if ENABLED:
+        registry.increment(name, value, tuple(sorted(labels.items())))
+
+# Callables hook(name) -> context manager, entered around every timed stage
+# (tracing spans, memory sampling). Empty by default so timers stay cheap.
+_stage_hooks = []
+
+def add_stage_hook(hook):
+    """Run an extra context manager around every measure()/time_function stage"""
+    _stage_hooks.append(hook)
+
+def remove_stage_hook(hook):
+    if hook in _stage_hooks:
+        _stage_hooks.remove(hook)
+
+class _Timer:
+    __slots__ = ('name', 'start', 'hooks')
+
+    def __init__(self, name):
+        self.name = name
+        self.hooks = None
+
+    def __enter__(self):
+        if _stage_hooks:
+            self.hooks = contextlib.ExitStack()
+            for hook in _stage_hooks:
+                self.hooks.enter_context(hook(self.name))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        registry.observe(self.name, time.perf_counter() - self.start)
+        if self.hooks is not None:
+            self.hooks.__exit__(*exc_info)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def measure(name):
+    """Context manager timing an inline block under `name`"""
+    return _Timer(name) if ENABLED else _NULL_TIMER
 
 def time_function(module_name):
     """Decorator to measure function execution time"""
     def decorator(func):
+        if not ENABLED:
+            return func
+        name = f"{module_name}.{func.__name__}"
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start = time.time()
-            result = func(*args, **kwargs)
-            elapsed = time.time() - start
-            timing_data[f"{module_name}.{func.__name__}"].append(elapsed)
-            return result
+            if _stage_hooks:
+                with _Timer(name):
+                    return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - start)
         return wrapper
     return decorator
 
-def get_performance_report():
+def dump_snapshot(directory):
+    """Write this process's histograms and counters to <directory>/<pid>.json"""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / f"{os.getpid()}.json.tmp"
+    tmp.write_text(json.dumps({'histograms': registry.snapshot(), 'counters': registry.counters()}))
+    tmp.replace(path / f"{os.getpid()}.json")
+
+def remove_snapshot(directory, pid):
+    """Drop what process pid dumped, so an exited worker stops counting"""
+    for name in (f"{pid}.json", f"{pid}.json.tmp"):
+        (Path(directory) / name).unlink(missing_ok=True)
+
+def clear_snapshots(directory):
+    """Remove every process's snapshot, e.g. left over from a previous server run"""
+    for snapshot_file in Path(directory).glob('*.json*'):
+        snapshot_file.unlink(missing_ok=True)
+
+def load_snapshots(directory):
+    """Merge what every process dumped: ({name: Histogram}, [(name, labels, value), ...])"""
+    histograms = {}
+    counters = {}
+    for snapshot_file in Path(directory).glob('*.json'):
+        try:
+            data = json.loads(snapshot_file.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, hist_data in data.get('histograms', {}).items():
+            hist = Histogram.from_dict(hist_data)
+            if name in histograms:
+                histograms[name].merge(hist)
+            else:
+                histograms[name] = hist
+        for name, labels, value in data.get('counters', []):
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, [(name, dict(labels), value) for (name, labels), value in counters.items()]
+
+def get_performance_report(histograms=None):
     """Generate performance report sorted by time"""
+    import pandas as pd
+
+    histograms = registry.histograms() if histograms is None else histograms
     report = []
-    for func_name, times in timing_data.items():
-        total = sum(times)
-        avg = total / len(times)
-        count = len(times)
+    for func_name, hist in histograms.items():
         report.append({
             'Module/Function': func_name,
-            'Total Time (s)': round(total, 3),
-            'Avg Time (s)': round(avg, 3),
-            'Call Count': count
+            'Total Time (s)': round(hist.total, 3),
+            'Avg Time (s)': round(hist.total / hist.count, 3) if hist.count else 0,
+            'P50 (s)': hist.quantile(0.5),
+            'P95 (s)': hist.quantile(0.95),
+            'Max (s)': round(hist.max, 3),
+            'Call Count': hist.count
         })
-    
+
     df = pd.DataFrame(report)
-    df = df.sort_values('Total Time (s)', ascending=False)
+    if not df.empty:
+        df = df.sort_values('Total Time (s)', ascending=False)
     return df
 
 def clear_timing_data():
     """Clear all timing data"""
-    timing_data.clear()
+    registry.clear()
@@ -115,34 +115,24 @@ def analyze_pdf_processing(pdf_path, password=None):
     # Process based on bank type
     df = None
     if bank_type == "jk_bank":
-        with profiler.measure("5. JK Bank Parser - OCR Initialization"):
-            pass  # OCR init happens inside
-        with profiler.measure("6. JK Bank Parser - Table Extraction"):
-            pass  # Measured inside parser
-        with profiler.measure("7. JK Bank Parser - Transaction Parsing"):
-            df, opening_balance, closing_balance, transaction_total = process_jk_pdf(pdf_bytes, Path(pdf_path).name)
+        with profiler.measure("5. JK Bank Parser - Complete Processing"):
+            df, opening_balance, closing_balance, transaction_total = process_jk_pdf(pdf_bytes, Path(pdf_path).name, bank=standardized_name)
     
     elif bank_type == "indian_bank":
-        with profiler.measure("5. Indian Bank Parser - OCR Initialization"):
-            pass
-        with profiler.measure("6. Indian Bank Parser - Table Extraction"):
-            pass
-        with profiler.measure("7. Indian Bank Parser - Transaction Parsing"):
-            df, opening_balance, closing_balance, transaction_total = process_indian_pdf(pdf_bytes, Path(pdf_path).name)
+        with profiler.measure("5. Indian Bank Parser - Complete Processing"):
+            df, opening_balance, closing_balance, transaction_total = process_indian_pdf(pdf_bytes, Path(pdf_path).name, bank=standardized_name)
     
     elif bank_type == "canara_bank":
-        with profiler.measure("5. Canara Bank Parser - PDF Processing"):
-            pass
-        with profiler.measure("6. Canara Bank Parser - Transaction Extraction"):
-            df, opening_balance, closing_balance, transaction_total = process_canara_pdf(pdf_bytes, Path(pdf_path).name)
+        with profiler.measure("5. Canara Bank Parser - Complete Processing"):
+            df, opening_balance, closing_balance, transaction_total = process_canara_pdf(pdf_bytes, Path(pdf_path).name, bank=standardized_name)
     
     elif bank_type == "bordered":
         with profiler.measure("5. Bordered Parser - Complete Processing"):
-            df, opening_balance, closing_balance, transaction_total = process_bordered_pdf(pdf_bytes, Path(pdf_path).name)
+            df, opening_balance, closing_balance, transaction_total = process_bordered_pdf(pdf_bytes, Path(pdf_path).name, bank=standardized_name)
     
     else:  # borderless
         with profiler.measure("5. Borderless Parser - Complete Processing"):
-            df, opening_balance, closing_balance, transaction_total = process_borderless_pdf(pdf_bytes, Path(pdf_path).name)
+            df, opening_balance, closing_balance, transaction_total = process_borderless_pdf(pdf_bytes, Path(pdf_path).name, bank=standardized_name)
     
     if df is None or df.empty:
         print("No transactions found")
@@ -0,0 +1,119 @@
+"""
+Uploads spooled to disk and read through a memory map
+upload_file used to hold the whole PDF as bytes, decrypt it into a second
+copy and hand those bytes to PyMuPDF / PyPDF2 / pypdfium2, each of which
+made its own copy again. A SpooledPDF is a temporary file instead:
+
+- PyMuPDF, pypdfium2 and pdfplumber open it by path and page it in themselves
+- PyPDF2 reads it through a read-only mmap (page cache, not heap)
+- decryption writes straight into a new spool file
+
+Every helper here also accepts plain bytes or a file path, so the parsers
+keep working for callers that still pass bytes (benchmark, warm-up).
+
+    UPLOAD_SPOOL_DIR   where spool files go (default: the system temp dir)
+"""
+
+import io
+import mmap
+import os
+import shutil
+import tempfile
+
+import fitz  # PyMuPDF
+import PyPDF2
+
+SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR') or None
+COPY_CHUNK = 1024 * 1024
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+class SpooledPDF:
+    """A PDF in a temporary file, deleted again by close()"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses empty files; let PyPDF2 report those as invalid instead
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else io.BytesIO()
+
+    @classmethod
+    def from_writer(cls, write):
+        """Spool whatever write(file) produces; None if it returns False"""
+        fd, path = tempfile.mkstemp(prefix='ledgerit-', suffix='.pdf', dir=SPOOL_DIR)
+        os.close(fd)
+        try:
+            # Reopened by name: PyMuPDF saves file objects through their .name
+            with open(path, 'wb') as out:
+                written = write(out)
+            if written is False:
+                _unlink(path)
+                return None
+            return cls(path)
+        except BaseException:
+            _unlink(path)
+            raise
+
+    @classmethod
+    def from_stream(cls, stream):
+        """Copy an upload stream to disk in chunks"""
+        return cls.from_writer(lambda out: shutil.copyfileobj(stream, out, COPY_CHUNK))
+
+    def close(self):
+        if self._file is None:
+            return
+        self.buffer.close()
+        self._file.close()
+        self._file = None
+        _unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+    def __repr__(self):
+        return f"SpooledPDF({self.path!r}, {self.size} bytes)"
+
+def file_path(src):
+    """Path for libraries that open files themselves, None for in-memory bytes"""
+    if isinstance(src, SpooledPDF):
+        return src.path
+    if isinstance(src, (str, os.PathLike)):
+        return os.fspath(src)
+    return None
+
+def open_document(src):
+    """PyMuPDF document for bytes, a path or a SpooledPDF"""
+    path = file_path(src)
+    if path is not None:
+        return fitz.open(path)
+    return fitz.open(stream=src, filetype="pdf")
+
+def open_reader(src):
+    """PyPDF2 reader; a SpooledPDF is read through its mmap"""
+    if isinstance(src, SpooledPDF):
+        return PyPDF2.PdfReader(src.buffer)
+    if isinstance(src, (str, os.PathLike)):
+        return PyPDF2.PdfReader(os.fspath(src))
+    return PyPDF2.PdfReader(io.BytesIO(src))
+
+def pdfium_input(src):
+    """pypdfium2 loads paths lazily, so prefer one over bytes"""
+    return file_path(src) or src
+
+def read_bytes(src):
+    """Whole document as bytes, for consumers that accept nothing else"""
+    if isinstance(src, SpooledPDF):
+        return src.buffer[:] if src.size else b''
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, 'rb') as f:
+            return f.read()
+    return src
@@ -0,0 +1,125 @@
+"""
+OCR admission control: per-user fairness, queue caps and Retry-After hints
+Usage: python -m pytest test_admission.py
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from admission import AdmissionController, AdmissionRejected
+
+def wait_until(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.005)
+
+class Waiter(threading.Thread):
+    """Queues for a slot; once admitted records its label and frees the slot again"""
+
+    def __init__(self, controller, user_id, label, order):
+        super().__init__(daemon=True)
+        self.controller = controller
+        self.user_id = user_id
+        self.label = label
+        self.order = order
+        self.error = None
+
+    def run(self):
+        try:
+            self.controller.acquire(self.user_id)
+        except AdmissionRejected as e:
+            self.error = e
+            return
+        self.order.append(self.label)
+        self.controller.release(0.0)
+
+def enqueue(controller, user_id, label, order):
+    """Start a waiter and return once its ticket is queued, so arrival order is fixed"""
+    queued = controller.snapshot()['queued']
+    waiter = Waiter(controller, user_id, label, order)
+    waiter.start()
+    wait_until(lambda: controller.snapshot()['queued'] == queued + 1)
+    return waiter
+
+def test_free_slot_admits_without_queueing():
+    controller = AdmissionController(max_concurrency=2)
+    assert controller.acquire("a") == 0.0
+    assert controller.acquire("a") == 0.0
+    assert controller.snapshot()['active'] == 2
+    assert controller.stats['queued_total'] == 0
+
+def test_freed_slots_go_round_robin_between_users():
+    controller = AdmissionController(max_concurrency=1, max_queue=8, max_queue_per_user=3)
+    controller.acquire("holder")
+    order = []
+    # User a arrives with a burst before b and c upload anything
+    waiters = [enqueue(controller, user, label, order) for user, label in
+               [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("c", "c1"), ("b", "b2")]]
+    assert controller.snapshot()['queued_per_user'] == {"a": 3, "b": 2, "c": 1}
+
+    controller.release(0.0)
+    for waiter in waiters:
+        waiter.join(5)
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+    snapshot = controller.snapshot()
+    assert snapshot['active'] == 0 and snapshot['queued'] == 0
+    assert snapshot['queued_per_user'] == {}
+
+def test_per_user_queue_cap_rejects_only_that_user():
+    controller = AdmissionController(max_concurrency=1, max_queue=8, max_queue_per_user=2)
+    controller.acquire("holder")
+    order = []
+    waiters = [enqueue(controller, "a", f"a{i}", order) for i in (1, 2)]
+
+    with pytest.raises(AdmissionRejected, match="Too many uploads queued for this user"):
+        controller.acquire("a")
+    # Another user still gets a place in the queue
+    waiters.append(enqueue(controller, "b", "b1", order))
+    assert controller.stats['rejected'] == 1
+
+    controller.release(0.0)
+    for waiter in waiters:
+        waiter.join(5)
+    assert order == ["a1", "b1", "a2"]
+
+def test_full_queue_rejects_with_retry_after_from_service_time():
+    controller = AdmissionController(max_concurrency=2, max_queue=2, max_queue_per_user=2)
+    controller.acquire("holder")
+    controller.acquire("holder")
+    order = []
+    waiters = [enqueue(controller, user, user, order) for user in ("a", "b")]
+
+    # Two queued ahead plus this one, on two slots averaging 30s each
+    with pytest.raises(AdmissionRejected, match="OCR queue is full") as rejected:
+        controller.acquire("c")
+    assert rejected.value.retry_after == 45
+
+    controller.release(10.0)
+    controller.release(10.0)
+    for waiter in waiters:
+        waiter.join(5)
+    # The moving average follows the faster jobs: 30 -> 26 -> 22.8, then the waiters took 0s each
+    assert controller.snapshot()['avg_service_seconds'] == pytest.approx(14.592)
+    assert controller._retry_after() == 8
+
+def test_queue_timeout_rejects_and_leaves_queue_clean():
+    controller = AdmissionController(max_concurrency=1, max_queue=8, queue_timeout=0.05)
+    controller.acquire("holder")
+    with pytest.raises(AdmissionRejected, match="Timed out waiting for an OCR slot") as rejected:
+        controller.acquire("a")
+    assert rejected.value.retry_after >= 1
+    snapshot = controller.snapshot()
+    assert snapshot['queued'] == 0 and snapshot['queued_per_user'] == {}
+    assert snapshot['timed_out'] == 1 and snapshot['rejected'] == 1
+
+    # The next freed slot is not handed to the ticket that gave up
+    controller.release(0.0)
+    assert controller.acquire("b") == 0.0
@@ -0,0 +1,115 @@
+"""
+The streaming bordered path must parse exactly like process_bordered_pdf
+Usage: python -m pytest test_bordered_stream.py
+Statements that are not in the checkout are skipped.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import bankDetector
+import layout_templates
+import page_pipeline
+
+ROOT = Path(__file__).parent.parent
+STATEMENTS = ROOT / "statements"
+
+BORDERED_CORPUS = [
+    ROOT / "Axis Bank - Copy.pdf",
+    ROOT / "Bandhan2.pdf",
+    ROOT / "Email_Statement_07022026163613834579_unlocked.pdf",
+    *sorted((STATEMENTS / "Bank Statement" / "CBI").glob("*.pdf")),
+    STATEMENTS / "Bank Statement" / "Federal Bank.pdf",
+    STATEMENTS / "Bank Statement" / "Union Bank.pdf",
+    STATEMENTS / "allStatements" / "Bandhan1.pdf",
+    STATEMENTS / "allStatements" / "BandhanBank MG.pdf",
+    STATEMENTS / "works_1" / "Axis Bank.PDF",
+    STATEMENTS / "works_1" / "Bandhan Bank.pdf",
+    STATEMENTS / "works_1" / "BandhanBank MG II.pdf",
+    STATEMENTS / "works_1" / "BandhanBank MG IV.pdf",
+    STATEMENTS / "works_1" / "CBI.pdf",
+    STATEMENTS / "works_1" / "Federal Bank MG.pdf",
+    STATEMENTS / "works_1" / "ICICI Bank.pdf",
+    STATEMENTS / "works_1" / "IDBI Bank.pdf",
+    STATEMENTS / "works_1" / "Union Bank.PDF",
+    STATEMENTS / "works_1" / "Yes Bank.pdf",
+]
+
+@pytest.fixture
+def generic_detection(monkeypatch):
+    # The streaming path has no templates or propagation; compare like with like
+    monkeypatch.setattr(layout_templates, "LAYOUT_TEMPLATES", False)
+    monkeypatch.setattr(layout_templates, "LAYOUT_PROPAGATION", False)
+
+def parse_both(monkeypatch, pdf_source, filename):
+    monkeypatch.setattr(bankDetector, "STREAMING_MIN_PAGES", 0)
+    batch = bankDetector.process_bordered_pdf(pdf_source, filename)
+    monkeypatch.setattr(bankDetector, "STREAMING_MIN_PAGES", 1)
+    streamed = bankDetector.process_bordered_pdf(pdf_source, filename)
+    return batch, streamed
+
+def assert_same_parse(batch, streamed):
+    if batch[0] is None:
+        assert streamed[0] is None
+    else:
+        pd.testing.assert_frame_equal(streamed[0], batch[0])
+    # Opening, closing balance and transaction total
+    assert streamed[1:] == batch[1:]
+
+@pytest.mark.parametrize("path", BORDERED_CORPUS, ids=lambda path: str(path.relative_to(ROOT)))
+def test_corpus_streams_like_batch(monkeypatch, without_ocr, generic_detection, path):
+    if not path.exists():
+        pytest.skip(f"{path.name} is not in the checkout")
+    assert_same_parse(*parse_both(monkeypatch, str(path), path.name))
+
+HEADER = ["Date", "Particulars", "Debit", "Credit", "Balance"]
+
+def row(date, narration, debit, balance):
+    return [date, narration, debit, "", balance]
+
+PAGES = {
+    "repeated header": [
+        [HEADER, row("01/01/2024", "UPI a", "10.00", "90.00"), row("02/01/2024", "UPI b", "10.00", "80.00")],
+        [HEADER, row("03/01/2024", "UPI c", "10.00", "70.00"), ["", "continued", "", "", ""]],
+        [row("04/01/2024", "NEFT d", "10.00", "60.00"), row("05/01/2024", "NEFT e", "5.00", "55.00")],
+    ],
+    "header alone on page 1": [
+        [HEADER],
+        [row("01/01/2024", "UPI a", "10.00", "90.00"), row("02/01/2024", "UPI b", "10.00", "80.00"),
+         ["", "continued", "", "", ""]],
+    ],
+    "partial header on page 1": [
+        [["Date", "Narration", "", "", ""], row("01/01/2024", "UPI a", "10.00", "90.00")],
+        [HEADER, ["", "Opening Balance", "", "", "100.00"], row("02/01/2024", "UPI b", "10.00", "80.00")],
+    ],
+    "header below account details": [
+        [["Account", "12345", "", "", ""], ["Branch", "X", "", "", ""], HEADER,
+         ["", "B/F", "", "", "100.00"], row("01/01/2024", "UPI a", "10.00", "90.00")],
+        [row("02/01/2024", "UPI b", "10.00", "80.00"), ["", "Closing Balance", "", "", "80.00"]],
+    ],
+    "wider later table": [
+        [HEADER, row("01/01/2024", "UPI a", "10.00", "90.00")],
+        [row("02/01/2024", "UPI b", "10.00", "80.00") + ["x"], row("03/01/2024", "UPI c", "10.00", "70.00") + [""]],
+    ],
+    "no header": [
+        [row("01/01/2024", "UPI a", "10.00", "90.00"), row("02/01/2024", "UPI b", "10.00", "80.00")],
+        [row("03/01/2024", "UPI c", "10.00", "70.00")],
+    ],
+}
+
+@pytest.mark.parametrize("name", PAGES)
+def test_page_headers_stream_like_batch(monkeypatch, without_ocr, generic_detection, name):
+    # One table per page, fed to both paths instead of detected from a PDF
+    tables = {page: [SimpleNamespace(df=pd.DataFrame(rows))] for page, rows in enumerate(PAGES[name])}
+    monkeypatch.setattr(layout_templates, "extract_tables_propagated", lambda *args, **options: tables)
+    monkeypatch.setattr(page_pipeline, "iter_page_tables", lambda *args, **options: iter(tables.items()))
+    monkeypatch.setattr(page_pipeline, "page_count", lambda pdf_source: len(tables))
+    monkeypatch.setattr(bankDetector, "extract_balances_from_pdf", lambda pdf_source: (None, None))
+    assert_same_parse(*parse_both(monkeypatch, "statement.pdf", "statement.pdf"))
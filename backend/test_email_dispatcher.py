@@ -0,0 +1,148 @@
+"""
+Email dispatcher against a local SMTP server (aiosmtpd)
+Usage: python -m pytest test_email_dispatcher.py
+"""
+
+import socket
+import sys
+from email.message import EmailMessage
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from aiosmtpd.controller import Controller
+
+import email_dispatcher
+from email_dispatcher import EmailDispatcher, SMTPConnectionPool
+
+class RecordingHandler:
+    """Accepts mail and counts sessions; replies can be scripted per command"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+        self.noop_code = 250
+        # Replies to the next DATA commands before mail is accepted again
+        self.data_replies = []
+        self.refuse = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        return f"{self.noop_code} noop"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.data_replies:
+            return self.data_replies.pop(0)
+        self.messages.append(envelope.content)
+        return "250 OK"
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    try:
+        yield handler, controller.port
+    finally:
+        controller.stop()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(email_dispatcher.time, "sleep", delays.append)
+    return delays
+
+def message(to="user@example.com"):
+    msg = EmailMessage()
+    msg["From"] = "ledgerit@example.com"
+    msg["To"] = to
+    msg["Subject"] = "OTP"
+    msg.set_content("123456")
+    return msg
+
+def dispatcher(port, **options):
+    pool = SMTPConnectionPool("127.0.0.1", port, size=1, use_tls=False, timeout=5)
+    return EmailDispatcher(pool, **{"workers": 1, "retry_backoff": 0.5, **options})
+
+def test_connection_is_reused_between_messages(smtp_server):
+    handler, port = smtp_server
+    sender = dispatcher(port)
+    for _ in range(3):
+        assert sender.submit(message())
+    sender.stop()
+    assert len(handler.messages) == 3
+    assert handler.sessions == 1
+    assert sender.stats["sent"] == 3
+
+def test_reconnects_when_idle_connection_fails_noop(smtp_server):
+    handler, port = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", port, size=1, use_tls=False, timeout=5)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.release(conn)
+
+    handler.noop_code = 421
+    fresh = pool.acquire()
+    assert fresh is not conn
+    # The stale connection was closed, not leaked
+    assert conn.sock is None
+    pool.release(fresh)
+    pool.close_all()
+
+def test_temporary_failures_are_retried_with_backoff(smtp_server, sleeps):
+    handler, port = smtp_server
+    handler.data_replies = ["451 try again later", "451 try again later"]
+    sender = dispatcher(port, max_retries=3)
+    sender.submit(message())
+    sender.stop()
+    assert sleeps == [0.5, 1.0]
+    assert sender.stats == {"sent": 1, "failed": 0, "retried": 2, "dropped": 0}
+    assert len(handler.messages) == 1
+
+def test_gives_up_after_max_retries(smtp_server, sleeps):
+    handler, port = smtp_server
+    handler.data_replies = ["451 try again later"] * 3
+    sender = dispatcher(port, max_retries=2)
+    sender.submit(message())
+    sender.stop()
+    assert sleeps == [0.5, 1.0]
+    assert sender.stats["failed"] == 1 and sender.stats["sent"] == 0
+    assert handler.messages == []
+
+def test_refused_recipient_is_not_retried(smtp_server, sleeps):
+    handler, port = smtp_server
+    handler.refuse.add("nobody@example.com")
+    sender = dispatcher(port, max_retries=3)
+    sender.submit(message("nobody@example.com"))
+    sender.stop()
+    assert sleeps == []
+    assert sender.stats["failed"] == 1 and sender.stats["retried"] == 0
+
+def test_full_queue_drops_instead_of_blocking(smtp_server):
+    _, port = smtp_server
+    # No workers: nothing drains the queue
+    sender = dispatcher(port, workers=0, queue_size=2)
+    assert sender.submit(message())
+    assert sender.submit(message())
+    assert not sender.submit(message())
+    assert sender.stats["dropped"] == 1
+    assert sender.queue_depth() == 2
@@ -0,0 +1,134 @@
+"""
+Layout propagation and learned templates must not change what text-layer statements parse to
+Usage: python -m pytest test_layout_propagation.py
+Statements that are not in the checkout are skipped.
+"""
+
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import bankDetector
+import layout_templates
+
+ROOT = Path(__file__).parent.parent
+STATEMENTS = ROOT / "statements" / "Bank Statement"
+
+# Every statement here has a text layer; no OCR engine (and no paddleocr) is needed
+pytestmark = pytest.mark.usefixtures("without_ocr")
+
+def parse(monkeypatch, path, bordered, propagation=True, bank=None):
+    if not path.exists():
+        pytest.skip(f"{path.name} is not in the checkout")
+    # Templates only when a test gives the bank and its own store
+    monkeypatch.setattr(layout_templates, "LAYOUT_TEMPLATES", bank is not None)
+    monkeypatch.setattr(layout_templates, "LAYOUT_PROPAGATION", propagation)
+    parser = bankDetector.process_bordered_pdf if bordered else bankDetector.process_borderless_pdf
+    df, _, _, _ = parser(str(path), path.name, bank=bank)
+    assert df is not None
+    return df
+
+def row_texts(df):
+    return [re.sub(r'[^a-z0-9]', '', ''.join(str(v) for v in row if pd.notna(v)).lower())
+            for row in df.itertuples(index=False)]
+
+@pytest.mark.parametrize("path, bordered", [
+    (STATEMENTS / "Union Bank.pdf", True),
+    (STATEMENTS / "Federal Bank.pdf", True),
+    (ROOT / "Axis Bank - Copy.pdf", True),
+])
+def test_same_rows_with_and_without_propagation(monkeypatch, path, bordered):
+    generic = parse(monkeypatch, path, bordered, propagation=False)
+    propagated = parse(monkeypatch, path, bordered, propagation=True)
+    pd.testing.assert_frame_equal(propagated, generic)
+
+def test_propagation_keeps_every_generic_row(monkeypatch):
+    # Generic detection misses whole pages of this one; propagation may add rows, not lose or split them
+    path = STATEMENTS / "Ujjivan Small Finance Bank.pdf"
+    generic = row_texts(parse(monkeypatch, path, True, propagation=False))
+    propagated = set(row_texts(parse(monkeypatch, path, True, propagation=True)))
+    assert [row for row in generic if row not in propagated] == []
+
+def test_wrapped_lines_stay_in_their_row(monkeypatch):
+    df = parse(monkeypatch, STATEMENTS / "HDFC Current Account.pdf", False, propagation=True)
+    # 08/05/25: narration over four lines, reference over two
+    row = next(text for text in row_texts(df) if text.startswith("080525neftcrubin0823732"))
+    assert "prosourcefashionandlifestyleprishrihanumantextileubi" in row
+    assert "ubinn52025050827744418" in row
+
+@pytest.mark.parametrize("path, bordered, bank", [
+    (STATEMENTS / "HDFC Current Account.pdf", False, "HDFC Bank"),
+    (ROOT / "HDFC 2024-25.pdf", False, "HDFC Bank"),
+    (STATEMENTS / "Federal Bank.pdf", True, "Federal Bank"),
+])
+def test_second_upload_parses_the_same(monkeypatch, tmp_path, path, bordered, bank):
+    store = layout_templates.TemplateStore(str(tmp_path / "layout_templates.json"))
+    monkeypatch.setattr(layout_templates, "template_store", store)
+    first = parse(monkeypatch, path, bordered, bank=bank)
+    assert store.find(bank, *layout_templates._page_size(str(path)))
+    second = parse(monkeypatch, path, bordered, bank=bank)
+    # Same rows and the same column labels ("Tran\nType", not "Type")
+    pd.testing.assert_frame_equal(second, first)
+
+@pytest.mark.parametrize("rows, columns, chain", [
+    # Chronological, separate debit and credit columns
+    ([["100.00", "", "1,000.00"], ["", "50.00", "1,050.00"], ["25.00", "", "1,025.00"]],
+     ["Withdrawal", "Deposit", "Balance"], (2, 0)),
+    # Newest first: each balance changes by the amount of the row above
+    ([["25.00", "", "1,025.00"], ["", "50.00", "1,050.00"], ["100.00", "", "1,000.00"]],
+     ["Withdrawal", "Deposit", "Balance"], (2, 0)),
+    # Overdraft: the Dr/Cr column is the sign of the balance
+    ([["", "700.00", "5,000.00", "DR"], ["200.00", "", "5,200.00", "DR"]],
+     ["Withdrawals", "Deposits", "Balance", "Dr/Cr"], (1, 0)),
+    # One amount column signed by a Dr/Cr column
+    ([["500.00", "CR", "1,500.00"], ["300.00", "DR", "1,200.00"]], ["Amount", "Dr / Cr", "Balance"], (1, 0)),
+    # A misread balance breaks the chain
+    ([["100.00", "", "1,000.00"], ["", "50.00", "1,050.00"], ["25.00", "", "1,052.00"]],
+     ["Withdrawal", "Deposit", "Balance"], (2, 1)),
+])
+def test_balance_chain(rows, columns, chain):
+    assert bankDetector.balance_chain(pd.DataFrame(rows, columns=columns)) == chain
+
+def test_balance_chain_reads_a_header_kept_as_the_first_row():
+    df = pd.DataFrame([["Withdrawal Amt.", "Deposit Amt.", "Closing Balance"], ["-", "400.00", "721,431.53"],
+                       ["-", "500,000.00", "1,221,431.53"]])
+    assert bankDetector.balance_chain(df) == (1, 0)
+    assert bankDetector.balances_follow(df)
+    assert not bankDetector.balances_follow(pd.DataFrame([["a", "b"]], columns=["Date", "Narration"]))
+
+def test_template_rows_whose_balances_break_are_not_kept(monkeypatch, tmp_path):
+    path = STATEMENTS / "Federal Bank.pdf"
+    store = layout_templates.TemplateStore(str(tmp_path / "layout_templates.json"))
+    monkeypatch.setattr(layout_templates, "template_store", store)
+    first = parse(monkeypatch, path, True, bank="Federal Bank")
+
+    # The template's read comes first; misread one balance in it
+    statement, reads = bankDetector.bordered_statement, []
+    def misread(pdf_tables, pdf_opening_balance):
+        df, opening, closing, total = statement(pdf_tables, pdf_opening_balance)
+        if not reads:
+            df.loc[5, "Balance"] = "1.00"
+        reads.append(len(df))
+        return df, opening, closing, total
+    balances, extract_balances = [], bankDetector.extract_balances_from_pdf
+    monkeypatch.setattr(bankDetector, "bordered_statement", misread)
+    monkeypatch.setattr(bankDetector, "extract_balances_from_pdf",
+                        lambda pdf_source: balances.append(pdf_source) or extract_balances(pdf_source))
+
+    second = parse(monkeypatch, path, True, bank="Federal Bank")
+    # Detected again, without reading the balances twice, to the same rows
+    assert len(reads) == 2 and len(balances) == 1
+    pd.testing.assert_frame_equal(second, first)
+
+def test_template_store_creates_its_directory(tmp_path):
+    store = layout_templates.TemplateStore(str(tmp_path / "instance" / "layout_templates.json"))
+    template = layout_templates.LayoutTemplate("HDFC Bank", (595, 842), [0.05, 0.2, 0.9], ["date", "narration"], 0.2)
+    store.record(template)
+    assert [t.fingerprint for t in layout_templates.TemplateStore(store.path).find("HDFC Bank", 595, 842)] == \
+        [template.fingerprint]
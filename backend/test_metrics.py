@@ -0,0 +1,39 @@
+"""
+Per-worker metrics snapshots merged for /metrics
+Usage: python -m pytest test_metrics.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from performance_analyzer import clear_snapshots, load_snapshots, remove_snapshot
+
+def write_snapshot(directory, pid, pages):
+    (directory / f"{pid}.json").write_text(json.dumps(
+        {'histograms': {}, 'counters': [['parser_pages', {'bank': 'SBI'}, pages]]}))
+
+def pages(directory):
+    _, counters = load_snapshots(directory)
+    return sum(value for name, _, value in counters if name == 'parser_pages')
+
+def test_exited_worker_stops_counting(tmp_path):
+    write_snapshot(tmp_path, 101, 3)
+    write_snapshot(tmp_path, 102, 4)
+    assert pages(tmp_path) == 7
+    remove_snapshot(tmp_path, 101)
+    assert pages(tmp_path) == 4
+    # Already gone, or the worker never uploaded anything
+    remove_snapshot(tmp_path, 101)
+    remove_snapshot(tmp_path, 103)
+
+def test_master_start_clears_previous_run(tmp_path):
+    write_snapshot(tmp_path, 101, 3)
+    (tmp_path / "102.json.tmp").write_text("{")
+    clear_snapshots(tmp_path)
+    assert list(tmp_path.iterdir()) == []
+    assert pages(tmp_path) == 0
+    clear_snapshots(tmp_path / "missing")
@@ -0,0 +1,86 @@
+"""
+Page classification must never skip a page that holds transactions
+Usage: python -m pytest test_page_classifier.py
+Statements that are not in the checkout are skipped.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import bankDetector
+import page_pipeline
+from page_classifier import (AMOUNT_REGEX, DATE_REGEX, PAGE_SKIP_KINDS, TRANSACTIONS, SUMMARY, BOILERPLATE,
+                             classify_page, classify_text)
+from spooled_pdf import open_document
+
+ROOT = Path(__file__).parent.parent
+
+# Table options of the bordered parser, and of the borderless / JK / Indian Bank parsers
+BORDERED = dict(implicit_rows=False, implicit_columns=False, borderless_tables=False)
+BORDERLESS = dict(implicit_rows=True, implicit_columns=True, borderless_tables=True)
+
+def corpus():
+    """Every statement PDF in the checkout, copies kept under another folder only once"""
+    paths, seen = [], set()
+    for path in sorted([*ROOT.glob('*'), *(ROOT / 'statements').rglob('*')]):
+        if path.suffix.lower() != '.pdf' or 'passwordProtected' in path.parts:
+            continue
+        key = (path.name.lower(), path.stat().st_size)
+        if key not in seen:
+            seen.add(key)
+            paths.append(path)
+    return paths
+
+@pytest.mark.parametrize("text, amounts", [
+    ("300", ["300"]),
+    ("2598.1", ["2598.1"]),
+    ("1,25,000.00", ["1,25,000.00"]),
+    ("1,250.00Cr", ["1,250.00Cr"]),
+    ("1,250.00 DR", ["1,250.00 DR"]),
+    ("01/04/2024 01-04-2024 12:30 UPI/412345/x", []),
+])
+def test_amount_formats(text, amounts):
+    assert AMOUNT_REGEX.findall(text) == amounts
+
+def test_whole_number_amounts_are_transactions():
+    # UCO Bank prints amounts without paise
+    text = "01-04-2024 NEFT SALARY 300 2598.1\n02-04-2024 ATM WDL 500 2098.1\n" * 10
+    assert classify_text(text) == TRANSACTIONS
+
+def test_dated_page_is_never_boilerplate():
+    text = "01/04/2024 Transfer from savings account\n" + "Narration continued on the next line\n" * 10
+    assert classify_text(text) == TRANSACTIONS
+
+def test_terms_page_is_boilerplate():
+    text = "Terms and conditions. Please examine this statement and report any discrepancy.\n" * 5
+    assert classify_text(text) == BOILERPLATE
+    assert classify_text(text + "Closing Balance") == SUMMARY
+
+@pytest.mark.parametrize("path", corpus(), ids=lambda path: str(path.relative_to(ROOT)))
+def test_pages_with_transactions_are_read(monkeypatch, path):
+    doc = open_document(str(path))
+    encrypted = doc.needs_pass
+    doc.close()
+    if encrypted:
+        pytest.skip("password protected")
+    bank_type, _ = bankDetector.classify_bank_type(bankDetector.detect_bank_from_pdf(str(path)))
+    if bank_type == "canara_bank":
+        pytest.skip("the Canara parser reads text lines, not page tables")
+
+    # What every page holds when nothing is skipped
+    monkeypatch.setattr(page_pipeline, "PAGE_CLASSIFIER", False)
+    monkeypatch.setattr(page_pipeline, "STOP_AT_STATEMENT_END", False)
+    tables = page_pipeline.extract_tables(str(path), ocr=None,
+                                          **(BORDERED if bank_type in (None, "bordered") else BORDERLESS))
+    with_rows = [page_number for page_number, page_tables in tables.items()
+                 if any(isinstance(cell, str) and DATE_REGEX.search(cell)
+                        for table in page_tables for cell in table.df.values.ravel())]
+
+    skipped = [page_number for page_number, page in page_pipeline.iter_pages(str(path), with_rows)
+               if page_pipeline.has_text_layer(page) and classify_page(page, page_number) in PAGE_SKIP_KINDS]
+    assert skipped == []
@@ -0,0 +1,81 @@
+"""
+Where page_pipeline stops reading a statement
+Usage: python -m pytest test_page_pipeline.py
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import fitz  # PyMuPDF
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import page_pipeline
+from page_pipeline import ends_statement
+
+def table(rows):
+    return SimpleNamespace(df=pd.DataFrame(rows))
+
+SUMMARY_BOX = table([["Opening Balance", "Total Debits", "Total Credits", "Closing Balance"],
+                     ["1,000.00", "500.00", "700.00", "1,200.00"]])
+TRANSACTIONS = table([["Date", "Narration", "Amount", "Balance"],
+                      ["01/04/2024", "NEFT", "200.00", "1,200.00"],
+                      ["02/04/2024", "ATM", "100.00", "1,100.00"]])
+
+def test_closing_balance_below_the_last_transaction_ends_the_statement():
+    closed = table(TRANSACTIONS.df.values.tolist() + [["", "Closing Balance", "", "1,100.00"]])
+    assert ends_statement([closed])
+    assert ends_statement([closed, table([["Grand Total", "300.00"]])])
+
+def test_marker_row_may_carry_the_date():
+    assert ends_statement([table(TRANSACTIONS.df.values.tolist() + [["30/04/2024", "Closing Balance", "", "1,100.00"]])])
+
+def test_summary_box_above_the_transactions_does_not_end_the_statement():
+    # Page 1: "Opening Balance | ... | Closing Balance" box, then the first transactions
+    assert not ends_statement([SUMMARY_BOX, TRANSACTIONS])
+
+def test_marker_followed_by_transactions_does_not_end_the_statement():
+    assert not ends_statement([table([["", "Closing Balance of previous period", "", "1,300.00"]]
+                                     + TRANSACTIONS.df.values.tolist())])
+
+def test_marker_far_above_the_bottom_does_not_count():
+    rows = [["", "Closing Balance", "", "1,300.00"]] + [["", f"note {i}", "", ""] for i in range(5)]
+    assert not ends_statement([table(rows)])
+
+def statement_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((50, 72), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+@pytest.fixture
+def page_tables(monkeypatch):
+    """Tables for each page number, handed out instead of detecting them"""
+    tables = {}
+    monkeypatch.setattr(page_pipeline, "PAGE_CLASSIFIER", False)
+    monkeypatch.setattr(page_pipeline, "STOP_AT_STATEMENT_END", True)
+    monkeypatch.setattr(page_pipeline, "extract_page_tables_adaptive",
+                        lambda document, page, page_number, ocr, **options: tables.get(page_number, []))
+    return tables
+
+def test_reading_stops_after_the_last_page(tmp_path, page_tables):
+    closed = table(TRANSACTIONS.df.values.tolist() + [["", "Closing Balance", "", "1,100.00"]])
+    src = statement_pdf(tmp_path / "statement.pdf", ["01/04/2024 NEFT 200.00", "Closing Balance 1,100.00",
+                                                       "Terms and conditions apply."])
+    page_tables.update({0: [TRANSACTIONS], 1: [closed]})
+    assert list(page_pipeline.extract_tables(src)) == [0, 1]
+
+def test_reading_goes_on_while_later_pages_have_dates(tmp_path, page_tables):
+    closed = table(TRANSACTIONS.df.values.tolist() + [["", "Closing Balance", "", "1,100.00"]])
+    # Page 2 looks like a summary (one date, a closing balance) but still has a transaction
+    src = statement_pdf(tmp_path / "statement.pdf", ["01/04/2024 NEFT 200.00", "Closing Balance 1,100.00",
+                                                       "05/04/2024 Interest credited\nClosing Balance",
+                                                       "Terms and conditions apply."])
+    page_tables.update({0: [TRANSACTIONS], 1: [closed], 2: [closed]})
+    assert list(page_pipeline.extract_tables(src)) == [0, 1, 2]
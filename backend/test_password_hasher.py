@@ -0,0 +1,112 @@
+"""
+Bounded bcrypt pool: saturation, timeouts and background rehash
+Usage: python -m pytest test_password_hasher.py
+Hashes use bcrypt's lowest work factors so the tests stay fast.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import models.user
+from controllers import auth_controller
+from password_hasher import PasswordHasher, PasswordHasherBusy
+
+ROUNDS = 4
+
+@pytest.fixture
+def blocked():
+    """Event that keeps jobs submitted with block(hasher) running until it is set"""
+    release = threading.Event()
+    yield release
+    release.set()
+
+def block(hasher, release):
+    """Occupy one worker and one pending slot until release is set"""
+    started = threading.Event()
+
+    def wait(_):
+        started.set()
+        release.wait(10)
+
+    assert hasher.rehash_in_background("secret", wait)
+    assert started.wait(5)
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(rounds=ROUNDS, max_workers=1)
+    pw_hash = hasher.hash("secret")
+    assert hasher.verify(pw_hash, "secret")
+    assert not hasher.verify(pw_hash, "wrong")
+    assert not hasher.needs_rehash(pw_hash)
+    assert PasswordHasher(rounds=ROUNDS + 1).needs_rehash(pw_hash)
+
+def test_saturated_pool_rejects_with_retry_after(blocked):
+    hasher = PasswordHasher(rounds=ROUNDS, max_workers=1, max_pending=1)
+    block(hasher, blocked)
+    with pytest.raises(PasswordHasherBusy) as busy:
+        hasher.hash("secret")
+    assert busy.value.retry_after == 1
+    assert hasher.stats["rejected"] == 1
+
+def test_slow_queue_times_out_as_busy(blocked):
+    hasher = PasswordHasher(rounds=ROUNDS, max_workers=1, max_pending=4, timeout=1.6)
+    block(hasher, blocked)
+    with pytest.raises(PasswordHasherBusy) as busy:
+        hasher.hash("secret")
+    # Retry after about as long as the request waited
+    assert busy.value.retry_after == 2
+    assert hasher.stats["timed_out"] == 1
+    blocked.set()
+    # The cancelled job gave its slot back: the pool takes work again
+    assert hasher.verify(hasher.hash("secret"), "secret")
+
+def test_login_answers_503_with_retry_after(monkeypatch, blocked):
+    hasher = PasswordHasher(rounds=ROUNDS, max_workers=1, max_pending=1)
+    stored = PasswordHasher(rounds=ROUNDS).hash("secret")
+    monkeypatch.setattr(models.user, "password_hasher", hasher)
+    monkeypatch.setattr(auth_controller.User, "find_by_email",
+                        staticmethod(lambda email: {"_id": "u1", "email": email, "password": stored, "name": "A"}))
+    app = Flask(__name__)
+    app.add_url_rule("/login", view_func=auth_controller.login, methods=["POST"])
+
+    block(hasher, blocked)
+    response = app.test_client().post("/login", json={"email": "a@example.com", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+class RecordingCollection:
+    def __init__(self):
+        self.updated = threading.Event()
+        self.updates = []
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+        self.updated.set()
+
+def test_rehash_in_background_upgrades_the_cost(monkeypatch):
+    old_hash = PasswordHasher(rounds=ROUNDS).hash("secret")
+    hasher = PasswordHasher(rounds=ROUNDS + 1, max_workers=1)
+    collection = RecordingCollection()
+    monkeypatch.setattr(models.user, "password_hasher", hasher)
+    monkeypatch.setattr(models.user.User, "collection", collection)
+
+    assert models.user.User.rehash_password_if_needed("0" * 24, old_hash, "secret")
+    assert collection.updated.wait(5)
+    (query, update), = collection.updates
+    # Only replaces the hash it was computed from
+    assert query["password"] == old_hash
+    new_hash = update["$set"]["password"]
+    assert not hasher.needs_rehash(new_hash)
+    assert hasher.verify(new_hash, "secret")
+    assert hasher.stats["rehash"]["count"] == 1
+
+def test_rehash_is_skipped_when_the_pool_is_saturated(blocked):
+    hasher = PasswordHasher(rounds=ROUNDS, max_workers=1, max_pending=1)
+    block(hasher, blocked)
+    assert not hasher.rehash_in_background("secret", lambda new_hash: None)
@@ -0,0 +1,196 @@
+"""
+Lightweight request tracing with an OpenTelemetry-compatible span model
+Spans carry trace_id/span_id/parent_span_id, nanosecond start/end times,
+attributes and a status, and nest through a context variable. Finished spans
+go to the exporter chosen by LEDGERIT_TRACE_EXPORTER:
+
+    none     tracing off, start_span() returns a shared no-op span (default)
+    console  one indented line per span on stdout
+    json     one JSON object per line appended to LEDGERIT_TRACE_FILE
+             (default traces.jsonl in LEDGERIT_DATA_DIR, see data_dir)
+
+Every stage timed with performance_analyzer.measure()/time_function is
+exported as a span as well, so keep LEDGERIT_INSTRUMENTATION on to see them.
+
+Note: context variables do not follow work into thread pools, so spans
+started inside executor threads become new root spans.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from dotenv import load_dotenv
+
+from data_dir import data_path, ensure_parent
+from performance_analyzer import add_stage_hook
+
+load_dotenv()
+
+TRACE_EXPORTER = os.getenv('LEDGERIT_TRACE_EXPORTER', 'none').lower()
+TRACE_FILE = data_path(os.getenv('LEDGERIT_TRACE_FILE', 'traces.jsonl'))
+
+_current_span = contextvars.ContextVar('ledgerit_current_span', default=None)
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_span_id', 'depth',
+                 'start_time_unix_nano', 'end_time_unix_nano', 'attributes', 'status', '_token')
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        self.attributes = dict(attributes or {})
+        self.status = 'UNSET'
+        self.start_time_unix_nano = None
+        self.end_time_unix_nano = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start_time_unix_nano = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_time_unix_nano = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status = 'ERROR'
+            self.attributes['exception.type'] = exc_type.__name__
+            self.attributes['exception.message'] = str(exc)
+        elif self.status == 'UNSET':
+            self.status = 'OK'
+        _exporter.export(self)
+        return False
+
+    @property
+    def duration_ms(self):
+        return (self.end_time_unix_nano - self.start_time_unix_nano) / 1e6
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_span_id,
+            'start_time_unix_nano': self.start_time_unix_nano,
+            'end_time_unix_nano': self.end_time_unix_nano,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'attributes': self.attributes
+        }
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class ConsoleExporter:
+    def export(self, span):
+        attrs = ' '.join(f'{key}={value}' for key, value in span.attributes.items())
+        print(f"[TRACE] {span.trace_id[:8]} {'  ' * span.depth}{span.name} "
+              f"{span.duration_ms:.1f}ms {span.status} {attrs}".rstrip())
+
+class JsonFileExporter:
+    """Appends to one file handle, opened on the first span and closed at exit"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            # A lock held by another thread at fork time would never be released in the child
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if self._file is None:
+                # Line buffered: every span is written whole, and workers share the O_APPEND handle
+                self._file = open(ensure_parent(self.path), 'a', buffering=1, encoding='utf-8')
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def _create_exporter():
+    if TRACE_EXPORTER == 'console':
+        return ConsoleExporter()
+    if TRACE_EXPORTER == 'json':
+        return JsonFileExporter(TRACE_FILE)
+    return None
+
+_exporter = _create_exporter()
+ENABLED = _exporter is not None
+
+if ENABLED:
+    # Every measure()/time_function stage also becomes a span
+    add_stage_hook(lambda name: Span(name, _current_span.get()))
+
+def start_span(name, **attributes):
+    """Context manager opening a child of the current span (or a new trace)"""
+    if not ENABLED:
+        return _NULL_SPAN
+    return Span(name, _current_span.get(), attributes)
+
+def current_span():
+    """The innermost open span, or a no-op span outside any trace"""
+    span = _current_span.get() if ENABLED else None
+    return span if span is not None else _NULL_SPAN
+
+def traced(name):
+    """Decorator running the function inside its own span"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class TracedOCR:
+    """Wraps an img2table OCRInstance so each OCR pass gets its own span"""
+
+    def __init__(self, ocr):
+        self._ocr = ocr
+
+    def of(self, document):
+        with start_span('ocr', images=len(document.images)):
+            return self._ocr.of(document=document)
+
+    def __getattr__(self, name):
+        return getattr(self._ocr, name)
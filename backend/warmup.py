@@ -0,0 +1,99 @@
+"""
+Model preloading and warm-up for production servers
+preload_pipeline() runs in the gunicorn master before fork so every worker
+shares the OCR weights, logos and compiled patterns copy-on-write.
+warm_up() pushes one small synthetic statement through extract_tables on
+every engine of every OCR pool - the default backend and each one the
+per-bank backend selection names.
+"""
+
+import time
+
+from ifsc_detector import IFSC_BANK_MAP
+from logging_config import get_logger
+
+logger = get_logger("warmup")
+
+WARMUP_ROWS = [
+    ["Date", "Particulars", "Debit", "Credit", "Balance"],
+    ["01-04-2024", "Opening Balance", "", "", "1,000.00"],
+    ["02-04-2024", "UPI/DR/123456/TEST", "250.00", "", "750.00"],
+    ["03-04-2024", "NEFT/CR/654321/TEST", "", "500.00", "1,250.00"],
+]
+
+def build_warmup_pdf():
+    """Create a one-page PDF holding a small ruled transaction table"""
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    col_widths = [80, 215, 70, 70, 90]
+    row_height = 24
+    left, top = 35, 80
+
+    for r, row in enumerate(WARMUP_ROWS):
+        x = left
+        y = top + r * row_height
+        for c, text in enumerate(row):
+            rect = fitz.Rect(x, y, x + col_widths[c], y + row_height)
+            page.draw_rect(rect, color=(0, 0, 0), width=0.8)
+            page.insert_text((x + 4, y + 16), text, fontsize=10)
+            x += col_widths[c]
+
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+def preload_pipeline():
+    """Import the parsing stack and load shared read-only state"""
+    start = time.perf_counter()
+
+    import bankDetector
+    from ocr_pool import all_pools
+
+    # Every backend the per-bank selection names, not only the default
+    for pool in all_pools():
+        pool.preload()
+    bankDetector.get_reference_logos()
+
+    # Pattern strings used with re.search() live in the re module cache;
+    # classifying every known bank name fills it before workers fork.
+    for bank_name in IFSC_BANK_MAP.values():
+        bankDetector.classify_bank_type(bank_name)
+
+    logger.info("[WARMUP] Parsing stack preloaded in %.2fs", time.perf_counter() - start)
+
+def warm_up():
+    """Run extract_tables on each pooled engine so first-request lazy initialisation happens at boot"""
+    start = time.perf_counter()
+
+    from img2table.document import PDF
+    from ocr_pool import all_pools
+
+    checked_out = []
+    try:
+        pdf_bytes = build_warmup_pdf()
+        table_count = 0
+        for pool in all_pools():
+            # Hold every engine at once so each one gets its own warm-up run
+            engines = [pool.checkout() for _ in range(pool.size)]
+            checked_out.extend((pool, engine) for engine in engines)
+            for engine in engines:
+                # Disable the text layer so the OCR model actually runs
+                pdf_doc = PDF(pdf_bytes, pdf_text_extraction=False)
+                tables = pdf_doc.extract_tables(
+                    ocr=engine,
+                    implicit_rows=False,
+                    implicit_columns=False,
+                    borderless_tables=False,
+                    min_confidence=50
+                )
+                table_count += sum(len(page_tables) for page_tables in tables.values())
+        logger.info("[WARMUP] extract_tables found %s table(s) in %.2fs", table_count, time.perf_counter() - start)
+        return True
+    except Exception as e:
+        logger.warning("[WARMUP] Warm-up failed: %s", e)
+        return False
+    finally:
+        for pool, engine in checked_out:
+            pool.checkin(engine)
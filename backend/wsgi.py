@@ -0,0 +1,32 @@
+"""
+Production WSGI entry point
+gunicorn: gunicorn -c gunicorn.conf.py   (Linux)
+waitress: python wsgi.py                 (Windows)
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from flask_app import app
+
+if os.getenv('LEDGERIT_PRELOAD', 'false').lower() == 'true':
+    from warmup import preload_pipeline
+    preload_pipeline()
+
+if __name__ == '__main__':
+    from waitress import serve
+    from warmup import preload_pipeline, warm_up
+
+    # waitress serves from threads in a single process, so load and warm up here
+    preload_pipeline()
+    if os.getenv('LEDGERIT_WARMUP', 'true').lower() == 'true':
+        warm_up()
+
+    serve(
+        app,
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', 5000)),
+        threads=int(os.getenv('WAITRESS_THREADS', 4))
+    )